@@ -29,7 +29,31 @@ THE SOFTWARE.
 #include <limits>
 #include <cassert>
 #include <algorithm>
+#include <string>
+#include <cstdint>
+#include <cstdlib>
+#include <cstring>
+#include <thread>
+#include <mutex>
+#include <condition_variable>
+#include <chrono>
+#include <set>
+#include <map>
+#include <sstream>
+#include <atomic>
+#include <ctime>
+#include <cmath>
+#ifndef _WIN32
+#include <sys/resource.h>
+#include <sys/mman.h>
+#include <sys/wait.h>
+#include <unistd.h>
+#include <signal.h>
+#include <cerrno>
+#endif
+#include <iostream>
 #include "../../src/cryptominisat.h"
+#include "../../src/dimacsparser.h"
 using namespace CMSat;
 
 #define MODULE_NAME "pycryptosat"
@@ -40,62 +64,676 @@ using namespace CMSat;
 PyMODINIT_FUNC PyInit_ ## name(void); \
 PyMODINIT_FUNC PyInit_ ## name(void)
 
+// Counters and timings of one solve/simplify call, or the sum of all of them
+struct CallStats {
+    uint64_t conflicts;
+    uint64_t propagations;
+    uint64_t decisions;
+    uint64_t restarts;
+    double solve_wall;
+    double solve_cpu;
+    double simplify_wall;
+    double simplify_cpu;
+    double model_wall;
+    uint64_t proof_bytes;
+    double proof_stall;
+};
+
+/* Serializes the method calls on one object across Python threads: the
+ * free-threaded build has no GIL to do that, and the others release it in
+ * most methods. Zero initialised by tp_alloc like the other members. */
+struct ObjectLock {
+    std::mutex mu;
+    // thread holding mu, to refuse re-entrant calls instead of deadlocking
+    std::atomic<std::thread::id> owner;
+};
+
 typedef struct {
     PyObject_HEAD
     /* Type-specific fields go here. */
     SATSolver* cmsat;
+    ObjectLock lock;
     std::vector<Lit> tmp_cl_lits;
+    // literals given a weight by set_var_weights(), indexed by Lit::toInt()
+    std::vector<uint8_t> weights_given;
 
     int verbose;
     double time_limit;
     long confl_limit;
+    int num_threads;
+
+    // whether the engine holds a model for the current formula, i.e. the
+    // last solve was satisfiable and nothing has been added since
+    bool have_model;
+
+    // set while solve_async() runs on its worker thread, protected by lock
+    bool busy;
+    struct AsyncSolve *async_solve;
+
+    // for stats(), only the timings are summed here, counters come from cmsat
+    CallStats last_stats;
+    CallStats sum_stats;
+
+    // set_single_run() solvers exit() on a second solve or simplify call
+    bool single_run;
+    unsigned long long num_calls;
+
+    // set by set_terminate() or set_learn(), owned by the solver
+    struct Callbacks *callbacks;
+
+    // set by Solver(proof=...), owned by the solver
+    struct ProofWriter *proof;
+
+    // arguments of the last __init__() or reset(), to set up the next reset()
+    PyObject *init_args;
+    PyObject *init_kwds;
+    // bumped when the engine is replaced, iterators of the old one stop
+    unsigned long long generation;
+    // SolverPool that handed the solver out, only compared
+    const void *pool;
 } Solver;
 
+/* set_terminate() and set_learn() state. The engine calls the hooks below
+ * from its solving threads without the GIL, each takes it to call Python. */
+struct Callbacks {
+    SATSolver *cmsat = NULL;
+    PyObject *terminate = NULL;
+    PyObject *learn = NULL;
+    size_t batch_size = 0;
+    // > 0 while Python code of a callback runs
+    std::atomic<int> running{0};
+
+    // learnt clauses not delivered yet, zero terminated
+    std::mutex mu;
+    std::vector<int32_t> lits;
+    size_t num_cls = 0;
+};
+
+/* Proof output of Solver(proof=...). The engine writes the proof to a FILE*
+ * whose writes land in a ring buffer; a background thread drains that to
+ * the file, through zlib for .gz paths, so that solving only waits for the
+ * disk when the ring is full. None of this touches Python. */
+struct ProofWriter {
+    FILE *stream = NULL;        // handed to the engine
+    FILE *out = NULL;
+    #ifdef USE_ZLIB
+    gzFile gz = NULL;
+    #endif
+
+    std::mutex mu;
+    std::condition_variable cv;
+    std::vector<char> ring;
+    size_t head = 0;            // first byte not written out yet
+    size_t used = 0;
+    bool writing = false;       // the thread writes ring[head:head+n] out
+    bool closing = false;
+    int error = 0;              // errno of the first failed write
+    bool error_reported = false;
+    std::thread thread;
+
+    uint64_t bytes = 0;         // proof bytes produced by the engine
+    double stall = 0;           // seconds the engine waited for room
+};
+
+static void proof_write_out(ProofWriter *w, const char *data, const size_t n)
+{
+    bool ok;
+    #ifdef USE_ZLIB
+    if (w->gz != NULL) {
+        ok = gzwrite(w->gz, data, n) == (int)n;
+    } else
+    #endif
+    {
+        ok = fwrite(data, 1, n, w->out) == n;
+    }
+    if (!ok && w->error == 0) {
+        w->error = errno ? errno : EIO;
+    }
+}
+
+static void proof_thread(ProofWriter *w)
+{
+    std::unique_lock<std::mutex> lock(w->mu);
+    for (;;) {
+        w->cv.wait(lock, [w]{ return w->used > 0 || w->closing; });
+        if (w->used == 0) {
+            return;
+        }
+        const size_t n = std::min(w->used, w->ring.size() - w->head);
+        w->writing = true;
+        lock.unlock();
+        if (w->error == 0) {
+            proof_write_out(w, w->ring.data() + w->head, n);
+        }
+        lock.lock();
+        w->writing = false;
+        w->head = (w->head + n) % w->ring.size();
+        w->used -= n;
+        w->cv.notify_all();
+    }
+}
+
+/* The write function of the stream the engine writes to */
+static ssize_t proof_push(void *cookie, const char *data, size_t n)
+{
+    ProofWriter *w = (ProofWriter *)cookie;
+    const size_t total = n;
+    std::unique_lock<std::mutex> lock(w->mu);
+    w->bytes += n;
+    while (n > 0) {
+        if (w->used == w->ring.size()) {
+            const auto start = std::chrono::steady_clock::now();
+            w->cv.wait(lock, [w]{ return w->used < w->ring.size(); });
+            const std::chrono::duration<double> waited = std::chrono::steady_clock::now() - start;
+            w->stall += waited.count();
+        }
+        const size_t tail = (w->head + w->used) % w->ring.size();
+        const size_t k = std::min(n, std::min(w->ring.size() - w->used, w->ring.size() - tail));
+        memcpy(w->ring.data() + tail, data, k);
+        w->used += k;
+        data += k;
+        n -= k;
+        w->cv.notify_all();
+    }
+    return total;
+}
+
+#ifdef __GLIBC__
+static FILE* proof_stream(ProofWriter *w)
+{
+    cookie_io_functions_t io = {NULL, proof_push, NULL, NULL};
+    return fopencookie(w, "w", io);
+}
+#elif defined(__APPLE__) || defined(__FreeBSD__) || defined(__NetBSD__) || defined(__OpenBSD__)
+static int proof_push_bsd(void *cookie, const char *data, int n)
+{
+    return (int)proof_push(cookie, data, n);
+}
+
+static FILE* proof_stream(ProofWriter *w)
+{
+    return funopen(w, NULL, proof_push_bsd, NULL, NULL);
+}
+#else
+static FILE* proof_stream(ProofWriter *w)
+{
+    errno = ENOSYS;
+    return NULL;
+}
+#endif
+
+/* Wait until everything written so far reached the file, with the GIL
+ * released. */
+static void proof_sync(ProofWriter *w)
+{
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    fflush(w->stream);
+    std::unique_lock<std::mutex> lock(w->mu);
+    w->cv.wait(lock, [w]{ return w->used == 0 && !w->writing; });
+    #ifdef USE_ZLIB
+    if (w->gz != NULL) {
+        gzflush(w->gz, Z_SYNC_FLUSH);
+    } else
+    #endif
+    {
+        fflush(w->out);
+    }
+    Py_END_ALLOW_THREADS
+
+    if (w->error != 0 && !w->error_reported && !PyErr_Occurred()) {
+        w->error_reported = true;
+        if (PyErr_WarnFormat(PyExc_RuntimeWarning, 1, "writing the proof failed: %s", strerror(w->error)) < 0) {
+            PyErr_WriteUnraisable(NULL);
+        }
+    }
+}
+
+/* Flush and close everything. Must be called once the engine, which writes
+ * the end of the proof when it is deleted, is gone. */
+static void proof_close(ProofWriter *w)
+{
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    fclose(w->stream);
+    {
+        std::lock_guard<std::mutex> lock(w->mu);
+        w->closing = true;
+        w->cv.notify_all();
+    }
+    w->thread.join();
+    #ifdef USE_ZLIB
+    if (w->gz != NULL) {
+        gzclose(w->gz);
+    } else
+    #endif
+    {
+        fclose(w->out);
+    }
+    Py_END_ALLOW_THREADS
+    delete w;
+}
+
+static ProofWriter* proof_open(PyObject *path, const size_t capacity)
+{
+    PyObject *fsname;
+    if (!PyUnicode_FSConverter(path, &fsname)) {
+        return NULL;
+    }
+    const char *name = PyBytes_AS_STRING(fsname);
+    const size_t len = strlen(name);
+    const bool compress = len > 3 && strcmp(name + len - 3, ".gz") == 0;
+    #ifndef USE_ZLIB
+    if (compress) {
+        Py_DECREF(fsname);
+        PyErr_SetString(PyExc_ValueError, "compressed proofs need the module to be built with zlib");
+        return NULL;
+    }
+    #endif
+
+    ProofWriter *w = new ProofWriter;
+    w->ring.resize(capacity);
+    #ifdef USE_ZLIB
+    if (compress) {
+        w->gz = gzopen(name, "wb");
+    } else
+    #endif
+    {
+        w->out = fopen(name, "wb");
+    }
+    Py_DECREF(fsname);
+    #ifdef USE_ZLIB
+    const bool opened = (w->gz != NULL || w->out != NULL);
+    #else
+    const bool opened = (w->out != NULL);
+    #endif
+    if (!opened) {
+        delete w;
+        PyErr_SetFromErrnoWithFilenameObject(PyExc_OSError, path);
+        return NULL;
+    }
+    w->stream = proof_stream(w);
+    if (w->stream == NULL) {
+        PyErr_SetFromErrno(PyExc_OSError);
+    } else {
+        // the engine buffers itself, hand its writes over as they come
+        setvbuf(w->stream, NULL, _IONBF, 0);
+        try {
+            w->thread = std::thread(proof_thread, w);
+        } catch (const std::system_error& e) {
+            fclose(w->stream);
+            w->stream = NULL;
+            PyErr_Format(PyExc_RuntimeError, "could not start proof writer thread: %s", e.what());
+        }
+    }
+    if (w->stream == NULL) {
+        #ifdef USE_ZLIB
+        if (w->gz != NULL) {
+            gzclose(w->gz);
+        } else
+        #endif
+        {
+            fclose(w->out);
+        }
+        delete w;
+        return NULL;
+    }
+    return w;
+}
+
 static const char solver_create_docstring[] = \
-"Solver(verbose=0, time_limit=max_numeric_limits, confl_limit=max_numeric_limits, threads=1)\n\
+"Solver(verbose=0, time_limit=max_numeric_limits, confl_limit=max_numeric_limits, threads=1, preset=None, proof=None, proof_format='frat', proof_buffer=64MiB, **config)\n\
 Create Solver object.\n\
 \n\
+Solvers can be shared between threads: calls on one solver run one at a\n\
+time (except interrupt()), the others waiting with the GIL released, while\n\
+calls on different solvers run in parallel.\n\
+\n\
 :param verbose: Verbosity level: 0: nothing printed; 15: very verbose.\n\
 :param time_limit: Propagation limit: abort after this many seconds has elapsed.\n\
 :param confl_limit: Propagation limit: abort after this many conflicts.\n\
     Default: never abort.\n\
 :param threads: Number of threads to use.\n\
+:param proof: (Optional) Path of a file to write a FRAT proof to, gzip\n\
+    compressed if it ends with '.gz'. The proof goes through a ring buffer\n\
+    written out by a background thread. It is flushed when solve() returns,\n\
+    a compressed one being complete once the solver is deleted. Requires\n\
+    threads=1, and makes the solver single_run as the proof is finalized\n\
+    at the end of the solve.\n\
+:param proof_format: Proof format, only 'frat' is supported.\n\
+:param proof_buffer: Size in bytes of the proof ring buffer.\n\
+:param preset: (Optional) Name of a set of settings from\n\
+    pycryptosat.presets, e.g. 'low-latency-incremental' for many small\n\
+    incremental calls or 'one-shot-throughput' for a single solve().\n\
+:param config: Settings of the SATSolver setters without their set_\n\
+    prefix, applied after the preset. Flags: no_simplify,\n\
+    no_simplify_at_startup, no_equivalent_lit_replacement, no_bva, no_bve,\n\
+    single_run (solve or simplify only once), allow_otf_gauss. Booleans:\n\
+    simplify, find_xors, renumber, xor_detach. Integers: seed, sls, scc,\n\
+    distill, intree_probe, bva, bve, full_bve, min_bva_gain,\n\
+    max_red_linkin_size, max_mem (a soft limit in bytes on the total of\n\
+    memory_usage(), past which solve() returns None rather than running\n\
+    out of memory). polarity_mode: 'pos', 'neg', 'rnd', 'auto',\n\
+    'stable', 'best', 'best_inv', 'saved' or 'weighted'.\n\
 :type verbose: <int>\n\
 :type time_limit: <double>\n\
 :type confl_limit: <long>\n\
-:type threads: <int>";
+:type threads: <int>\n\
+:type preset: <str>";
+
+/* Solver settings accepted in configs, named after their SATSolver setter
+ * without the set_ prefix. Flags (no_..., single_run, ...) are applied when
+ * true, boolean settings get value != 0. */
+struct ConfigOption {
+    const char *name;
+    void (*apply)(SATSolver *cmsat, long value);
+};
+
+static const ConfigOption config_options[] = {
+    {"verbose", [](SATSolver *s, long v) { s->set_verbosity(v); }},
+    {"seed", [](SATSolver *s, long v) { s->set_seed(v); }},
+    {"no_simplify", [](SATSolver *s, long v) { if (v) s->set_no_simplify(); }},
+    {"no_simplify_at_startup", [](SATSolver *s, long v) { if (v) s->set_no_simplify_at_startup(); }},
+    {"no_equivalent_lit_replacement", [](SATSolver *s, long v) { if (v) s->set_no_equivalent_lit_replacement(); }},
+    {"no_bva", [](SATSolver *s, long v) { if (v) s->set_no_bva(); }},
+    {"no_bve", [](SATSolver *s, long v) { if (v) s->set_no_bve(); }},
+    {"single_run", [](SATSolver *s, long v) { if (v) s->set_single_run(); }},
+    {"allow_otf_gauss", [](SATSolver *s, long v) { if (v) s->set_allow_otf_gauss(); }},
+    {"simplify", [](SATSolver *s, long v) { s->set_simplify(v != 0); }},
+    {"find_xors", [](SATSolver *s, long v) { s->set_find_xors(v != 0); }},
+    {"renumber", [](SATSolver *s, long v) { s->set_renumber(v != 0); }},
+    {"xor_detach", [](SATSolver *s, long v) { s->set_xor_detach(v != 0); }},
+    {"sls", [](SATSolver *s, long v) { s->set_sls(v); }},
+    {"scc", [](SATSolver *s, long v) { s->set_scc(v); }},
+    {"distill", [](SATSolver *s, long v) { s->set_distill(v); }},
+    {"intree_probe", [](SATSolver *s, long v) { s->set_intree_probe(v); }},
+    {"bva", [](SATSolver *s, long v) { s->set_bva(v); }},
+    {"bve", [](SATSolver *s, long v) { s->set_bve(v); }},
+    {"full_bve", [](SATSolver *s, long v) { s->set_full_bve(v); }},
+    {"min_bva_gain", [](SATSolver *s, long v) { s->set_min_bva_gain(v); }},
+    {"max_red_linkin_size", [](SATSolver *s, long v) { s->set_max_red_linkin_size(v); }},
+};
+
+/* Named settings, applied before the explicitly given ones */
+struct ConfigPreset {
+    const char *name;
+    std::vector<std::pair<const char *, long> > options;
+};
+
+static const ConfigPreset config_presets[] = {
+    // many small incremental calls: skip the startup and expensive
+    // simplifications, whose cost is never recovered on tiny queries
+    {"low-latency-incremental", {
+        {"no_simplify_at_startup", 1},
+        {"no_bva", 1},
+        {"find_xors", 0},
+        {"renumber", 0},
+        {"sls", 0},
+    }},
+    // a single large solve: full inprocessing, and the promise of one call
+    // lets the engine use techniques that do not support assumptions
+    {"one-shot-throughput", {
+        {"single_run", 1},
+    }},
+};
+
+static const struct {
+    const char *name;
+    PolarityMode mode;
+} polarity_modes[] = {
+    {"pos", PolarityMode::polarmode_pos},
+    {"neg", PolarityMode::polarmode_neg},
+    {"rnd", PolarityMode::polarmode_rnd},
+    {"auto", PolarityMode::polarmode_automatic},
+    {"stable", PolarityMode::polarmode_stable},
+    {"best", PolarityMode::polarmode_best},
+    {"best_inv", PolarityMode::polarmode_best_inv},
+    {"saved", PolarityMode::polarmode_saved},
+    {"weighted", PolarityMode::polarmode_weighted},
+};
+
+static int apply_polarity_mode(SATSolver *cmsat, PyObject *value)
+{
+    const char *name = PyUnicode_Check(value) ? PyUnicode_AsUTF8(value) : NULL;
+    if (name != NULL) {
+        for (const auto& pm: polarity_modes) {
+            if (strcmp(pm.name, name) == 0) {
+                cmsat->set_polarity_mode(pm.mode);
+                return 1;
+            }
+        }
+    }
+    if (!PyErr_Occurred()) {
+        PyErr_SetString(PyExc_ValueError, "polarity_mode must be one of 'pos', 'neg', 'rnd', "
+            "'auto', 'stable', 'best', 'best_inv', 'saved' or 'weighted'");
+    }
+    return 0;
+}
+
+/* max_mem is in bytes, so it does not fit the int range of the other options */
+static int apply_max_mem(SATSolver *cmsat, PyObject *value)
+{
+    if (!IS_INT(value)) {
+        PyErr_SetString(PyExc_TypeError, "config option 'max_mem' must be an int");
+        return 0;
+    }
+    const unsigned long long max_bytes = PyLong_AsUnsignedLongLong(value);
+    if (PyErr_Occurred()) {
+        if (PyErr_ExceptionMatches(PyExc_OverflowError)) {
+            PyErr_Clear();
+            PyErr_SetString(PyExc_ValueError, "config option 'max_mem' out of range");
+        }
+        return 0;
+    }
+    cmsat->set_max_mem(max_bytes);
+    return 1;
+}
+
+static int apply_option(SATSolver *cmsat, const char *name, const long value, bool *single_run)
+{
+    for (const ConfigOption& option: config_options) {
+        if (strcmp(option.name, name) == 0) {
+            option.apply(cmsat, value);
+            if (strcmp(name, "single_run") == 0) {
+                *single_run = (value != 0);
+            }
+            return 1;
+        }
+    }
+    PyErr_Format(PyExc_ValueError, "unknown config option '%s'", name);
+    return 0;
+}
+
+static const ConfigPreset* find_preset(PyObject *name)
+{
+    const char *str = PyUnicode_Check(name) ? PyUnicode_AsUTF8(name) : NULL;
+    if (str != NULL) {
+        for (const ConfigPreset& preset: config_presets) {
+            if (strcmp(preset.name, str) == 0) {
+                return &preset;
+            }
+        }
+    }
+    if (!PyErr_Occurred()) {
+        PyErr_SetString(PyExc_ValueError, "unknown preset, see pycryptosat.presets");
+    }
+    return NULL;
+}
+
+/* Apply a dict of settings, optionally starting from a 'preset', to a fresh
+ * solver. Sets single_run when the solver promised to be solved only once. */
+static int apply_config(SATSolver *cmsat, PyObject *config, bool *single_run)
+{
+    if (!PyDict_Check(config)) {
+        PyErr_SetString(PyExc_TypeError, "config must be a dict");
+        return 0;
+    }
+    *single_run = false;
+
+    PyObject *preset_name = PyDict_GetItemString(config, "preset");
+    if (preset_name != NULL && preset_name != Py_None) {
+        const ConfigPreset *preset = find_preset(preset_name);
+        if (preset == NULL) {
+            return 0;
+        }
+        for (const auto& option: preset->options) {
+            apply_option(cmsat, option.first, option.second, single_run);
+        }
+    }
+
+    PyObject *key;
+    PyObject *value;
+    Py_ssize_t pos = 0;
+    while (PyDict_Next(config, &pos, &key, &value)) {
+        const char *name = PyUnicode_Check(key) ? PyUnicode_AsUTF8(key) : NULL;
+        if (name == NULL) {
+            if (!PyErr_Occurred()) {
+                PyErr_SetString(PyExc_TypeError, "config keys must be strings");
+            }
+            return 0;
+        }
+        if (strcmp(name, "preset") == 0) {
+            continue;
+        }
+        if (strcmp(name, "polarity_mode") == 0) {
+            if (!apply_polarity_mode(cmsat, value)) {
+                return 0;
+            }
+            continue;
+        }
+
+        if (strcmp(name, "max_mem") == 0) {
+            if (!apply_max_mem(cmsat, value)) {
+                return 0;
+            }
+            continue;
+        }
+
+        if (!IS_INT(value)) {
+            PyErr_Format(PyExc_TypeError, "config option '%s' must be an int or a bool", name);
+            return 0;
+        }
+        const long val = PyLong_AsLong(value);
+        if (val < 0 || val > std::numeric_limits<int>::max()) {
+            if (!PyErr_Occurred() || PyErr_ExceptionMatches(PyExc_OverflowError)) {
+                PyErr_Clear();
+                PyErr_Format(PyExc_ValueError, "config option '%s' out of range", name);
+            }
+            return 0;
+        }
+        if (!apply_option(cmsat, name, val, single_run)) {
+            return 0;
+        }
+    }
+    return 1;
+}
+
+/* pycryptosat.presets: {name: {option: value}} */
+static PyObject* presets_dict()
+{
+    PyObject *presets = PyDict_New();
+    if (presets == NULL) {
+        return NULL;
+    }
+    for (const ConfigPreset& preset: config_presets) {
+        PyObject *options = PyDict_New();
+        if (options == NULL || PyDict_SetItemString(presets, preset.name, options) != 0) {
+            Py_XDECREF(options);
+            Py_DECREF(presets);
+            return NULL;
+        }
+        Py_DECREF(options);
+        for (const auto& option: preset.options) {
+            PyObject *value = PyLong_FromLong(option.second);
+            if (value == NULL || PyDict_SetItemString(options, option.first, value) != 0) {
+                Py_XDECREF(value);
+                Py_DECREF(presets);
+                return NULL;
+            }
+            Py_DECREF(value);
+        }
+    }
+    return presets;
+}
+
+/* Split the keyword arguments of Solver() into its own and the config */
+static int split_solver_kwds(PyObject *kwds, char const* const* kwlist, PyObject *own, PyObject *config)
+{
+    PyObject *key;
+    PyObject *value;
+    Py_ssize_t pos = 0;
+    while (kwds != NULL && PyDict_Next(kwds, &pos, &key, &value)) {
+        bool is_own = false;
+        for (char const* const* kw = kwlist; *kw != NULL; kw++) {
+            is_own = is_own || (PyUnicode_Check(key) && PyUnicode_CompareWithASCIIString(key, *kw) == 0);
+        }
+        if (PyDict_SetItem(is_own ? own : config, key, value) != 0) {
+            return 0;
+        }
+    }
+    return 1;
+}
 
 static void setup_solver(Solver *self, PyObject *args, PyObject *kwds)
 {
-    static char const* kwlist[] = {"verbose", "time_limit", "confl_limit", "threads", NULL};
+    static char const* kwlist[] = {"verbose", "time_limit", "confl_limit", "threads",
+        "proof", "proof_format", "proof_buffer", NULL};
 
     int num_threads = 1;
+    PyObject *proof = NULL;
+    const char *proof_format = "frat";
+    Py_ssize_t proof_buffer = 64 << 20;
     self->cmsat = NULL;
     self->verbose = 0;
     self->time_limit = std::numeric_limits<double>::max();
     self->confl_limit = std::numeric_limits<long>::max();
+    self->last_stats = CallStats();
+    self->sum_stats = CallStats();
+    self->single_run = false;
+    self->num_calls = 0;
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|idli",  const_cast<char**>(kwlist),
-        &self->verbose, &self->time_limit, &self->confl_limit, &num_threads))
+    PyObject *own_kwds = PyDict_New();
+    PyObject *config = PyDict_New();
+    if (own_kwds == NULL || config == NULL
+        || !split_solver_kwds(kwds, kwlist, own_kwds, config)
+        || !PyArg_ParseTupleAndKeywords(args, own_kwds, "|idliOsn",  const_cast<char**>(kwlist),
+            &self->verbose, &self->time_limit, &self->confl_limit, &num_threads,
+            &proof, &proof_format, &proof_buffer))
     {
+        Py_XDECREF(own_kwds);
+        Py_XDECREF(config);
         return;
     }
+    Py_DECREF(own_kwds);
 
+    const char *range_error = NULL;
     if (self->verbose < 0) {
-        PyErr_SetString(PyExc_ValueError, "verbosity must be at least 0");
-        return;
-    }
-    if (self->time_limit < 0) {
-        PyErr_SetString(PyExc_ValueError, "time_limit must be at least 0");
-        return;
+        range_error = "verbosity must be at least 0";
+    } else if (self->time_limit < 0) {
+        range_error = "time_limit must be at least 0";
+    } else if (self->confl_limit < 0) {
+        range_error = "conflict limit must be at least 0";
+    } else if (num_threads <= 0) {
+        range_error = "number of threads must be at least 1";
     }
-    if (self->confl_limit < 0) {
-        PyErr_SetString(PyExc_ValueError, "conflict limit must be at least 0");
+    if (range_error != NULL) {
+        PyErr_SetString(PyExc_ValueError, range_error);
+        Py_DECREF(config);
         return;
     }
-    if (num_threads <= 0) {
-        PyErr_SetString(PyExc_ValueError, "number of threads must be at least 1");
-        return;
+    const bool has_proof = (proof != NULL && proof != Py_None);
+    if (has_proof) {
+        const char *error = NULL;
+        if (strcmp(proof_format, "frat") != 0) {
+            error = "proof_format must be 'frat'";
+        } else if (num_threads > 1) {
+            error = "proofs can only be written with threads=1";
+        } else if (proof_buffer <= 0) {
+            error = "proof_buffer must be at least 1";
+        }
+        if (error != NULL) {
+            PyErr_SetString(PyExc_ValueError, error);
+            Py_DECREF(config);
+            return;
+        }
     }
 
     self->cmsat = new SATSolver;
@@ -103,10 +741,102 @@ static void setup_solver(Solver *self, PyObject *args, PyObject *kwds)
     self->cmsat->set_max_time(self->time_limit);
     self->cmsat->set_max_confl(self->confl_limit);
     self->cmsat->set_num_threads(num_threads);
+    self->num_threads = num_threads;
+    if (!apply_config(self->cmsat, config, &self->single_run)) {
+        delete self->cmsat;
+        self->cmsat = NULL;
+    }
+    Py_DECREF(config);
 
+    if (self->cmsat != NULL && has_proof) {
+        self->proof = proof_open(proof, proof_buffer);
+        if (self->proof == NULL) {
+            delete self->cmsat;
+            self->cmsat = NULL;
+            return;
+        }
+        // the engine finalizes the proof at the end of each solve, so a
+        // second one would make it invalid
+        self->cmsat->set_frat(self->proof->stream);
+        self->cmsat->set_single_run();
+        self->single_run = true;
+    }
     return;
 }
 
+static int check_not_busy(Solver *self);
+static void flush_learnt(Solver *self);
+
+enum class Phase {solve, simplify};
+
+/* Snapshot taken when a solve or simplify call starts. May be taken without
+ * the GIL, finish() must be called with it. */
+struct CallTimer {
+    std::chrono::steady_clock::time_point wall;
+    std::clock_t cpu;
+    uint64_t conflicts;
+    uint64_t propagations;
+    uint64_t decisions;
+    uint64_t restarts;
+
+    explicit CallTimer(const SATSolver *cmsat) :
+        wall(std::chrono::steady_clock::now())
+        , cpu(std::clock())
+        , conflicts(cmsat->get_sum_conflicts())
+        , propagations(cmsat->get_sum_propagations())
+        , decisions(cmsat->get_sum_decisions())
+        , restarts(cmsat->get_sum_restarts())
+    {}
+
+    void finish(Solver *self, const Phase phase) const
+    {
+        const SATSolver *cmsat = self->cmsat;
+        if (self->proof != NULL) {
+            proof_sync(self->proof);
+        }
+        const std::chrono::duration<double> wall_time = std::chrono::steady_clock::now() - wall;
+        const double cpu_time = (double)(std::clock() - cpu) / CLOCKS_PER_SEC;
+
+        CallStats& last = self->last_stats;
+        last = CallStats();
+        last.conflicts = cmsat->get_sum_conflicts() - conflicts;
+        last.propagations = cmsat->get_sum_propagations() - propagations;
+        last.decisions = cmsat->get_sum_decisions() - decisions;
+        last.restarts = cmsat->get_sum_restarts() - restarts;
+        if (phase == Phase::solve) {
+            last.solve_wall = wall_time.count();
+            last.solve_cpu = cpu_time;
+        } else {
+            last.simplify_wall = wall_time.count();
+            last.simplify_cpu = cpu_time;
+        }
+        self->sum_stats.solve_wall += last.solve_wall;
+        self->sum_stats.solve_cpu += last.solve_cpu;
+        self->sum_stats.simplify_wall += last.simplify_wall;
+        self->sum_stats.simplify_cpu += last.simplify_cpu;
+        if (self->proof != NULL) {
+            // what was added between the calls counts for this one
+            last.proof_bytes = self->proof->bytes - self->sum_stats.proof_bytes;
+            last.proof_stall = self->proof->stall - self->sum_stats.proof_stall;
+            self->sum_stats.proof_bytes = self->proof->bytes;
+            self->sum_stats.proof_stall = self->proof->stall;
+        }
+        self->num_calls++;
+        flush_learnt(self);
+    }
+};
+
+/* The engine terminates the process when a single_run solver is called
+ * again, refuse before that can happen */
+static int check_single_run(Solver *self, const size_t num_calls)
+{
+    if (self->single_run && self->num_calls + num_calls > 1) {
+        PyErr_SetString(PyExc_RuntimeError, "single_run solvers can only solve or simplify once");
+        return 0;
+    }
+    return 1;
+}
+
 static int convert_lit_to_sign_and_var(PyObject* lit, long& var, bool& sign)
 {
     if (!IS_INT(lit))  {
@@ -132,8 +862,9 @@ static int convert_lit_to_sign_and_var(PyObject* lit, long& var, bool& sign)
     return 1;
 }
 
+template <typename S>
 static int parse_clause(
-    Solver *self
+    S *cmsat
     , PyObject *clause
     , std::vector<Lit>& lits
 ) {
@@ -159,8 +890,8 @@ static int parse_clause(
         lits.push_back(Lit(var, sign));
     }
 
-    if (!lits.empty() && max_var >= (long int)self->cmsat->nVars()) {
-        self->cmsat->new_vars(max_var-(long int)self->cmsat->nVars()+1);
+    if (!lits.empty() && max_var >= (long int)cmsat->nVars()) {
+        cmsat->new_vars(max_var-(long int)cmsat->nVars()+1);
     }
 
     Py_DECREF(iterator);
@@ -199,9 +930,7 @@ static int parse_xor_clause(
         }
 
         if (var >= self->cmsat->nVars()) {
-            for(long i = (long)self->cmsat->nVars(); i <= var ; i++) {
-                self->cmsat->new_var();
-            }
+            self->cmsat->new_vars(var - (long)self->cmsat->nVars() + 1);
         }
 
         vars.push_back(var);
@@ -227,6 +956,9 @@ static PyObject* start_getting_small_clauses(Solver *self, PyObject *args, PyObj
     if (!PyArg_ParseTupleAndKeywords(args, kwds, "II", const_cast<char**>(kwlist), &max_len, &max_glue)) {
         return NULL;
     }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
 
     self->cmsat->start_getting_small_clauses(max_len, max_glue);
 
@@ -244,6 +976,9 @@ static PyObject* get_next_small_clause(Solver *self, PyObject *args, PyObject *k
     if (!PyArg_ParseTupleAndKeywords(args, kwds, "", const_cast<char**>(kwlist))) {
         return NULL;
     }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
 
     std::vector<Lit> lits;
     bool ret = self->cmsat->get_next_small_clause(lits);
@@ -277,6 +1012,9 @@ static PyObject* end_getting_small_clauses(Solver *self, PyObject *args, PyObjec
     if (!PyArg_ParseTupleAndKeywords(args, kwds, "", const_cast<char**>(kwlist))) {
         return NULL;
     }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
     self->cmsat->end_getting_small_clauses();
 
     Py_INCREF(Py_None);
@@ -286,7 +1024,7 @@ static PyObject* end_getting_small_clauses(Solver *self, PyObject *args, PyObjec
 static int _add_clause(Solver *self, PyObject *clause)
 {
     self->tmp_cl_lits.clear();
-    if (!parse_clause(self, clause, self->tmp_cl_lits)) {
+    if (!parse_clause(self->cmsat, clause, self->tmp_cl_lits)) {
         return 0;
     }
     self->cmsat->add_clause(self->tmp_cl_lits);
@@ -311,6 +1049,10 @@ static PyObject* add_clause(Solver *self, PyObject *args, PyObject *kwds)
     if (!PyArg_ParseTupleAndKeywords(args, kwds, "O", const_cast<char**>(kwlist), &clause)) {
         return NULL;
     }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+    self->have_model = false;
 
     if (_add_clause(self, clause) == 0 ) {
         return NULL;
@@ -320,196 +1062,402 @@ static PyObject* add_clause(Solver *self, PyObject *args, PyObject *kwds)
     return Py_None;
 }
 
-template <typename T>
-static int _add_clauses_from_array(Solver *self, const size_t array_length, const T *array)
+/* Struct format of the items of a buffer without a native byte order prefix */
+static const char* item_format_string(const Py_buffer *view)
 {
-    if (array_length == 0) {
-        return 1;
-    }
-    if (array[array_length - 1] != 0) {
-        PyErr_SetString(PyExc_ValueError, "last clause not terminated by zero");
-        return 0;
+    const char *fmt = view->format ? view->format : "B";
+    const bool little_endian = (PY_LITTLE_ENDIAN == 1);
+    if (fmt[0] == '@' || fmt[0] == '='
+        || (fmt[0] == '<' && little_endian)
+        || (fmt[0] == '>' && !little_endian)
+    ) {
+        fmt++;
     }
-    size_t k = 0;
-    long val = 0;
-    std::vector<Lit>& lits = self->tmp_cl_lits;
-    for (val = (long) array[k]; k < array_length; val = (long) array[++k]) {
-        lits.clear();
-        long int max_var = 0;
-        for (; k < array_length && val != 0; val = (long) array[++k]) {
-            long var;
-            bool sign;
-            if (val > std::numeric_limits<int>::max()/2
-                || val < std::numeric_limits<int>::min()/2
-            ) {
-                PyErr_Format(PyExc_ValueError, "integer %ld is too small or too large", val);
-                return 0;
-            }
-
-            sign = (val < 0);
-            var = std::abs(val) - 1;
-            max_var = std::max(var, max_var);
+    return fmt;
+}
 
-            lits.push_back(Lit(var, sign));
-        }
-        if (!lits.empty()) {
-            if (max_var >= (long int)self->cmsat->nVars()) {
-                self->cmsat->new_vars(max_var-(long int)self->cmsat->nVars()+1);
-            }
-            self->cmsat->add_clause(lits);
-        }
-    }
-    return 1;
+static inline char item_format(const Py_buffer *view)
+{
+    return item_format_string(view)[0];
 }
 
-static int _add_clauses_from_buffer_info(Solver *self, PyObject *buffer_info, const size_t itemsize)
+/* Acquire a C-contiguous buffer of native int32/int64 items.
+ * Returns the item size (4 or 8), or 0 with an exception set. The caller
+ * must PyBuffer_Release() the view if (and only if) this succeeds. */
+static int get_int_buffer(PyObject *obj, Py_buffer *view, const char *what, const bool allow_bool = false)
 {
-    PyObject *py_array_length = PyTuple_GetItem(buffer_info, 1);
-    if (py_array_length == NULL) {
-        PyErr_SetString(PyExc_ValueError, "invalid clause array: could not get array length");
-        return 0;
-    }
-    long array_length = PyLong_AsLong(py_array_length);
-    if (array_length < 0) {
-        PyErr_SetString(PyExc_ValueError, "invalid clause array: could not get array length");
+    if (PyObject_GetBuffer(obj, view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) != 0) {
+        // keep the exporter's own error, e.g. BufferError for a
+        // non-contiguous numpy array
         return 0;
     }
-    PyObject *py_array_address = PyTuple_GetItem(buffer_info, 0);
-    if (py_array_address == NULL) {
-        PyErr_SetString(PyExc_ValueError, "invalid clause array: could not get array address");
-        return 0;
+
+    const char *fmt = item_format_string(view);
+    const bool int_format = (fmt[0] == 'i' || fmt[0] == 'l' || fmt[0] == 'q') && fmt[1] == '\0';
+    const bool bool_format = (fmt[0] == '?' || fmt[0] == 'b' || fmt[0] == 'B') && fmt[1] == '\0';
+    if (allow_bool && bool_format && view->itemsize == 1) {
+        return 1;
     }
-    const void *array_address = PyLong_AsVoidPtr(py_array_address);
-    if (array_address == NULL) {
-        PyErr_SetString(PyExc_ValueError, "invalid clause array: could not get array address");
+    if (!int_format || (view->itemsize != 4 && view->itemsize != 8)) {
+        PyErr_Format(PyExc_ValueError,
+            "invalid %s: %s32 or 64 bit integer items expected, got format '%s'"
+            " (use memoryview(...).cast('i') for raw bytes)",
+            what, allow_bool ? "boolean, 8, " : "signed ", view->format ? view->format : "B");
+        PyBuffer_Release(view);
         return 0;
     }
-    if (itemsize == sizeof(int)) {
-        return _add_clauses_from_array(self, array_length, (const int *) array_address);
-    }
-    if (itemsize == sizeof(long)) {
-        return _add_clauses_from_array(self, array_length, (const long *) array_address);
-    }
-    if (itemsize == sizeof(long long)) {
-        return _add_clauses_from_array(self, array_length, (const long long *) array_address);
-    }
-    PyErr_Format(PyExc_ValueError, "invalid clause array: invalid itemsize '%ld'", itemsize);
-    return 0;
+
+    return (int)view->itemsize;
 }
 
-static int _check_array_typecode(PyObject *clauses)
+static inline size_t num_items(const Py_buffer *view)
 {
-    PyObject *py_typecode = PyObject_GetAttrString(clauses, "typecode");
-    if (py_typecode == NULL) {
-        PyErr_SetString(PyExc_ValueError, "invalid clause array: typecode is NULL");
-        return 0;
-    }
+    return view->len / view->itemsize;
+}
 
-    PyObject *typecode_bytes = PyUnicode_AsASCIIString(py_typecode);
-    Py_DECREF(py_typecode);
-    if (typecode_bytes == NULL) {
-        PyErr_SetString(PyExc_ValueError, "invalid clause array: could not get typecode bytes");
-        return 0;
+/* Call f with a typed pointer to the items of a buffer accepted by
+ * get_int_buffer(), so that loops over the items are compiled per type */
+template <typename F>
+static auto with_int_data(const Py_buffer *view, F&& f) -> decltype(f((const int32_t *)NULL))
+{
+    if (view->itemsize == 4) {
+        return f((const int32_t *)view->buf);
     }
+    return f((const int64_t *)view->buf);
+}
 
-    const char *typecode_cstr = PyBytes_AsString(typecode_bytes);
-    if (typecode_cstr == NULL) {
-        Py_DECREF(typecode_bytes);
-        PyErr_SetString(PyExc_ValueError, "invalid clause array: could not get typecode cstring");
-        return 0;
+/* Same for buffers accepted by get_int_buffer() with allow_bool, whose items
+ * are only tested for being non-zero */
+template <typename F>
+static auto with_flag_data(const Py_buffer *view, F&& f) -> decltype(f((const uint8_t *)NULL))
+{
+    if (view->itemsize == 1) {
+        return f((const uint8_t *)view->buf);
     }
-    const char typecode = typecode_cstr[0];
-    if (typecode == '\0' || typecode_cstr[1] != '\0') {
-        PyErr_Format(PyExc_ValueError, "invalid clause array: invalid typecode '%s'", typecode_cstr);
-        Py_DECREF(typecode_bytes);
-        return 0;
+    return with_int_data(view, f);
+}
+
+/* Check that `offsets` is a valid CSR offset array over `num_lits` items */
+template <typename O>
+static bool check_csr_offsets(
+    const O *offsets
+    , const size_t num_offsets
+    , const size_t num_lits
+    , std::string& err
+) {
+    if (num_offsets == 0 || offsets[0] != 0) {
+        err = "offsets must start with 0";
+        return false;
+    }
+    if ((long long)offsets[num_offsets - 1] != (long long)num_lits) {
+        err = "last offset must be equal to the number of literals";
+        return false;
+    }
+    for (size_t i = 1; i < num_offsets; i++) {
+        if (offsets[i] < offsets[i - 1]) {
+            err = "offsets must be non-decreasing";
+            return false;
+        }
+    }
+    return true;
+}
+
+static inline bool lit_in_range(const long long val)
+{
+    return val <= std::numeric_limits<int>::max()/2
+        && val >= std::numeric_limits<int>::min()/2;
+}
+
+static std::string lit_range_error(const long long val)
+{
+    return "integer " + std::to_string(val) + " is too small or too large";
+}
+
+static inline Lit lit_from_int(const long long val)
+{
+    return Lit((uint32_t)(std::llabs(val) - 1), val < 0);
+}
+
+template <typename S>
+static void grow_vars(S *cmsat, const long long max_var)
+{
+    if (max_var >= (long long)cmsat->nVars()) {
+        cmsat->new_vars(max_var - (long long)cmsat->nVars() + 1);
+    }
+}
+
+/* Zero separated and terminated stream of literals. Everything is validated
+ * before the first clause is added, so a bad array adds nothing. Trusted
+ * arrays (e.g. from get_small_clauses()) skip the validation pass and grow
+ * the variables clause by clause instead.
+ * Does not touch any Python object: may run with the GIL released. */
+template <typename S, typename T>
+static bool _add_clauses_from_array(
+    S *cmsat
+    , std::vector<Lit>& lits
+    , const T *array
+    , const size_t array_length
+    , const bool trusted
+    , std::string& err
+) {
+    if (array_length == 0) {
+        return true;
+    }
+    if (array[array_length - 1] != 0) {
+        err = "last clause not terminated by zero";
+        return false;
+    }
+
+    long long max_var = -1;
+    if (!trusted) {
+        for (size_t k = 0; k < array_length; k++) {
+            const long long val = array[k];
+            if (!lit_in_range(val)) {
+                err = lit_range_error(val);
+                return false;
+            }
+            max_var = std::max(max_var, std::llabs(val) - 1);
+        }
+        grow_vars(cmsat, max_var);
+    }
+
+    lits.clear();
+    for (size_t k = 0; k < array_length; k++) {
+        const long long val = array[k];
+        if (val != 0) {
+            lits.push_back(lit_from_int(val));
+            max_var = std::max(max_var, (long long)lits.back().var());
+            continue;
+        }
+        if (!lits.empty()) {
+            grow_vars(cmsat, max_var);
+            cmsat->add_clause(lits);
+            lits.clear();
+        }
+    }
+    return true;
+}
+
+/* CSR layout: clause i is literals[offsets[i]:offsets[i+1]], no terminators.
+ * Same contract as _add_clauses_from_array(). */
+template <typename S, typename T, typename O>
+static bool _add_clauses_from_csr(
+    S *cmsat
+    , std::vector<Lit>& lits
+    , const T *literals
+    , const size_t num_lits
+    , const O *offsets
+    , const size_t num_offsets
+    , const bool trusted
+    , std::string& err
+) {
+    long long max_var = -1;
+    if (!trusted) {
+        if (!check_csr_offsets(offsets, num_offsets, num_lits, err)) {
+            return false;
+        }
+        for (size_t k = 0; k < num_lits; k++) {
+            const long long val = literals[k];
+            if (val == 0) {
+                err = "non-zero integer expected";
+                return false;
+            }
+            if (!lit_in_range(val)) {
+                err = lit_range_error(val);
+                return false;
+            }
+            max_var = std::max(max_var, std::llabs(val) - 1);
+        }
+        grow_vars(cmsat, max_var);
+    }
+
+    for (size_t i = 0; i + 1 < num_offsets; i++) {
+        lits.clear();
+        for (size_t k = offsets[i]; k < (size_t)offsets[i + 1]; k++) {
+            lits.push_back(lit_from_int(literals[k]));
+            max_var = std::max(max_var, (long long)lits.back().var());
+        }
+        grow_vars(cmsat, max_var);
+        cmsat->add_clause(lits);
+    }
+    return true;
+}
+
+template <typename S>
+static int add_clauses_buffer(S *cmsat, std::vector<Lit>& lits, PyObject *clauses, const bool trusted)
+{
+    Py_buffer view;
+    const int itemsize = get_int_buffer(clauses, &view, "clause array");
+    if (itemsize == 0) {
+        return 0;
     }
-    Py_DECREF(typecode_bytes);
-    if (typecode != 'i' && typecode != 'l' && typecode != 'q') {
-        PyErr_Format(PyExc_ValueError, "invalid clause array: invalid typecode '%c'", typecode);
+
+    const size_t len = num_items(&view);
+    bool ok;
+    std::string err;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    ok = with_int_data(&view, [&](auto array) {
+        return _add_clauses_from_array(cmsat, lits, array, len, trusted, err);
+    });
+    Py_END_ALLOW_THREADS
+    PyBuffer_Release(&view);
+
+    if (!ok) {
+        PyErr_SetString(PyExc_ValueError, err.c_str());
         return 0;
     }
     return 1;
 }
 
-static int add_clauses_array(Solver *self, PyObject *clauses)
+template <typename S>
+static int add_clauses_csr(S *cmsat, std::vector<Lit>& lits, PyObject *literals, PyObject *offsets, const bool trusted)
 {
-    if (_check_array_typecode(clauses) == 0) {
+    Py_buffer lits_view;
+    Py_buffer offs_view;
+    if (get_int_buffer(literals, &lits_view, "literal array") == 0) {
         return 0;
     }
-    PyObject *py_itemsize = PyObject_GetAttrString(clauses, "itemsize");
-    if (py_itemsize == NULL) {
-        PyErr_SetString(PyExc_ValueError, "invalid clause array: itemsize is NULL");
+    if (get_int_buffer(offsets, &offs_view, "offset array") == 0) {
+        PyBuffer_Release(&lits_view);
         return 0;
     }
-    const long itemsize = PyLong_AsLong(py_itemsize);
-    Py_DECREF(py_itemsize);
-    if (itemsize < 0) {
-        PyErr_SetString(PyExc_ValueError, "invalid clause array: could not get itemsize");
+
+    const size_t num_lits = num_items(&lits_view);
+    const size_t num_offsets = num_items(&offs_view);
+    bool ok;
+    std::string err;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    ok = with_int_data(&lits_view, [&](auto literals) {
+        return with_int_data(&offs_view, [&](auto offs) {
+            return _add_clauses_from_csr(cmsat, lits,
+                literals, num_lits, offs, num_offsets, trusted, err);
+        });
+    });
+    Py_END_ALLOW_THREADS
+    PyBuffer_Release(&offs_view);
+    PyBuffer_Release(&lits_view);
+
+    if (!ok) {
+        PyErr_SetString(PyExc_ValueError, err.c_str());
         return 0;
     }
-    PyObject *buffer_info = PyObject_CallMethod(clauses, "buffer_info", NULL);
-    if (buffer_info == NULL) {
-        PyErr_SetString(PyExc_ValueError, "invalid clause array: buffer_info is NULL");
+    return 1;
+}
+
+/* Add the clauses of a Python iterable: they are converted with the GIL in
+ * chunks of about add_chunk_lits literals, each chunk then being added
+ * with the GIL released. Clauses before a malformed one are still added. */
+static const size_t add_chunk_lits = 1 << 16;
+
+static void add_chunk(SATSolver *cmsat, const std::vector<Lit>& chunk, std::vector<Lit>& lits)
+{
+    lits.clear();
+    for (const Lit lit: chunk) {
+        if (lit != lit_Undef) {
+            lits.push_back(lit);
+            continue;
+        }
+        cmsat->add_clause(lits);
+        lits.clear();
+    }
+}
+
+static int add_clauses_iterable(Solver *self, PyObject *clauses)
+{
+    PyObject *iterator = PyObject_GetIter(clauses);
+    if (iterator == NULL) {
+        PyErr_SetString(PyExc_TypeError, "iterable object expected");
         return 0;
     }
-    int ret = _add_clauses_from_buffer_info(self, buffer_info, itemsize);
-    Py_DECREF(buffer_info);
-    return ret;
+
+    std::vector<Lit> chunk;
+    PyObject *clause;
+    bool ok = true;
+    do {
+        clause = PyIter_Next(iterator);
+        if (clause != NULL) {
+            ok = parse_clause(self->cmsat, clause, chunk);
+            Py_DECREF(clause);
+            if (!ok) {
+                // drop the partial clause
+                while (!chunk.empty() && chunk.back() != lit_Undef) {
+                    chunk.pop_back();
+                }
+            } else {
+                chunk.push_back(lit_Undef);
+            }
+        }
+        if (chunk.size() >= add_chunk_lits || clause == NULL || !ok) {
+            Py_BEGIN_ALLOW_THREADS      /* release GIL */
+            add_chunk(self->cmsat, chunk, self->tmp_cl_lits);
+            Py_END_ALLOW_THREADS
+            chunk.clear();
+        }
+    } while (clause != NULL && ok);
+
+    Py_DECREF(iterator);
+    return ok && !PyErr_Occurred();
 }
 
 PyDoc_STRVAR(add_clauses_doc,
-"add_clauses(clauses)\n\
+"add_clauses(clauses, offsets=None, trusted=False)\n\
 Add iterable of clauses to the solver.\n\
 \n\
 :param clauses: List of clauses. Each clause contains literals (ints)\n\
-    Alternatively, this can be a flat array.array (typecode 'i', 'l', or 'q')\n\
-    of zero separated and terminated clauses of literals (ints).\n\
-:type clauses: <list> or <array.array>\n\
+    Alternatively, this can be any C-contiguous buffer of signed 32 or\n\
+    64 bit integers (array.array with typecode 'i', 'l' or 'q', numpy\n\
+    int32/int64 array, memoryview, ...) of zero separated and terminated\n\
+    clauses of literals. Raw bytes or mmap objects must be cast first,\n\
+    e.g. memoryview(data).cast('i'). Buffers are validated as a whole\n\
+    before any clause is added, and added with the GIL released. Lists\n\
+    are converted in chunks, each added with the GIL released.\n\
+:param offsets: (Optional) If given, clauses must be a buffer of non-zero\n\
+    literals without terminators, and offsets a buffer of len(clauses)+1\n\
+    integers such that clause i is clauses[offsets[i]:offsets[i+1]]\n\
+    (CSR layout). An empty range adds the empty clause.\n\
+:param trusted: Skip the validation of buffers known to be well formed,\n\
+    such as the ones returned by get_small_clauses(). Malformed trusted\n\
+    input is undefined behaviour.\n\
+:type clauses: <list> or <buffer>\n\
+:type offsets: <buffer>\n\
+:type trusted: <bool>\n\
 :return: None\n\
 :rtype: <None>"
 );
 
 static PyObject* add_clauses(Solver *self, PyObject *args, PyObject *kwds)
 {
-    static char const* kwlist[] = {"clauses", NULL};
+    static char const* kwlist[] = {"clauses", "offsets", "trusted", NULL};
     PyObject *clauses;
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O", const_cast<char**>(kwlist), &clauses)) {
+    PyObject *offsets = NULL;
+    int trusted = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|Op", const_cast<char**>(kwlist), &clauses, &offsets, &trusted)) {
         return NULL;
     }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+    self->have_model = false;
 
-    if (
-        PyObject_HasAttr(clauses, PyUnicode_FromString("buffer_info")) &&
-        PyObject_HasAttr(clauses, PyUnicode_FromString("typecode")) &&
-        PyObject_HasAttr(clauses, PyUnicode_FromString("itemsize"))
-    ) {
-        int ret = add_clauses_array(self, clauses);
-        if (ret == 0 || PyErr_Occurred()) {
-            return 0;
+    if (offsets != NULL && offsets != Py_None) {
+        if (!add_clauses_csr(self->cmsat, self->tmp_cl_lits, clauses, offsets, trusted)) {
+            return NULL;
         }
         Py_INCREF(Py_None);
         return Py_None;
     }
 
-    PyObject *iterator = PyObject_GetIter(clauses);
-    if (iterator == NULL) {
-        PyErr_SetString(PyExc_TypeError, "iterable object expected");
-        return NULL;
-    }
-
-    PyObject *clause;
-    while ((clause = PyIter_Next(iterator)) != NULL) {
-        _add_clause(self, clause);
-        /* release reference when done */
-        Py_DECREF(clause);
+    if (PyObject_CheckBuffer(clauses)) {
+        if (!add_clauses_buffer(self->cmsat, self->tmp_cl_lits, clauses, trusted)) {
+            return NULL;
+        }
+        Py_INCREF(Py_None);
+        return Py_None;
     }
 
-    /* release reference when done */
-    Py_DECREF(iterator);
-    if (PyErr_Occurred()) {
+    if (!add_clauses_iterable(self, clauses)) {
         return NULL;
     }
-
     Py_INCREF(Py_None);
     return Py_None;
 }
@@ -522,6 +1470,10 @@ static PyObject* add_xor_clause(Solver *self, PyObject *args, PyObject *kwds)
     if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO", const_cast<char**>(kwlist), &clause, &rhs)) {
         return NULL;
     }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+    self->have_model = false;
     if (!PyBool_Check(rhs)) {
         PyErr_SetString(PyExc_TypeError, "rhs must be boolean");
         return NULL;
@@ -539,127 +1491,2126 @@ static PyObject* add_xor_clause(Solver *self, PyObject *args, PyObject *kwds)
     return Py_None;
 }
 
-static PyObject* get_solution(SATSolver *cmsat)
-{
-    // Create tuple with the size of number of variables in model
-    unsigned max_idx = cmsat->nVars();
-    PyObject *tuple = PyTuple_New((Py_ssize_t) max_idx+1);
-    if (tuple == NULL) {
-        PyErr_SetString(PyExc_SystemError, "failed to create a tuple");
-        return NULL;
+/* XOR constraint i is over the variables vars[offsets[i]:offsets[i+1]], with
+ * right hand side rhs[i]. Same contract as _add_clauses_from_array(). */
+template <typename T, typename O, typename R>
+static bool _add_xor_clauses(
+    SATSolver *cmsat
+    , const T *vars
+    , const size_t num_vars
+    , const O *offsets
+    , const size_t num_offsets
+    , const R *rhs
+    , const size_t num_rhs
+    , std::string& err
+) {
+    if (!check_csr_offsets(offsets, num_offsets, num_vars, err)) {
+        return false;
+    }
+    if (num_rhs != num_offsets - 1) {
+        err = "rhs must have one item per XOR clause (len(offsets)-1)";
+        return false;
     }
 
-    Py_INCREF(Py_None);
-    PyTuple_SET_ITEM(tuple, (Py_ssize_t)0, Py_None);
-
-    PyObject *py_value = NULL;
-    lbool v;
-    for (unsigned i = 0; i < max_idx; i++) {
-        v = cmsat->get_model()[i];
+    long long max_var = -1;
+    for (size_t k = 0; k < num_vars; k++) {
+        const long long val = vars[k];
+        if (val <= 0) {
+            err = "XOR clause must contain only positive variables (not inverted literals)";
+            return false;
+        }
+        if (!lit_in_range(val)) {
+            err = lit_range_error(val);
+            return false;
+        }
+        max_var = std::max(max_var, val - 1);
+    }
+    grow_vars(cmsat, max_var);
 
-        if (v == l_True) {
-            py_value = Py_True;
-        } else if (v == l_False) {
-            py_value = Py_False;
-        } else if (v == l_Undef) {
-            py_value = Py_None;
-        } else {
-            // v can only be l_False, l_True, l_Undef
-            assert((v == l_False) || (v == l_True) || (v == l_Undef));
+    std::vector<uint32_t> xor_vars;
+    for (size_t i = 0; i < num_rhs; i++) {
+        xor_vars.clear();
+        for (size_t k = offsets[i]; k < (size_t)offsets[i + 1]; k++) {
+            xor_vars.push_back((uint32_t)(vars[k] - 1));
         }
-        Py_INCREF(py_value);
-        PyTuple_SET_ITEM(tuple, (Py_ssize_t)i+1, py_value);
+        cmsat->add_xor_clause(xor_vars, rhs[i] != 0);
     }
-    return tuple;
+    return true;
 }
 
-static PyObject* get_raw_solution(SATSolver *cmsat) {
+PyDoc_STRVAR(add_xor_clauses_doc,
+"add_xor_clauses(vars, offsets, rhs)\n\
+Add many XOR clauses at once, in CSR layout.\n\
+\n\
+:param vars: C-contiguous buffer of signed 32 or 64 bit integers holding\n\
+    the (positive) variables of all XOR clauses back to back.\n\
+:param offsets: Buffer of len(rhs)+1 integers such that XOR clause i is\n\
+    over vars[offsets[i]:offsets[i+1]].\n\
+:param rhs: Buffer of bool, 8, 32 or 64 bit integers: the right hand side\n\
+    of each XOR clause, True if non-zero.\n\
+    All buffers are validated before any clause is added, and the clauses\n\
+    are added with the GIL released.\n\
+:type vars: <buffer>\n\
+:type offsets: <buffer>\n\
+:type rhs: <buffer>\n\
+:return: None\n\
+:rtype: <None>"
+);
 
-    // Create tuple with the size of number of variables in model
-    unsigned max_idx = cmsat->nVars();
-    PyObject *tuple = PyTuple_New((Py_ssize_t) max_idx);
-    if (tuple == NULL) {
-        PyErr_SetString(PyExc_SystemError, "failed to create a tuple");
+static PyObject* add_xor_clauses(Solver *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"vars", "offsets", "rhs", NULL};
+    PyObject *vars;
+    PyObject *offsets;
+    PyObject *rhs;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OOO", const_cast<char**>(kwlist), &vars, &offsets, &rhs)) {
+        return NULL;
+    }
+    if (!check_not_busy(self)) {
         return NULL;
     }
+    self->have_model = false;
 
-    // Add each variable in model to the tuple
-    PyObject *py_value = NULL;
-    int sign;
-    for (long var = 0; var != (long)max_idx; var++) {
+    Py_buffer vars_view;
+    Py_buffer offs_view;
+    Py_buffer rhs_view;
+    if (get_int_buffer(vars, &vars_view, "variable array") == 0) {
+        return NULL;
+    }
+    if (get_int_buffer(offsets, &offs_view, "offset array") == 0) {
+        PyBuffer_Release(&vars_view);
+        return NULL;
+    }
+    if (get_int_buffer(rhs, &rhs_view, "rhs array", true) == 0) {
+        PyBuffer_Release(&offs_view);
+        PyBuffer_Release(&vars_view);
+        return NULL;
+    }
 
-        if (cmsat->get_model()[var] != l_Undef) {
+    const size_t num_vars = num_items(&vars_view);
+    const size_t num_offsets = num_items(&offs_view);
+    const size_t num_rhs = num_items(&rhs_view);
+    bool ok;
+    std::string err;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    ok = with_int_data(&vars_view, [&](auto vs) {
+        return with_int_data(&offs_view, [&](auto offs) {
+            return with_flag_data(&rhs_view, [&](auto rs) {
+                return _add_xor_clauses(self->cmsat, vs, num_vars, offs, num_offsets, rs, num_rhs, err);
+            });
+        });
+    });
+    Py_END_ALLOW_THREADS
+    PyBuffer_Release(&rhs_view);
+    PyBuffer_Release(&offs_view);
+    PyBuffer_Release(&vars_view);
 
-            sign = (cmsat->get_model()[var] == l_True) ? 1 : -1;
+    if (!ok) {
+        PyErr_SetString(PyExc_ValueError, err.c_str());
+        return NULL;
+    }
+    Py_INCREF(Py_None);
+    return Py_None;
+}
 
-            py_value = PyLong_FromLong((var + 1) * sign);
-            PyTuple_SET_ITEM(tuple, (Py_ssize_t)var, py_value);
+/* Clauses produced by the constraint encoders. Auxiliary variables are
+ * numbered after the solver's variables and created with a single
+ * new_vars() call by commit(). */
+struct Encoding {
+    uint32_t first_aux;
+    uint32_t num_aux = 0;
+    uint64_t num_clauses = 0;
+    uint64_t num_bnns = 0;
+    std::vector<Lit> cls; // each clause terminated by lit_Undef
+
+    explicit Encoding(const uint32_t first) : first_aux(first) {}
+
+    Lit new_aux()
+    {
+        return Lit(first_aux + num_aux++, false);
+    }
+
+    void add(std::initializer_list<Lit> lits)
+    {
+        cls.insert(cls.end(), lits);
+        cls.push_back(lit_Undef);
+        num_clauses++;
+    }
+
+    void add(const std::vector<Lit>& lits)
+    {
+        cls.insert(cls.end(), lits.begin(), lits.end());
+        cls.push_back(lit_Undef);
+        num_clauses++;
+    }
+
+    void commit(SATSolver *cmsat, std::vector<Lit>& tmp) const
+    {
+        if (num_aux > 0) {
+            cmsat->new_vars(num_aux);
+        }
+        tmp.clear();
+        for (const Lit lit: cls) {
+            if (lit == lit_Undef) {
+                cmsat->add_clause(tmp);
+                tmp.clear();
+            } else {
+                tmp.push_back(lit);
+            }
         }
     }
-    return tuple;
-}
+};
 
-PyDoc_STRVAR(nb_vars_doc,
-"nb_vars()\n\
-Return the number of literals in the solver.\n\
-\n\
-:return: Number of literals\n\
-:rtype: <int>"
-);
+/* Totalizer (Bailleux and Boufkhad) with at most cap outputs, out[i] being
+ * "more than i of lits are true". up adds sum > i -> out[i], down adds
+ * out[i] -> sum > i. */
+static std::vector<Lit> encode_totalizer(
+    Encoding& enc
+    , const std::vector<Lit>& lits
+    , const size_t cap
+    , const bool up
+    , const bool down
+) {
+    std::vector<std::vector<Lit> > nodes;
+    for (const Lit lit: lits) {
+        nodes.push_back({lit});
+    }
 
-static PyObject* nb_vars(Solver *self)
-{
-    return PyLong_FromLong(self->cmsat->nVars());
+    std::vector<Lit> cl;
+    while (nodes.size() > 1) {
+        std::vector<std::vector<Lit> > parents;
+        for (size_t i = 0; i + 1 < nodes.size(); i += 2) {
+            const std::vector<Lit>& a = nodes[i];
+            const std::vector<Lit>& b = nodes[i+1];
+            const size_t m = std::min(a.size() + b.size(), cap);
+            std::vector<Lit> out;
+            for (size_t j = 0; j < m; j++) {
+                out.push_back(enc.new_aux());
+            }
 
+            for (size_t alpha = 0; alpha <= a.size() && alpha <= m; alpha++) {
+                for (size_t beta = 0; beta <= b.size() && alpha + beta <= m; beta++) {
+                    const size_t sigma = alpha + beta;
+                    if (up && sigma > 0) {
+                        cl.clear();
+                        if (alpha > 0) cl.push_back(~a[alpha-1]);
+                        if (beta > 0) cl.push_back(~b[beta-1]);
+                        cl.push_back(out[sigma-1]);
+                        enc.add(cl);
+                    }
+                    if (down && sigma < m) {
+                        cl.clear();
+                        if (alpha < a.size()) cl.push_back(a[alpha]);
+                        if (beta < b.size()) cl.push_back(b[beta]);
+                        cl.push_back(~out[sigma]);
+                        enc.add(cl);
+                    }
+                }
+            }
+            parents.push_back(std::move(out));
+        }
+        if (nodes.size() % 2 == 1) {
+            parents.push_back(std::move(nodes.back()));
+        }
+        nodes.swap(parents);
+    }
+    return nodes[0];
 }
 
-/*
-static PyObject* nb_clauses(Solver *self)
+/* Sinz' sequential counter for sum(x) <= k, where 0 < k < len(x) */
+static void encode_seqcounter(Encoding& enc, const std::vector<Lit>& x, const size_t k)
 {
-    // Private attribute => need to make a public method
-    return PyInt_FromLong(self->cmsat->data->solvers.size());
-}*/
+    const size_t n = x.size();
+    std::vector<Lit> prev;
+    std::vector<Lit> cur;
+    for (size_t i = 0; i + 1 < n; i++) {
+        cur.clear();
+        for (size_t j = 0; j < k; j++) {
+            cur.push_back(enc.new_aux());
+        }
+        enc.add({~x[i], cur[0]});
+        if (i == 0) {
+            for (size_t j = 1; j < k; j++) {
+                enc.add({~cur[j]});
+            }
+        } else {
+            enc.add({~prev[0], cur[0]});
+            for (size_t j = 1; j < k; j++) {
+                enc.add({~x[i], ~prev[j-1], cur[j]});
+                enc.add({~prev[j], cur[j]});
+            }
+            enc.add({~x[i], ~prev[k-1]});
+        }
+        prev.swap(cur);
+    }
+    enc.add({~x[n-1], ~prev[k-1]});
+}
 
-static int parse_assumption_lits(PyObject* assumptions, SATSolver* cmsat, std::vector<Lit>& assumption_lits)
+static void encode_pairwise(Encoding& enc, const std::vector<Lit>& x)
 {
-    PyObject *iterator = PyObject_GetIter(assumptions);
-    if (iterator == NULL) {
-        PyErr_SetString(PyExc_TypeError, "interable object expected");
-        return 0;
+    for (size_t i = 0; i < x.size(); i++) {
+        for (size_t j = i+1; j < x.size(); j++) {
+            enc.add({~x[i], ~x[j]});
+        }
     }
+}
 
-    PyObject *lit;
-    while ((lit = PyIter_Next(iterator)) != NULL) {
-        long var;
-        bool sign;
-        int ret = convert_lit_to_sign_and_var(lit, var, sign);
-        Py_DECREF(lit);
-        if (!ret) {
-            Py_DECREF(iterator);
-            return 0;
-        }
+enum class CardEncoding {pairwise, seqcounter, totalizer, bnn};
 
-        if (var >= cmsat->nVars()) {
-            Py_DECREF(iterator);
-            PyErr_Format(PyExc_ValueError, "Variable %ld not used in clauses", var+1);
-            return 0;
+static int parse_card_encoding(const char *name, CardEncoding& encoding)
+{
+    static const struct {
+        const char *name;
+        CardEncoding encoding;
+    } encodings[] = {
+        {"pairwise", CardEncoding::pairwise},
+        {"seqcounter", CardEncoding::seqcounter},
+        {"totalizer", CardEncoding::totalizer},
+        {"bnn", CardEncoding::bnn},
+    };
+    for (const auto& e: encodings) {
+        if (strcmp(e.name, name) == 0) {
+            encoding = e.encoding;
+            return 1;
         }
-
-        assumption_lits.push_back(Lit(var, sign));
-    }
-    Py_DECREF(iterator);
-    if (PyErr_Occurred()) {
-        return 0;
     }
+    PyErr_SetString(PyExc_ValueError, "encoding must be 'totalizer', 'seqcounter', 'pairwise' or 'bnn'");
+    return 0;
+}
 
-    return 1;
+static PyObject* encoding_result(const Encoding& enc)
+{
+    return Py_BuildValue("{s:I,s:K,s:K}",
+        "aux_vars", enc.num_aux,
+        "clauses", (unsigned long long)enc.num_clauses,
+        "bnns", (unsigned long long)enc.num_bnns);
 }
 
-PyDoc_STRVAR(solve_doc,
-"solve(assumptions=None, verbose=None, time_limit=None, confl_limit=None)\n\
-Solve the system of equations that have been added with add_clause();\n\
-\n\
-.. example:: \n\
+/* lo <= sum(lits) <= hi, with lo and/or hi given by k */
+static PyObject* add_cardinality(
+    Solver *self
+    , PyObject *args
+    , PyObject *kwds
+    , const bool at_least
+    , const bool at_most
+) {
+    static char const* kwlist[] = {"lits", "k", "encoding", NULL};
+    PyObject *lits_obj;
+    Py_ssize_t k;
+    const char *encoding_name = "totalizer";
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "On|s", const_cast<char**>(kwlist), &lits_obj, &k, &encoding_name)) {
+        return NULL;
+    }
+    CardEncoding encoding;
+    if (!parse_card_encoding(encoding_name, encoding) || !check_not_busy(self)) {
+        return NULL;
+    }
+
+    std::vector<Lit> x;
+    if (!parse_clause(self->cmsat, lits_obj, x)) {
+        return NULL;
+    }
+    self->have_model = false;
+
+    const Py_ssize_t n = x.size();
+    const Py_ssize_t lo = std::max<Py_ssize_t>(at_least ? k : 0, 0);
+    const Py_ssize_t hi = std::min<Py_ssize_t>(at_most ? k : n, n);
+    const bool unsat = lo > n || hi < 0;
+
+    // what the encoders get after the trivial cases: 1 < lo < n, 0 < hi < n
+    const bool need_lo = !unsat && hi > 0 && lo > 1 && lo < n;
+    const bool need_hi = !unsat && lo < n && hi > 0 && hi < n;
+    if (encoding == CardEncoding::pairwise && ((need_hi && hi != 1) || (need_lo && lo != n-1))) {
+        PyErr_SetString(PyExc_ValueError, "the pairwise encoding only supports at most one true (or false) literal");
+        return NULL;
+    }
+    if (encoding == CardEncoding::bnn && self->num_threads != 1 && (need_lo || need_hi)) {
+        PyErr_SetString(PyExc_ValueError, "the bnn encoding requires a single-threaded solver");
+        return NULL;
+    }
+
+    std::vector<Lit> neg_x;
+    for (const Lit lit: x) {
+        neg_x.push_back(~lit);
+    }
+
+    Encoding enc(self->cmsat->nVars());
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    if (unsat) {
+        enc.add({});
+    } else if (hi == 0) {
+        for (const Lit lit: neg_x) {
+            enc.add({lit});
+        }
+    } else if (lo == n) {
+        for (const Lit lit: x) {
+            enc.add({lit});
+        }
+    } else {
+        if (lo == 1) {
+            enc.add(x);
+        }
+        switch (encoding) {
+            case CardEncoding::pairwise:
+                if (need_hi) encode_pairwise(enc, x);
+                if (need_lo) encode_pairwise(enc, neg_x);
+                break;
+            case CardEncoding::seqcounter:
+                if (need_hi) encode_seqcounter(enc, x, hi);
+                if (need_lo) encode_seqcounter(enc, neg_x, n - lo);
+                break;
+            case CardEncoding::totalizer:
+                if (need_hi || need_lo) {
+                    const std::vector<Lit> out = encode_totalizer(
+                        enc, x, need_hi ? hi+1 : lo, need_hi, need_lo);
+                    if (need_hi) enc.add({~out[hi]});
+                    if (need_lo) enc.add({out[lo-1]});
+                }
+                break;
+            case CardEncoding::bnn:
+                // BNN constraints are sum(lits) >= cutoff
+                if (need_lo) {
+                    self->cmsat->add_bnn_clause(x, lo);
+                    enc.num_bnns++;
+                }
+                if (need_hi) {
+                    self->cmsat->add_bnn_clause(neg_x, n - hi);
+                    enc.num_bnns++;
+                }
+                break;
+        }
+    }
+    enc.commit(self->cmsat, self->tmp_cl_lits);
+    Py_END_ALLOW_THREADS
+
+    return encoding_result(enc);
+}
+
+#define CARDINALITY_DOC(name, relation) \
+name "(lits, k, encoding='totalizer')\n\
+Add the constraint that " relation " k of the literals are true.\n\
+\n\
+:param lits: Literals (ints), repeated ones count repeatedly.\n\
+:param k: The bound.\n\
+:param encoding: 'totalizer', 'seqcounter' (sequential counter),\n\
+    'pairwise' (only for at most one literal being true or false) or\n\
+    'bnn' (native constraint propagated by the engine, single-threaded\n\
+    solvers only). The clauses and auxiliary variables are created in\n\
+    the engine with the GIL released.\n\
+:return: The size of the encoding: a dict of the number of 'aux_vars',\n\
+    'clauses' and 'bnns' (native constraints) added.\n\
+:rtype: <dict>"
+
+PyDoc_STRVAR(add_atmost_doc, CARDINALITY_DOC("add_atmost", "at most"));
+PyDoc_STRVAR(add_atleast_doc, CARDINALITY_DOC("add_atleast", "at least"));
+PyDoc_STRVAR(add_exactly_doc, CARDINALITY_DOC("add_exactly", "exactly"));
+
+static PyObject* add_atmost(Solver *self, PyObject *args, PyObject *kwds)
+{
+    return add_cardinality(self, args, kwds, false, true);
+}
+
+static PyObject* add_atleast(Solver *self, PyObject *args, PyObject *kwds)
+{
+    return add_cardinality(self, args, kwds, true, false);
+}
+
+static PyObject* add_exactly(Solver *self, PyObject *args, PyObject *kwds)
+{
+    return add_cardinality(self, args, kwds, true, true);
+}
+
+/* Reduced ordered BDD of sum(w[i]*x[i]) <= bound with positive weights in
+ * descending order, as in MiniSat+, built with the interval technique of Abio
+ * et al. (CP 2012): node (i, rest) holds iff the literals from i on weigh at
+ * most rest, and every node keeps the interval of rests with that same
+ * function, so equivalent nodes are shared instead of one per distinct rest.
+ * Terminal nodes get no variable. Some weights have no small BDD, so give up
+ * past max_nodes nodes and return false. */
+static const uint32_t pb_bdd_max_nodes = 1 << 22;
+
+static bool encode_pb_bdd(
+    Encoding& enc
+    , const std::vector<Lit>& x
+    , const std::vector<int64_t>& w
+    , const int64_t bound
+) {
+    const size_t n = x.size();
+    std::vector<int64_t> suffix(n+1, 0);
+    for (size_t i = n; i-- > 0;) {
+        suffix[i] = suffix[i+1] + w[i];
+    }
+
+    // node and the interval [lo, hi] of rests it stands for
+    struct Node {
+        int64_t lo;
+        int64_t hi;
+        Lit lit; // lit_Undef: true, lit_Error: false
+    };
+    const int64_t min_rest = std::numeric_limits<int64_t>::min();
+    const int64_t max_rest = std::numeric_limits<int64_t>::max();
+    // per level, the nodes built so far keyed by lo; their intervals are disjoint
+    std::vector<std::map<int64_t, Node> > levels(n+1);
+    auto find = [&](const size_t i, const int64_t rest, Node& node) {
+        if (rest < 0) {
+            node = {min_rest, -1, lit_Error};
+            return true;
+        }
+        if (rest >= suffix[i]) {
+            node = {suffix[i], max_rest, lit_Undef};
+            return true;
+        }
+        auto it = levels[i].upper_bound(rest);
+        if (it == levels[i].begin() || (--it)->second.hi < rest) {
+            return false;
+        }
+        node = it->second;
+        return true;
+    };
+
+    // depth-first with an explicit stack, n may be large. Each frame builds
+    // node (i, rest) from its child without x[i], then the one with x[i].
+    struct Frame {
+        size_t i;
+        int64_t rest;
+        int stage;
+        Node without;
+    };
+    std::vector<Frame> stack;
+    stack.push_back({0, bound, 0, Node()});
+    Node ret;
+    while (!stack.empty()) {
+        Frame& f = stack.back();
+        const size_t i = f.i;
+        const int64_t rest = f.rest;
+        if (f.stage == 0) {
+            if (find(i, rest, ret)) {
+                stack.pop_back();
+                continue;
+            }
+            f.stage = 1;
+            stack.push_back({i+1, rest, 0, Node()});
+            continue;
+        }
+        if (f.stage == 1) {
+            f.without = ret;
+            f.stage = 2;
+            stack.push_back({i+1, rest - w[i], 0, Node()});
+            continue;
+        }
+
+        const Node without = f.without;
+        const Node with = ret;
+        stack.pop_back();
+        Node node;
+        node.lo = std::max(without.lo, with.lo + w[i]);
+        node.hi = std::min(without.hi, with.hi > max_rest - w[i] ? max_rest : with.hi + w[i]);
+        if (with.lit == without.lit) {
+            node.lit = without.lit;
+        } else {
+            // rest >= 0 here, so the child without x[i] is never false.
+            // It allows at least what the child with x[i] does, so one
+            // implication covers both branches.
+            if (enc.num_aux >= pb_bdd_max_nodes) {
+                return false;
+            }
+            node.lit = enc.new_aux();
+            if (with.lit == lit_Error) {
+                enc.add({~node.lit, ~x[i]});
+            } else if (with.lit != lit_Undef) {
+                enc.add({~node.lit, ~x[i], with.lit});
+            }
+            if (without.lit != lit_Undef) {
+                enc.add({~node.lit, without.lit});
+            }
+        }
+        levels[i][node.lo] = node;
+        ret = node;
+    }
+
+    if (ret.lit == lit_Error) {
+        enc.add({});
+    } else if (ret.lit != lit_Undef) {
+        enc.add({ret.lit});
+    }
+    return true;
+}
+
+static int parse_weights(PyObject *weights, std::vector<int64_t>& w)
+{
+    PyObject *iterator = PyObject_GetIter(weights);
+    if (iterator == NULL) {
+        PyErr_SetString(PyExc_TypeError, "iterable object expected");
+        return 0;
+    }
+    PyObject *weight;
+    while ((weight = PyIter_Next(iterator)) != NULL) {
+        if (!IS_INT(weight)) {
+            PyErr_SetString(PyExc_TypeError, "integer expected !");
+            Py_DECREF(weight);
+            Py_DECREF(iterator);
+            return 0;
+        }
+        w.push_back(PyLong_AsLongLong(weight));
+        Py_DECREF(weight);
+        if (PyErr_Occurred()) {
+            Py_DECREF(iterator);
+            return 0;
+        }
+    }
+    Py_DECREF(iterator);
+    return PyErr_Occurred() ? 0 : 1;
+}
+
+PyDoc_STRVAR(add_pb_doc,
+"add_pb(lits, weights, bound)\n\
+Add the pseudo-Boolean constraint sum(weights[i] * lits[i]) <= bound,\n\
+where a literal counts 1 if true and 0 if false. Weights may be negative,\n\
+so '>=' is expressed by negating the weights and the bound. The constraint\n\
+is encoded as a reduced BDD in the engine with the GIL released, one\n\
+auxiliary variable per distinct sub-constraint. This is small for most\n\
+constraints, but can be exponential in len(lits) for some weights:\n\
+ValueError is raised past 4M variables, and nothing is added.\n\
+\n\
+:param lits: Literals (ints).\n\
+:param weights: One integer weight per literal.\n\
+:param bound: The bound.\n\
+:return: The size of the encoding: a dict of the number of 'aux_vars',\n\
+    'clauses' and 'bnns' (always 0) added.\n\
+:rtype: <dict>"
+);
+
+static PyObject* add_pb(Solver *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"lits", "weights", "bound", NULL};
+    PyObject *lits_obj;
+    PyObject *weights_obj;
+    long long bound;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OOL", const_cast<char**>(kwlist), &lits_obj, &weights_obj, &bound)) {
+        return NULL;
+    }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+
+    std::vector<Lit> lits;
+    std::vector<int64_t> weights;
+    if (!parse_weights(weights_obj, weights) || !parse_clause(self->cmsat, lits_obj, lits)) {
+        return NULL;
+    }
+    if (lits.size() != weights.size()) {
+        PyErr_SetString(PyExc_ValueError, "lits and weights must have the same length");
+        return NULL;
+    }
+    self->have_model = false;
+
+    // w*l == |w|*~l - |w| for w < 0: make all weights positive
+    std::vector<std::pair<int64_t, Lit> > terms;
+    int64_t rest = bound;
+    int64_t total = 0;
+    for (size_t i = 0; i < lits.size(); i++) {
+        const int64_t w = weights[i];
+        if (w == 0) {
+            continue;
+        }
+        if (w == std::numeric_limits<int64_t>::min()
+            || (w < 0 && __builtin_sub_overflow(rest, w, &rest))
+            || __builtin_add_overflow(total, w < 0 ? -w : w, &total))
+        {
+            PyErr_SetString(PyExc_OverflowError, "weights and bound must sum to a 64 bit integer");
+            return NULL;
+        }
+        terms.push_back({w < 0 ? -w : w, w < 0 ? ~lits[i] : lits[i]});
+    }
+
+    Encoding enc(self->cmsat->nVars());
+    bool encoded = true;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    if (rest < 0) {
+        enc.add({});
+    } else if (total > rest) {
+        std::sort(terms.begin(), terms.end(),
+            [](const std::pair<int64_t, Lit>& a, const std::pair<int64_t, Lit>& b) {
+                return a.first > b.first;
+            });
+        std::vector<Lit> x;
+        std::vector<int64_t> w;
+        for (const auto& term: terms) {
+            if (term.first > rest) {
+                // too heavy on its own
+                enc.add({~term.second});
+            } else {
+                w.push_back(term.first);
+                x.push_back(term.second);
+            }
+        }
+        encoded = encode_pb_bdd(enc, x, w, rest);
+    }
+    if (encoded) {
+        enc.commit(self->cmsat, self->tmp_cl_lits);
+    }
+    Py_END_ALLOW_THREADS
+    if (!encoded) {
+        PyErr_Format(PyExc_ValueError, "the constraint needs more than %u BDD nodes, "
+            "split it or use smaller weights", pb_bdd_max_nodes);
+        return NULL;
+    }
+
+    return encoding_result(enc);
+}
+
+// Solver facade handed to DimacsParser, counting what the parser adds
+struct DimacsSink {
+    SATSolver *cmsat;
+    uint64_t clauses = 0;
+    uint64_t xors = 0;
+
+    uint32_t nVars() const { return cmsat->nVars(); }
+    void new_var() { cmsat->new_var(); }
+    void new_vars(const size_t n) { cmsat->new_vars(n); }
+    bool add_clause(const std::vector<Lit>& lits) {
+        clauses++;
+        return cmsat->add_clause(lits);
+    }
+    bool add_xor_clause(const std::vector<uint32_t>& vars, const bool rhs) {
+        xors++;
+        return cmsat->add_xor_clause(vars, rhs);
+    }
+};
+
+// StreamBuffer source pulling chunks from a Python file object. It is called
+// with the GIL released, so each chunk takes it back for the read() call. On
+// error the exception is left set and EOF is reported to the parser.
+struct PyFileSource {
+    PyObject *fileobj;
+    bool failed;
+};
+
+struct PyFileRead {
+    static int read(void* buf, size_t num, size_t count, PyFileSource* in)
+    {
+        if (in->failed) {
+            return 0;
+        }
+        const Py_ssize_t want = num*count;
+        Py_ssize_t got = -1;
+        PyGILState_STATE gstate = PyGILState_Ensure();
+        PyObject *chunk = PyObject_CallMethod(in->fileobj, "read", "n", want);
+        if (chunk != NULL) {
+            Py_buffer view;
+            if (PyUnicode_Check(chunk)) {
+                PyErr_SetString(PyExc_TypeError, "file object must be opened in binary mode");
+            } else if (PyObject_GetBuffer(chunk, &view, PyBUF_SIMPLE) == 0) {
+                if (view.len > want) {
+                    PyErr_SetString(PyExc_ValueError, "read() returned more bytes than requested");
+                } else {
+                    memcpy(buf, view.buf, view.len);
+                    got = view.len;
+                }
+                PyBuffer_Release(&view);
+            }
+            Py_DECREF(chunk);
+        }
+        in->failed = (got < 0);
+        PyGILState_Release(gstate);
+        return in->failed ? 0 : (int)got;
+    }
+};
+
+template<class C, class T>
+static bool parse_dimacs(DimacsSink& sink, T input, const bool strict, const int verbose)
+{
+    DimacsParser<C, DimacsSink> parser(&sink, NULL, verbose);
+    return parser.parse_DIMACS(input, strict);
+}
+
+static bool read_dimacs_fileobj(Solver *self, DimacsSink& sink, PyObject *fileobj, const bool strict)
+{
+    PyFileSource source = {fileobj, false};
+    bool ok;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    ok = parse_dimacs<StreamBuffer<PyFileSource*, PyFileRead> >(sink, &source, strict, self->verbose);
+    Py_END_ALLOW_THREADS
+    return ok && !source.failed;
+}
+
+#ifndef USE_ZLIB
+// Built without zlib: let Python's gzip module inflate the chunks
+static bool read_dimacs_gzip(Solver *self, DimacsSink& sink, PyObject *path, const bool strict)
+{
+    PyObject *gzip = PyImport_ImportModule("gzip");
+    if (gzip == NULL) {
+        return false;
+    }
+    PyObject *gzfile = PyObject_CallMethod(gzip, "open", "Os", path, "rb");
+    Py_DECREF(gzip);
+    if (gzfile == NULL) {
+        return false;
+    }
+
+    bool ok = read_dimacs_fileobj(self, sink, gzfile, strict);
+    PyObject *res = PyObject_CallMethod(gzfile, "close", NULL);
+    Py_DECREF(gzfile);
+    if (res == NULL) {
+        return false;
+    }
+    Py_DECREF(res);
+    return ok;
+}
+#endif
+
+static bool read_dimacs_path(Solver *self, DimacsSink& sink, PyObject *path, const bool strict)
+{
+    PyObject *fsname;
+    if (!PyUnicode_FSConverter(path, &fsname)) {
+        return false;
+    }
+
+    #ifdef USE_ZLIB
+    // gzopen() reads plain files transparently
+    gzFile in = gzopen(PyBytes_AS_STRING(fsname), "rb");
+    #else
+    FILE *in = fopen(PyBytes_AS_STRING(fsname), "rb");
+    #endif
+    Py_DECREF(fsname);
+    if (in == NULL) {
+        PyErr_SetFromErrnoWithFilenameObject(PyExc_OSError, path);
+        return false;
+    }
+
+    bool ok;
+    #ifdef USE_ZLIB
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    ok = parse_dimacs<StreamBuffer<gzFile, GZ> >(sink, in, strict, self->verbose);
+    gzclose(in);
+    Py_END_ALLOW_THREADS
+    #else
+    const int c1 = fgetc(in);
+    const int c2 = fgetc(in);
+    if (c1 == 0x1f && c2 == 0x8b) {
+        fclose(in);
+        return read_dimacs_gzip(self, sink, path, strict);
+    }
+    rewind(in);
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    ok = parse_dimacs<StreamBuffer<FILE*, FN> >(sink, in, strict, self->verbose);
+    fclose(in);
+    Py_END_ALLOW_THREADS
+    #endif
+
+    return ok;
+}
+
+PyDoc_STRVAR(read_dimacs_doc,
+"read_dimacs(path_or_fileobj, strict=False)\n\
+Parse a DIMACS CNF file and add its clauses and XOR ('x') clauses to the\n\
+solver. Parsing is native and runs with the GIL released.\n\
+\n\
+:param path_or_fileobj: Path of a plain or gzip compressed file, or a\n\
+    binary file-like object (pipe, io.BytesIO, ...) read in chunks.\n\
+:param strict: Reject files without a 'p cnf' header and variables\n\
+    beyond the header's count.\n\
+:return: Parse statistics: 'vars' (variables in the solver afterwards),\n\
+    'clauses', 'xors' and 'seconds'.\n\
+:rtype: <dict>"
+);
+
+static PyObject* read_dimacs(Solver *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"path_or_fileobj", "strict", NULL};
+    PyObject *source;
+    int strict = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|p", const_cast<char**>(kwlist), &source, &strict)) {
+        return NULL;
+    }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+    self->have_model = false;
+
+    DimacsSink sink;
+    sink.cmsat = self->cmsat;
+    const auto start = std::chrono::steady_clock::now();
+    bool ok;
+    if (PyObject_HasAttrString(source, "read")) {
+        ok = read_dimacs_fileobj(self, sink, source, strict);
+    } else {
+        ok = read_dimacs_path(self, sink, source, strict);
+    }
+    const std::chrono::duration<double> elapsed = std::chrono::steady_clock::now() - start;
+
+    if (!ok) {
+        if (!PyErr_Occurred()) {
+            PyErr_SetString(PyExc_ValueError, "malformed DIMACS input (details were printed to stderr)");
+        }
+        return NULL;
+    }
+
+    return Py_BuildValue("{s:I,s:K,s:K,s:d}",
+        "vars", self->cmsat->nVars(),
+        "clauses", (unsigned long long)sink.clauses,
+        "xors", (unsigned long long)sink.xors,
+        "seconds", elapsed.count());
+}
+
+static PyObject* get_solution(SATSolver *cmsat)
+{
+    // Create tuple with the size of number of variables in model
+    unsigned max_idx = cmsat->nVars();
+    PyObject *tuple = PyTuple_New((Py_ssize_t) max_idx+1);
+    if (tuple == NULL) {
+        PyErr_SetString(PyExc_SystemError, "failed to create a tuple");
+        return NULL;
+    }
+
+    Py_INCREF(Py_None);
+    PyTuple_SET_ITEM(tuple, (Py_ssize_t)0, Py_None);
+
+    PyObject *py_value = NULL;
+    lbool v;
+    for (unsigned i = 0; i < max_idx; i++) {
+        v = cmsat->get_model()[i];
+
+        if (v == l_True) {
+            py_value = Py_True;
+        } else if (v == l_False) {
+            py_value = Py_False;
+        } else if (v == l_Undef) {
+            py_value = Py_None;
+        } else {
+            // v can only be l_False, l_True, l_Undef
+            assert((v == l_False) || (v == l_True) || (v == l_Undef));
+        }
+        Py_INCREF(py_value);
+        PyTuple_SET_ITEM(tuple, (Py_ssize_t)i+1, py_value);
+    }
+    return tuple;
+}
+
+static PyObject* get_raw_solution(SATSolver *cmsat) {
+
+    // Create tuple with the size of number of variables in model
+    unsigned max_idx = cmsat->nVars();
+    PyObject *tuple = PyTuple_New((Py_ssize_t) max_idx);
+    if (tuple == NULL) {
+        PyErr_SetString(PyExc_SystemError, "failed to create a tuple");
+        return NULL;
+    }
+
+    // Add each variable in model to the tuple
+    PyObject *py_value = NULL;
+    int sign;
+    for (long var = 0; var != (long)max_idx; var++) {
+
+        if (cmsat->get_model()[var] != l_Undef) {
+
+            sign = (cmsat->get_model()[var] == l_True) ? 1 : -1;
+
+            py_value = PyLong_FromLong((var + 1) * sign);
+            PyTuple_SET_ITEM(tuple, (Py_ssize_t)var, py_value);
+        }
+    }
+    return tuple;
+}
+
+/* Create a typed memoryview over a fresh, uninitialised bytearray of `n`
+ * items of `itemsize` bytes, and return a pointer to its storage in `data`.
+ * The view keeps the bytearray alive and prevents it from being resized, so
+ * `data` stays valid. numpy.frombuffer() gives a zero-copy view of it. */
+static PyObject* new_array(const char *format, const size_t itemsize, const size_t n, void **data)
+{
+    PyObject *bytes = PyByteArray_FromStringAndSize(NULL, (Py_ssize_t)(n * itemsize));
+    if (bytes == NULL) {
+        return NULL;
+    }
+    *data = PyByteArray_AS_STRING(bytes);
+
+    PyObject *raw = PyMemoryView_FromObject(bytes);
+    Py_DECREF(bytes);
+    if (raw == NULL) {
+        return NULL;
+    }
+    PyObject *view = PyObject_CallMethod(raw, "cast", "s", format);
+    Py_DECREF(raw);
+    return view;
+}
+
+template <typename T>
+static PyObject* array_from(const char *format, const T *src, const size_t n)
+{
+    T *data;
+    PyObject *arr = new_array(format, sizeof(T), n, (void**)&data);
+    if (arr != NULL && n > 0) {
+        memcpy(data, src, n * sizeof(T));
+    }
+    return arr;
+}
+
+static inline int8_t lbool_to_int8(const lbool val)
+{
+    return (val == l_True) - (val == l_False);
+}
+
+static inline int32_t lit_to_int(const Lit lit)
+{
+    return lit.sign() ? -(int32_t)(lit.var()+1) : (int32_t)(lit.var()+1);
+}
+
+PyDoc_STRVAR(get_small_clauses_doc,
+"get_small_clauses(max_len, max_glue, red=True, simplified=False, csr=False)\n\
+Export the unit, binary and short clauses of the solver in one call.\n\
+\n\
+:param max_len: Longest clause exported, at least 2. Units and binaries\n\
+    are always exported.\n\
+:param max_glue: Highest glue of exported learnt clauses.\n\
+:param red: Export learnt (redundant) clauses, else the irredundant ones.\n\
+:param simplified: Export the irredundant clauses over the simplified\n\
+    (internal) variables. Requires red=False.\n\
+:param csr: Return the clauses in CSR layout instead of zero terminated.\n\
+:return: An int32 memoryview of zero terminated clauses, or with csr=True\n\
+    a tuple (literals int32, offsets int64) as accepted by add_clauses().\n\
+    Both can be added to another solver with add_clauses(..., trusted=True).\n\
+    When the solver is already unsatisfiable a single empty clause is\n\
+    returned, which only the CSR layout can add back.\n\
+:rtype: <memoryview> or <tuple>"
+);
+
+/* The engine exits the process when asked for the simplified CNF or the
+ * clause incidence while BVA-introduced variables exist */
+static int check_no_bva_vars(Solver *self, const char *what = "the simplified CNF")
+{
+    if (self->cmsat->get_num_bva_vars() != 0) {
+        PyErr_Format(PyExc_RuntimeError, "%s is not available once BVA added "
+            "variables, create the solver with no_bva=True", what);
+        return 0;
+    }
+    return 1;
+}
+
+static PyObject* get_small_clauses(Solver *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"max_len", "max_glue", "red", "simplified", "csr", NULL};
+    unsigned max_len;
+    unsigned max_glue;
+    int red = 1;
+    int simplified = 0;
+    int csr = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "II|ppp", const_cast<char**>(kwlist),
+        &max_len, &max_glue, &red, &simplified, &csr))
+    {
+        return NULL;
+    }
+    if (max_len < 2) {
+        PyErr_SetString(PyExc_ValueError, "max_len must be at least 2");
+        return NULL;
+    }
+    if (red && simplified) {
+        PyErr_SetString(PyExc_ValueError, "simplified clauses can only be exported with red=False");
+        return NULL;
+    }
+    if (!check_not_busy(self) || (simplified && !check_no_bva_vars(self))) {
+        return NULL;
+    }
+
+    // all clauses in one go, each terminated by lit_Undef
+    std::vector<Lit> cls;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    self->cmsat->start_getting_small_clauses(max_len, max_glue, red, false, simplified);
+    self->cmsat->get_next_small_clause(cls, true);
+    self->cmsat->end_getting_small_clauses();
+    Py_END_ALLOW_THREADS
+
+    if (!csr) {
+        int32_t *data;
+        PyObject *flat = new_array("i", sizeof(int32_t), cls.size(), (void**)&data);
+        if (flat == NULL) {
+            return NULL;
+        }
+        for (const Lit lit: cls) {
+            *data++ = (lit == lit_Undef) ? 0 : lit_to_int(lit);
+        }
+        return flat;
+    }
+
+    const size_t num_cls = std::count(cls.begin(), cls.end(), lit_Undef);
+    int32_t *lits;
+    int64_t *offs;
+    PyObject *lits_arr = new_array("i", sizeof(int32_t), cls.size() - num_cls, (void**)&lits);
+    PyObject *offs_arr = lits_arr ? new_array("q", sizeof(int64_t), num_cls + 1, (void**)&offs) : NULL;
+    if (offs_arr == NULL) {
+        Py_XDECREF(lits_arr);
+        return NULL;
+    }
+    int64_t at = 0;
+    *offs++ = 0;
+    for (const Lit lit: cls) {
+        if (lit == lit_Undef) {
+            *offs++ = at;
+        } else {
+            lits[at++] = lit_to_int(lit);
+        }
+    }
+    return Py_BuildValue("(NN)", lits_arr, offs_arr);
+}
+
+PyDoc_STRVAR(export_irred_clauses_doc,
+"export_irred_clauses()\n\
+Export the irredundant clauses of the simplified formula, e.g. after\n\
+simplify(), to solve it elsewhere.\n\
+\n\
+    >>> clauses, nvars, var_map = s.export_irred_clauses()\n\
+    >>> worker = Solver()\n\
+    >>> worker.add_clauses(clauses, trusted=True)\n\
+    >>> sat, m = worker.solve()\n\
+    >>> value = lambda v: m[abs(var_map[v])] == (var_map[v] > 0)\n\
+\n\
+:return: A tuple (clauses, nvars, var_map). clauses is an int32 memoryview\n\
+    of zero terminated clauses over the variables 1..nvars. var_map is an\n\
+    int32 memoryview indexed by the variables of this solver (index 0 is\n\
+    unused): var_map[v] is the literal of the exported formula that is\n\
+    equivalent to v, or 0 if v was eliminated and only this solver can\n\
+    reconstruct its value. Variables set by simplification map to an extra\n\
+    variable that is forced True by a unit clause. If the formula is already\n\
+    unsatisfiable, clauses is [1, 0, -1, 0] over nvars=1 and var_map is all\n\
+    0.\n\
+:rtype: <tuple>"
+);
+
+static PyObject* export_irred_clauses(Solver *self)
+{
+    if (!check_not_busy(self) || !check_no_bva_vars(self)) {
+        return NULL;
+    }
+
+    // the engine exports the empty clause as a bare terminator, which
+    // add_clauses() skips, so give an unsatisfiable formula instead
+    if (!self->cmsat->okay()) {
+        const int32_t unsat[] = {1, 0, -1, 0};
+        PyObject *flat = array_from("i", unsat, 4);
+        if (flat == NULL) {
+            return NULL;
+        }
+        int32_t *map_data;
+        const size_t map_len = (size_t)self->cmsat->nVars() + 1;
+        PyObject *map = new_array("i", sizeof(int32_t), map_len, (void**)&map_data);
+        if (map == NULL) {
+            Py_DECREF(flat);
+            return NULL;
+        }
+        memset(map_data, 0, map_len * sizeof(int32_t));
+        return Py_BuildValue("(NIN)", flat, 1u, map);
+    }
+
+    std::vector<Lit> cls;
+    std::vector<Lit> var_map;
+    uint32_t nvars;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    self->cmsat->start_getting_small_clauses(
+        std::numeric_limits<uint32_t>::max(), std::numeric_limits<uint32_t>::max(), false, false, true);
+    self->cmsat->get_next_small_clause(cls, true);
+    self->cmsat->end_getting_small_clauses();
+    nvars = self->cmsat->simplified_nvars();
+    var_map = self->cmsat->get_simplified_var_map();
+    Py_END_ALLOW_THREADS
+
+    // the extra TRUE variable is only emitted when something maps to it
+    bool have_true = false;
+    for (const Lit lit: var_map) {
+        have_true = have_true || (lit != lit_Undef && lit.var() == nvars);
+    }
+
+    int32_t *data;
+    PyObject *flat = new_array("i", sizeof(int32_t), cls.size() + (have_true ? 2 : 0), (void**)&data);
+    if (flat == NULL) {
+        return NULL;
+    }
+    for (const Lit lit: cls) {
+        *data++ = (lit == lit_Undef) ? 0 : lit_to_int(lit);
+    }
+    if (have_true) {
+        *data++ = nvars + 1;
+        *data++ = 0;
+    }
+
+    int32_t *map_data;
+    PyObject *map = new_array("i", sizeof(int32_t), var_map.size() + 1, (void**)&map_data);
+    if (map == NULL) {
+        Py_DECREF(flat);
+        return NULL;
+    }
+    *map_data++ = 0;
+    for (const Lit lit: var_map) {
+        *map_data++ = (lit == lit_Undef) ? 0 : lit_to_int(lit);
+    }
+
+    return Py_BuildValue("(NIN)", flat, nvars + (have_true ? 1 : 0), map);
+}
+
+/* Copy per-variable (lead = 1) or per-literal (lead = 2) engine data into a
+ * fresh array of n items, leaving the leading items unused so that arr[var]
+ * works as with models. Variables the engine does not know yet are 0. */
+template <typename T>
+static PyObject* indexed_array(const char *format, const std::vector<T>& src, const size_t lead, const size_t n)
+{
+    T *data;
+    PyObject *arr = new_array(format, sizeof(T), n, (void**)&data);
+    if (arr == NULL) {
+        return NULL;
+    }
+    const size_t num = std::min(src.size(), n - lead);
+    std::fill(data, data + lead, T());
+    std::copy(src.begin(), src.begin() + num, data + lead);
+    std::fill(data + lead + num, data + n, T());
+    return arr;
+}
+
+PyDoc_STRVAR(get_vsids_scores_doc,
+"get_vsids_scores()\n\
+Return the VSIDS activity of each variable, higher meaning the variable\n\
+was involved in more recent conflicts.\n\
+\n\
+:return: A float64 memoryview of nb_vars()+1 items, indexed by variable.\n\
+    Item 0 is unused.\n\
+:rtype: <memoryview>"
+);
+
+static PyObject* get_vsids_scores(Solver *self)
+{
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+
+    const size_t num = self->cmsat->nVars() + 1;
+    std::vector<double> scores;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    scores = self->cmsat->get_vsids_scores();
+    Py_END_ALLOW_THREADS
+    return indexed_array("d", scores, 1, num);
+}
+
+PyDoc_STRVAR(get_var_incidence_doc,
+"get_var_incidence(red=False)\n\
+Return the number of clauses each variable occurs in.\n\
+\n\
+:param red: If False, count the irredundant clauses of the current,\n\
+    possibly simplified formula only. This is not available once BVA added\n\
+    variables. If True, count the learnt clauses as well.\n\
+:type red: <bool>\n\
+:return: A uint32 memoryview of nb_vars()+1 items, indexed by variable.\n\
+    Item 0 is unused.\n\
+:rtype: <memoryview>"
+);
+
+static PyObject* get_var_incidence(Solver *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"red", NULL};
+    int red = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|p", const_cast<char**>(kwlist), &red)) {
+        return NULL;
+    }
+    if (!check_not_busy(self) || (!red && !check_no_bva_vars(self, "the clause incidence"))) {
+        return NULL;
+    }
+
+    const size_t num = self->cmsat->nVars() + 1;
+    std::vector<uint32_t> inc;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    if (red) {
+        inc = self->cmsat->get_var_incidence_also_red();
+    } else if (self->cmsat->okay()) {
+        inc = self->cmsat->get_var_incidence();
+    }
+    Py_END_ALLOW_THREADS
+    return indexed_array("I", inc, 1, num);
+}
+
+PyDoc_STRVAR(get_lit_incidence_doc,
+"get_lit_incidence()\n\
+Return the number of irredundant clauses each literal occurs in. This is\n\
+not available once BVA added variables.\n\
+\n\
+:return: A uint32 memoryview of 2*(nb_vars()+1) items: item 2*v counts\n\
+    literal v and item 2*v+1 literal -v, so that\n\
+    numpy.frombuffer(...).reshape(-1, 2)[v] gives both. Items 0 and 1 are\n\
+    unused.\n\
+:rtype: <memoryview>"
+);
+
+static PyObject* get_lit_incidence(Solver *self)
+{
+    if (!check_not_busy(self) || !check_no_bva_vars(self, "the clause incidence")) {
+        return NULL;
+    }
+
+    const size_t num = 2*(self->cmsat->nVars() + 1);
+    std::vector<uint32_t> inc;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    inc = self->cmsat->get_lit_incidence();
+    Py_END_ALLOW_THREADS
+    return indexed_array("I", inc, 2, num);
+}
+
+PyDoc_STRVAR(get_zero_assigned_lits_doc,
+"get_zero_assigned_lits()\n\
+Return the literals the solver has proved to hold in every model, i.e.\n\
+the ones set at decision level 0.\n\
+\n\
+:return: An int32 memoryview of literals.\n\
+:rtype: <memoryview>"
+);
+
+static PyObject* get_zero_assigned_lits(Solver *self)
+{
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+
+    std::vector<Lit> lits;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    lits = self->cmsat->get_zero_assigned_lits();
+    Py_END_ALLOW_THREADS
+
+    int32_t *data;
+    PyObject *arr = new_array("i", sizeof(int32_t), lits.size(), (void**)&data);
+    if (arr == NULL) {
+        return NULL;
+    }
+    for (const Lit lit: lits) {
+        *data++ = lit_to_int(lit);
+    }
+    return arr;
+}
+
+PyDoc_STRVAR(get_all_binary_xors_doc,
+"get_all_binary_xors()\n\
+Return the pairs of literals the solver has proved equivalent, i.e. the\n\
+binary XORs a ^ b = 0 it used to replace one variable by another.\n\
+\n\
+:return: An int32 memoryview of 2*n items holding the pairs (a, b) one\n\
+    after the other, so that numpy.frombuffer(...).reshape(-1, 2) gives\n\
+    one pair per row.\n\
+:rtype: <memoryview>"
+);
+
+static PyObject* get_all_binary_xors(Solver *self)
+{
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+
+    std::vector<std::pair<Lit, Lit> > pairs;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    pairs = self->cmsat->get_all_binary_xors();
+    Py_END_ALLOW_THREADS
+
+    int32_t *data;
+    PyObject *arr = new_array("i", sizeof(int32_t), 2*pairs.size(), (void**)&data);
+    if (arr == NULL) {
+        return NULL;
+    }
+    for (const auto& pair: pairs) {
+        *data++ = lit_to_int(pair.first);
+        *data++ = lit_to_int(pair.second);
+    }
+    return arr;
+}
+
+/* Model as int8 array of nVars()+1 items: 1 True, -1 False, 0 unknown.
+ * Index 0 is unused so that model[var] works, as with the tuple form. */
+static PyObject* get_solution_array(SATSolver *cmsat)
+{
+    const std::vector<lbool>& model = cmsat->get_model();
+    const size_t num = std::min<size_t>(model.size(), cmsat->nVars());
+    int8_t *data;
+    PyObject *arr = new_array("b", 1, num+1, (void**)&data);
+    if (arr == NULL) {
+        return NULL;
+    }
+    data[0] = 0;
+
+    const lbool *m = model.data();
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    for (size_t i = 0; i < num; i++) {
+        data[i+1] = lbool_to_int8(m[i]);
+    }
+    Py_END_ALLOW_THREADS
+    return arr;
+}
+
+/* Model as bytes with bit (var % 8) of byte (var / 8) set iff var is True. */
+static PyObject* get_solution_bits(SATSolver *cmsat)
+{
+    const std::vector<lbool>& model = cmsat->get_model();
+    const size_t num = std::min<size_t>(model.size(), cmsat->nVars());
+    PyObject *bytes = PyBytes_FromStringAndSize(NULL, (Py_ssize_t)(num/8 + 1));
+    if (bytes == NULL) {
+        return NULL;
+    }
+
+    uint8_t *data = (uint8_t*)PyBytes_AS_STRING(bytes);
+    const lbool *m = model.data();
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    memset(data, 0, num/8 + 1);
+    for (size_t i = 0; i < num; i++) {
+        const size_t var = i+1;
+        data[var >> 3] |= (uint8_t)((m[i] == l_True) << (var & 7));
+    }
+    Py_END_ALLOW_THREADS
+    return bytes;
+}
+
+/* Model returned by solve(model='lazy'): the engine model, converted to one
+ * int8 per variable as in get_solution_array(), behind a read-only sequence.
+ * Python objects are only created for the items that are looked up. */
+typedef struct {
+    PyObject_HEAD
+    std::vector<int8_t> *values; // nVars()+1 items, index 0 unused
+} Model;
+
+static inline PyObject* model_value(const int8_t value)
+{
+    PyObject *ret = value > 0 ? Py_True : (value < 0 ? Py_False : Py_None);
+    Py_INCREF(ret);
+    return ret;
+}
+
+static Py_ssize_t Model_length(Model *self)
+{
+    return (Py_ssize_t)self->values->size();
+}
+
+static PyObject* Model_item(Model *self, Py_ssize_t i)
+{
+    if (i < 0 || i >= Model_length(self)) {
+        PyErr_SetString(PyExc_IndexError, "model index out of range");
+        return NULL;
+    }
+    return model_value((*self->values)[i]);
+}
+
+static PyObject* Model_subscript(Model *self, PyObject *key)
+{
+    if (PyIndex_Check(key)) {
+        Py_ssize_t i = PyNumber_AsSsize_t(key, PyExc_IndexError);
+        if (i == -1 && PyErr_Occurred()) {
+            return NULL;
+        }
+        if (i < 0) {
+            i += Model_length(self);
+        }
+        return Model_item(self, i);
+    }
+    if (!PySlice_Check(key)) {
+        PyErr_Format(PyExc_TypeError, "model indices must be integers or slices, not %.200s",
+            Py_TYPE(key)->tp_name);
+        return NULL;
+    }
+
+    Py_ssize_t start, stop, step;
+    if (PySlice_Unpack(key, &start, &stop, &step) < 0) {
+        return NULL;
+    }
+    const Py_ssize_t num = PySlice_AdjustIndices(Model_length(self), &start, &stop, step);
+    PyObject *tuple = PyTuple_New(num);
+    if (tuple == NULL) {
+        return NULL;
+    }
+    for (Py_ssize_t k = 0, i = start; k < num; k++, i += step) {
+        PyTuple_SET_ITEM(tuple, k, model_value((*self->values)[i]));
+    }
+    return tuple;
+}
+
+/* Literals of `vars` that are true in the model, 0 for unknown variables */
+template <typename T>
+static bool model_lits(
+    const std::vector<int8_t>& values
+    , const T *vars
+    , const size_t num
+    , int32_t *out
+    , std::string& err
+) {
+    for (size_t j = 0; j < num; j++) {
+        const long long var = vars[j];
+        if (var <= 0 || (size_t)var >= values.size()) {
+            err = "variable " + std::to_string(var) + " must be between 1 and "
+                + std::to_string(values.size() - 1);
+            return false;
+        }
+        out[j] = (int32_t)var * values[var];
+    }
+    return true;
+}
+
+PyDoc_STRVAR(model_lits_doc,
+"lits(vars)\n\
+Project the model on some variables.\n\
+\n\
+:param vars: Variables, as a sequence or an integer buffer.\n\
+:return: A memoryview of format 'i' with one item per variable: v if\n\
+    variable v is True, -v if it is False, 0 if it is unknown.\n\
+:rtype: <memoryview>"
+);
+
+static PyObject* Model_lits(Model *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"vars", NULL};
+    PyObject *vars_obj;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O", const_cast<char**>(kwlist), &vars_obj)) {
+        return NULL;
+    }
+
+    std::vector<long long> seq_vars;
+    Py_buffer view;
+    const bool is_buffer = PyObject_CheckBuffer(vars_obj);
+    if (is_buffer) {
+        if (!get_int_buffer(vars_obj, &view, "variable array")) {
+            return NULL;
+        }
+    } else {
+        PyObject *seq = PySequence_Fast(vars_obj, "vars must be a sequence or a buffer");
+        if (seq == NULL) {
+            return NULL;
+        }
+        for (Py_ssize_t i = 0; i < PySequence_Fast_GET_SIZE(seq); i++) {
+            PyObject *item = PySequence_Fast_GET_ITEM(seq, i);
+            if (!IS_INT(item)) {
+                PyErr_SetString(PyExc_TypeError, "variables must be integers");
+                Py_DECREF(seq);
+                return NULL;
+            }
+            const long long var = PyLong_AsLongLong(item);
+            if (var == -1 && PyErr_Occurred()) {
+                Py_DECREF(seq);
+                return NULL;
+            }
+            seq_vars.push_back(var);
+        }
+        Py_DECREF(seq);
+    }
+
+    const size_t num = is_buffer ? num_items(&view) : seq_vars.size();
+    int32_t *out;
+    PyObject *arr = new_array("i", sizeof(int32_t), num, (void**)&out);
+    std::string err;
+    bool ok = arr != NULL;
+    if (ok) {
+        ok = is_buffer
+            ? with_int_data(&view, [&](auto data) {
+                return model_lits(*self->values, data, num, out, err);
+            })
+            : model_lits(*self->values, seq_vars.data(), num, out, err);
+    }
+    if (is_buffer) {
+        PyBuffer_Release(&view);
+    }
+    if (!ok) {
+        if (arr != NULL) {
+            PyErr_SetString(PyExc_ValueError, err.c_str());
+            Py_DECREF(arr);
+        }
+        return NULL;
+    }
+    return arr;
+}
+
+/* Read-only 'b' buffer, the same layout as get_model_buffer() */
+static int Model_getbuffer(Model *self, Py_buffer *view, int flags)
+{
+    if (PyBuffer_FillInfo(view, (PyObject *)self, self->values->data(),
+        Model_length(self), 1, flags) < 0) {
+        return -1;
+    }
+    if (flags & PyBUF_FORMAT) {
+        view->format = const_cast<char*>("b");
+    }
+    return 0;
+}
+
+static PyObject* Model_repr(Model *self)
+{
+    return PyUnicode_FromFormat("<pycryptosat.Model of %zd variables>", Model_length(self) - 1);
+}
+
+static void Model_dealloc(Model *self)
+{
+    delete self->values;
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyMethodDef Model_methods[] = {
+    {"lits", (PyCFunction) Model_lits, METH_VARARGS | METH_KEYWORDS, model_lits_doc},
+    {NULL, NULL, 0, NULL}  /* Sentinel */
+};
+
+static PySequenceMethods Model_as_sequence = {
+    (lenfunc)Model_length,      /* sq_length */
+    0,                          /* sq_concat */
+    0,                          /* sq_repeat */
+    (ssizeargfunc)Model_item,   /* sq_item */
+};
+
+static PyMappingMethods Model_as_mapping = {
+    (lenfunc)Model_length,      /* mp_length */
+    (binaryfunc)Model_subscript, /* mp_subscript */
+    0,                          /* mp_ass_subscript */
+};
+
+static PyBufferProcs Model_as_buffer = {
+    (getbufferproc)Model_getbuffer, /* bf_getbuffer */
+    0,                          /* bf_releasebuffer */
+};
+
+PyDoc_STRVAR(model_doc,
+"Model returned by solve(model='lazy').\n\
+\n\
+model[v] is True, False or None (unknown) for variable v, index 0 being\n\
+unused as in the 'tuple' format, and slices return tuples. Values are only\n\
+turned into Python objects when looked up. The model also exports a\n\
+read-only buffer of format 'b' like get_model_buffer(), e.g. for\n\
+numpy.frombuffer() or check_model()."
+);
+
+static PyTypeObject pycryptosat_ModelType = {
+    PyVarObject_HEAD_INIT(NULL, 0) /*ob_size*/
+    "pycryptosat.Model",        /*tp_name*/
+    sizeof(Model),              /*tp_basicsize*/
+    0,                          /*tp_itemsize*/
+    (destructor)Model_dealloc,  /*tp_dealloc*/
+    0,                          /*tp_print*/
+    0,                          /*tp_getattr*/
+    0,                          /*tp_setattr*/
+    0,                          /*tp_as_async*/
+    (reprfunc)Model_repr,       /*tp_repr*/
+    0,                          /*tp_as_number*/
+    &Model_as_sequence,         /*tp_as_sequence*/
+    &Model_as_mapping,          /*tp_as_mapping*/
+    0,                          /*tp_hash */
+    0,                          /*tp_call*/
+    0,                          /*tp_str*/
+    0,                          /*tp_getattro*/
+    0,                          /*tp_setattro*/
+    &Model_as_buffer,           /*tp_as_buffer*/
+    Py_TPFLAGS_DEFAULT,         /*tp_flags*/
+    model_doc,                  /* tp_doc */
+    0,                          /* tp_traverse */
+    0,                          /* tp_clear */
+    0,                          /* tp_richcompare */
+    0,                          /* tp_weaklistoffset */
+    0,                          /* tp_iter */
+    0,                          /* tp_iternext */
+    Model_methods,              /* tp_methods */
+};
+
+static PyObject* get_solution_lazy(SATSolver *cmsat)
+{
+    const std::vector<lbool>& model = cmsat->get_model();
+    const size_t num = std::min<size_t>(model.size(), cmsat->nVars());
+    Model *self = PyObject_New(Model, &pycryptosat_ModelType);
+    if (self == NULL) {
+        return NULL;
+    }
+    self->values = new std::vector<int8_t>(num+1);
+
+    int8_t *data = self->values->data();
+    const lbool *m = model.data();
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    for (size_t i = 0; i < num; i++) {
+        data[i+1] = lbool_to_int8(m[i]);
+    }
+    Py_END_ALLOW_THREADS
+    return (PyObject *)self;
+}
+
+enum class ModelFormat { tuple, array, bits, lazy };
+
+static int parse_model_format(const char *name, ModelFormat& format)
+{
+    if (name == NULL || strcmp(name, "tuple") == 0) {
+        format = ModelFormat::tuple;
+    } else if (strcmp(name, "array") == 0) {
+        format = ModelFormat::array;
+    } else if (strcmp(name, "bits") == 0) {
+        format = ModelFormat::bits;
+    } else if (strcmp(name, "lazy") == 0) {
+        format = ModelFormat::lazy;
+    } else {
+        PyErr_Format(PyExc_ValueError, "model must be 'tuple', 'array', 'bits' or 'lazy', not '%s'", name);
+        return 0;
+    }
+    return 1;
+}
+
+static PyObject* get_solution_as(SATSolver *cmsat, const ModelFormat format)
+{
+    switch (format) {
+        case ModelFormat::array:
+            return get_solution_array(cmsat);
+        case ModelFormat::bits:
+            return get_solution_bits(cmsat);
+        case ModelFormat::lazy:
+            return get_solution_lazy(cmsat);
+        default:
+            return get_solution(cmsat);
+    }
+}
+
+PyDoc_STRVAR(get_model_buffer_doc,
+"get_model_buffer(packed=False)\n\
+Return the model found by the last solve(), solve_batch() (its last cube)\n\
+or is_satisfiable() call in compact form. Returns None if that call was\n\
+not satisfiable, or if clauses have been added since.\n\
+\n\
+:param packed: If False, return a memoryview of format 'b' (int8) with\n\
+    nb_vars()+1 items, where item v is 1 if variable v is True, -1 if it\n\
+    is False and 0 if it is unknown. Item 0 is unused.\n\
+    If True, return bytes where bit (v % 8) of byte (v // 8) is set iff\n\
+    variable v is True.\n\
+:type packed: <bool>\n\
+:return: The model, or None\n\
+:rtype: <memoryview> or <bytes> or <None>"
+);
+
+static PyObject* get_model_buffer(Solver *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"packed", NULL};
+    int packed = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|p", const_cast<char**>(kwlist), &packed)) {
+        return NULL;
+    }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+
+    if (!self->have_model) {
+        Py_INCREF(Py_None);
+        return Py_None;
+    }
+    return get_solution_as(self->cmsat, packed ? ModelFormat::bits : ModelFormat::array);
+}
+
+PyDoc_STRVAR(nb_vars_doc,
+"nb_vars()\n\
+Return the number of literals in the solver.\n\
+\n\
+:return: Number of literals\n\
+:rtype: <int>"
+);
+
+static PyObject* nb_vars(Solver *self)
+{
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+
+    return PyLong_FromLong(self->cmsat->nVars());
+
+}
+
+/*
+static PyObject* nb_clauses(Solver *self)
+{
+    // Private attribute => need to make a public method
+    return PyInt_FromLong(self->cmsat->data->solvers.size());
+}*/
+
+template <typename S>
+static int parse_assumption_lits(PyObject* assumptions, S* cmsat, std::vector<Lit>& assumption_lits)
+{
+    PyObject *iterator = PyObject_GetIter(assumptions);
+    if (iterator == NULL) {
+        PyErr_SetString(PyExc_TypeError, "interable object expected");
+        return 0;
+    }
+
+    PyObject *lit;
+    while ((lit = PyIter_Next(iterator)) != NULL) {
+        long var;
+        bool sign;
+        int ret = convert_lit_to_sign_and_var(lit, var, sign);
+        Py_DECREF(lit);
+        if (!ret) {
+            Py_DECREF(iterator);
+            return 0;
+        }
+
+        if (var >= cmsat->nVars()) {
+            Py_DECREF(iterator);
+            PyErr_Format(PyExc_ValueError, "Variable %ld not used in clauses", var+1);
+            return 0;
+        }
+
+        assumption_lits.push_back(Lit(var, sign));
+    }
+    Py_DECREF(iterator);
+    if (PyErr_Occurred()) {
+        return 0;
+    }
+
+    return 1;
+}
+
+static int check_solve_limits(const int verbose, const double time_limit, const long confl_limit)
+{
+    if (verbose < 0) {
+        PyErr_SetString(PyExc_ValueError, "verbosity must be at least 0");
+        return 0;
+    }
+    if (time_limit < 0) {
+        PyErr_SetString(PyExc_ValueError, "time_limit must be at least 0");
+        return 0;
+    }
+    if (confl_limit < 0) {
+        PyErr_SetString(PyExc_ValueError, "conflict limit must be at least 0");
+        return 0;
+    }
+    return 1;
+}
+
+static int check_not_busy(Solver *self)
+{
+    if (self->busy) {
+        PyErr_SetString(PyExc_RuntimeError, "solver is busy with an asynchronous solve");
+        return 0;
+    }
+    if (self->callbacks != NULL && self->callbacks->running > 0) {
+        PyErr_SetString(PyExc_RuntimeError, "solver methods cannot be called from its callbacks");
+        return 0;
+    }
+    return 1;
+}
+
+/* Take an object's lock, waiting for it with the GIL released so that the
+ * holder can still take the GIL (for callbacks, file objects...) and finish.
+ * Fails if the lock is held by the calling thread. */
+static int acquire_lock(ObjectLock& lock)
+{
+    const std::thread::id me = std::this_thread::get_id();
+    if (lock.owner.load() == me) {
+        PyErr_SetString(PyExc_RuntimeError, "object is already in use by a call of this thread");
+        return 0;
+    }
+    if (!lock.mu.try_lock()) {
+        Py_BEGIN_ALLOW_THREADS      /* release GIL */
+        lock.mu.lock();
+        Py_END_ALLOW_THREADS
+    }
+    lock.owner.store(me);
+    return 1;
+}
+
+static void release_lock(ObjectLock& lock)
+{
+    lock.owner.store(std::thread::id());
+    lock.mu.unlock();
+}
+
+static int lock_object(Solver *self)
+{
+    // the solve calling the callback holds the lock, maybe in another thread
+    if (self->callbacks != NULL && self->callbacks->running > 0) {
+        PyErr_SetString(PyExc_RuntimeError, "solver methods cannot be called from its callbacks");
+        return 0;
+    }
+    return acquire_lock(self->lock);
+}
+
+/* Method table wrappers running a method with the object locked */
+template <typename T, PyObject* (*F)(T*, PyObject*, PyObject*)>
+static PyObject* locked(T *self, PyObject *args, PyObject *kwds)
+{
+    if (!lock_object(self)) {
+        return NULL;
+    }
+    PyObject *ret = F(self, args, kwds);
+    release_lock(self->lock);
+    return ret;
+}
+
+template <typename T, PyObject* (*F)(T*)>
+static PyObject* locked_noargs(T *self, PyObject *unused)
+{
+    if (!lock_object(self)) {
+        return NULL;
+    }
+    PyObject *ret = F(self);
+    release_lock(self->lock);
+    return ret;
+}
+
+/* The (sat, solution) tuple returned by solve() */
+static PyObject* build_solve_result(Solver *self, const lbool res, const ModelFormat model_format)
+{
+    PyObject *result = PyTuple_New((Py_ssize_t) 2);
+    if (result == NULL) {
+        PyErr_SetString(PyExc_SystemError, "failed to create a tuple");
+        return NULL;
+    }
+
+    if (res == l_True) {
+        const auto start = std::chrono::steady_clock::now();
+        PyObject* solution = get_solution_as(self->cmsat, model_format);
+        const std::chrono::duration<double> took = std::chrono::steady_clock::now() - start;
+        self->last_stats.model_wall = took.count();
+        self->sum_stats.model_wall += took.count();
+        if (!solution) {
+            Py_DECREF(result);
+            return NULL;
+        }
+        Py_INCREF(Py_True);
+
+        PyTuple_SET_ITEM(result, 0, Py_True);
+        PyTuple_SET_ITEM(result, 1, solution);
+
+    } else if (res == l_False) {
+        Py_INCREF(Py_False);
+        Py_INCREF(Py_None);
+
+        PyTuple_SET_ITEM(result, 0, Py_False);
+        PyTuple_SET_ITEM(result, 1, Py_None);
+
+    } else if (res == l_Undef) {
+        Py_INCREF(Py_None);
+        Py_INCREF(Py_None);
+
+        PyTuple_SET_ITEM(result, 0, Py_None);
+        PyTuple_SET_ITEM(result, 1, Py_None);
+    } else {
+        // res can only be l_False, l_True, l_Undef
+        assert((res == l_False) || (res == l_True) || (res == l_Undef));
+        Py_DECREF(result);
+        return PyErr_NewExceptionWithDoc("pycryptosat.IllegalState", "Error Occurred in CyrptoMiniSat", NULL, NULL);
+    }
+
+    return result;
+}
+
+/* Phases of variables 1..len(phases)-1, index 0 being unused as in models.
+ * Integer items give the phase by their sign, 0 leaving it unchanged;
+ * bool items and the True/False/None items of solve()'s model tuple give it
+ * directly. */
+template <typename T>
+static void read_phases(const T *phases, const size_t num, const bool is_bool, std::vector<Lit>& lits)
+{
+    for (size_t i = 1; i < num; i++) {
+        if (is_bool) {
+            lits.push_back(Lit(i-1, phases[i] == 0));
+        } else if (phases[i] != 0) {
+            lits.push_back(Lit(i-1, phases[i] < 0));
+        }
+    }
+}
+
+static int parse_phases(Solver *self, PyObject *phases, std::vector<Lit>& lits)
+{
+    size_t num;
+    if (PyObject_CheckBuffer(phases)) {
+        Py_buffer view;
+        if (!get_int_buffer(phases, &view, "phase array", true)) {
+            return 0;
+        }
+        num = num_items(&view);
+        const char fmt = item_format(&view);
+        if (fmt == 'b') {
+            read_phases((const int8_t *)view.buf, num, false, lits);
+        } else {
+            with_flag_data(&view, [&](auto data) {
+                read_phases(data, num, fmt == '?', lits);
+                return true;
+            });
+        }
+        PyBuffer_Release(&view);
+    } else {
+        PyObject *seq = PySequence_Fast(phases, "phases must be a sequence or a buffer");
+        if (seq == NULL) {
+            return 0;
+        }
+        num = PySequence_Fast_GET_SIZE(seq);
+        PyObject **items = PySequence_Fast_ITEMS(seq);
+        for (size_t i = 1; i < num; i++) {
+            PyObject *item = items[i];
+            if (item == Py_None) {
+                continue;
+            }
+            if (PyBool_Check(item)) {
+                lits.push_back(Lit(i-1, item == Py_False));
+                continue;
+            }
+            if (!IS_INT(item)) {
+                PyErr_SetString(PyExc_TypeError, "phases must be bools, integers or None");
+                Py_DECREF(seq);
+                return 0;
+            }
+            const long value = PyLong_AsLong(item);
+            if (value == -1 && PyErr_Occurred()) {
+                Py_DECREF(seq);
+                return 0;
+            }
+            if (value != 0) {
+                lits.push_back(Lit(i-1, value < 0));
+            }
+        }
+        Py_DECREF(seq);
+    }
+
+    if (num > (size_t)self->cmsat->nVars() + 1) {
+        PyErr_Format(PyExc_ValueError, "phases given for %zu variables, the solver has %u",
+            num - 1, self->cmsat->nVars());
+        return 0;
+    }
+    return 1;
+}
+
+PyDoc_STRVAR(set_phases_doc,
+"set_phases(phases)\n\
+Set the polarity each variable is first tried with when branching, e.g.\n\
+to start the next solve near a previous model.\n\
+\n\
+:param phases: A model in the 'tuple', 'array' or 'lazy' format of solve(),\n\
+    i.e. indexed by variable with index 0 unused, of the same or fewer\n\
+    variables than the solver has. Either a sequence of True, False or\n\
+    None (unchanged), a buffer of bools, or a buffer of 8, 32 or 64 bit\n\
+    integers whose sign gives the phase, 0 leaving it unchanged.\n\
+:return: None\n\
+:rtype: <None>"
+);
+
+static PyObject* set_phases(Solver *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"phases", NULL};
+    PyObject *phases;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O", const_cast<char**>(kwlist), &phases)) {
+        return NULL;
+    }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+
+    std::vector<Lit> lits;
+    if (!parse_phases(self, phases, lits)) {
+        return NULL;
+    }
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    self->cmsat->set_polarities(lits);
+    Py_END_ALLOW_THREADS
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+// set_var_weights() and polarity_mode='weighted' need the weights compiled
+// into the engine, which otherwise exits the process; setup.py defines it
+#ifndef WEIGHTED_SAMPLING
+#error "pycryptosat must be built with WEIGHTED_SAMPLING defined"
+#endif
+
+static int parse_weight_values(PyObject *weights, std::vector<double>& values)
+{
+    PyObject *seq = PySequence_Fast(weights, "weights must be a sequence or a buffer");
+    if (seq == NULL) {
+        return 0;
+    }
+    for (Py_ssize_t i = 0; i < PySequence_Fast_GET_SIZE(seq); i++) {
+        const double value = PyFloat_AsDouble(PySequence_Fast_GET_ITEM(seq, i));
+        if (value == -1.0 && PyErr_Occurred()) {
+            Py_DECREF(seq);
+            return 0;
+        }
+        values.push_back(value);
+    }
+    Py_DECREF(seq);
+    return 1;
+}
+
+PyDoc_STRVAR(set_var_weights_doc,
+"set_var_weights(lits, weights)\n\
+Set literal weights for polarity_mode='weighted', which branches on a\n\
+variable positively with probability w(v) / (w(v) + w(-v)). Each literal\n\
+can be given a weight once, before the first solve() or simplify().\n\
+\n\
+:param lits: Literals (ints), as a sequence or integer buffer.\n\
+:param weights: One non-negative weight per literal, as a sequence or\n\
+    float64 buffer.\n\
+:return: None\n\
+:rtype: <None>"
+);
+
+static PyObject* set_var_weights(Solver *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"lits", "weights", NULL};
+    PyObject *lits_obj;
+    PyObject *weights_obj;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO", const_cast<char**>(kwlist), &lits_obj, &weights_obj)) {
+        return NULL;
+    }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+    // the engine indexes the weights by its internal variables, which only
+    // match ours before the first renumbering
+    if (self->num_calls > 0) {
+        PyErr_SetString(PyExc_RuntimeError, "set_var_weights() must be called before the first solve or simplify");
+        return NULL;
+    }
+
+    std::vector<Lit> lits;
+    if (!parse_clause(self->cmsat, lits_obj, lits)) {
+        return NULL;
+    }
+    std::vector<double> weights;
+    Py_buffer view;
+    if (PyObject_GetBuffer(weights_obj, &view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) == 0) {
+        const bool ok = view.format != NULL && strcmp(view.format, "d") == 0;
+        if (ok) {
+            weights.assign((const double *)view.buf, (const double *)view.buf + num_items(&view));
+        }
+        PyBuffer_Release(&view);
+        if (!ok) {
+            PyErr_SetString(PyExc_ValueError, "invalid weight array: float64 items expected");
+            return NULL;
+        }
+    } else {
+        PyErr_Clear();
+        if (!parse_weight_values(weights_obj, weights)) {
+            return NULL;
+        }
+    }
+    if (weights.size() != lits.size()) {
+        PyErr_SetString(PyExc_ValueError, "lits and weights must have the same length");
+        return NULL;
+    }
+
+    // the engine exits on a literal weighted twice, so check all first
+    std::vector<uint8_t> given(self->weights_given);
+    given.resize(2*self->cmsat->nVars(), 0);
+    for (size_t i = 0; i < lits.size(); i++) {
+        if (!(weights[i] >= 0) || std::isinf(weights[i])) {
+            PyErr_SetString(PyExc_ValueError, "weights must be finite and non-negative");
+            return NULL;
+        }
+        if (given[lits[i].toInt()]) {
+            PyErr_Format(PyExc_ValueError, "literal %d was already given a weight", lit_to_int(lits[i]));
+            return NULL;
+        }
+        given[lits[i].toInt()] = 1;
+    }
+    self->weights_given.swap(given);
+
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    for (size_t i = 0; i < lits.size(); i++) {
+        self->cmsat->set_var_weight(lits[i], weights[i]);
+    }
+    Py_END_ALLOW_THREADS
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+PyDoc_STRVAR(solve_doc,
+"solve(assumptions=None, verbose=None, time_limit=None, confl_limit=None, model='tuple', warm_start=None)\n\
+Solve the system of equations that have been added with add_clause();\n\
+\n\
+.. example:: \n\
     from pycryptosat import Solver\n\
     >>> s = Solver()\n\
     >>> s.add_clause([1])\n\
@@ -667,261 +3618,3310 @@ Solve the system of equations that have been added with add_clause();\n\
     >>> s.add_clause([3])\n\
     >>> s.add_clause([-1, 2, 3])\n\
     >>> sat, solution = s.solve()\n\
-    >>> print sat\n\
-    True\n\
-    >>> print solution\n\
-    (None, True, False, True)\n\
-    \n\
-    We can also try to assume any variable values for a single solver run:\n\
-    \n\
-    sat, solution = s.solve([-3])\n\
-    >>> print sat\n\
-    False\n\
-    >>> print solution\n\
-    None\n\
+    >>> print sat\n\
+    True\n\
+    >>> print solution\n\
+    (None, True, False, True)\n\
+    \n\
+    We can also try to assume any variable values for a single solver run:\n\
+    \n\
+    sat, solution = s.solve([-3])\n\
+    >>> print sat\n\
+    False\n\
+    >>> print solution\n\
+    None\n\
+\n\
+:param assumptions: (Optional) Allows the user to set values to specific\n\
+    ariables in the solver in a temporary fashion. This means that in case\n\
+    the problem is satisfiable but e.g it's unsatisfiable if variable 2 is\n\
+    FALSE, then solve([-2]) will return UNSAT. However, a subsequent call to\n\
+    solve() will still return a solution.\n\
+:type assumptions: <list>\n\
+:param verbose: (Optional) Allows the user to set a verbosity for just this\n\
+    solve.\n\
+:type verbose: <int>\n\
+:param time_limit: (Optional) Allows the user to set a timeout for just this\n\
+    solve.\n\
+:type time_limit: <double>\n\
+:param confl_limit: (Optional) Allows the user to set a conflict limit for just\n\
+    this solve.\n\
+:type confl_limit: <long>\n\
+:param model: (Optional) Format of the returned solution: 'tuple' (default),\n\
+    'array', 'bits' or 'lazy'. See get_model_buffer() for the compact\n\
+    formats. 'lazy' returns a pycryptosat.Model, indexed like the tuple but\n\
+    only creating the values that are read, with lits() to project it.\n\
+:type model: <str>\n\
+:param warm_start: (Optional) A previous model in the 'tuple', 'array' or\n\
+    'lazy' format, whose values the solver tries first. Same as calling\n\
+    set_phases(warm_start) before solving.\n\
+:return: A tuple. First part of the tuple indicates whether the problem\n\
+    is satisfiable. The second part contains the solution, in the format\n\
+    selected by `model`. The default tuple is preceded by None, so you can\n\
+    index into it with the variable number. E.g. solution[1] returns the\n\
+    value for variable 1. The 'array' and 'lazy' formats are indexed the\n\
+    same way.\n\
+:rtype: <tuple <tuple>> or <tuple <memoryview>> or <tuple <bytes>> or\n\
+    <tuple <Model>>"
+);
+
+static PyObject* solve(Solver *self, PyObject *args, PyObject *kwds)
+{
+    PyObject* assumptions = NULL;
+
+    int verbose = self->verbose;
+    double time_limit = self->time_limit;
+    long confl_limit = self->confl_limit;
+    const char* model_name = NULL;
+    PyObject* warm_start = NULL;
+
+    static char const* kwlist[] = {"assumptions", "verbose", "time_limit", "confl_limit", "model", "warm_start", NULL};
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|OidlzO", const_cast<char**>(kwlist), &assumptions, &verbose, &time_limit, &confl_limit, &model_name, &warm_start)) {
+        return NULL;
+    }
+    ModelFormat model_format;
+    if (!parse_model_format(model_name, model_format)) {
+        return NULL;
+    }
+    if (!check_solve_limits(verbose, time_limit, confl_limit) || !check_not_busy(self)
+        || !check_single_run(self, 1)) {
+        return NULL;
+    }
+
+    std::vector<Lit> assumption_lits;
+    if (assumptions) {
+        if (!parse_assumption_lits(assumptions, self->cmsat, assumption_lits)) {
+            return 0;
+        }
+    }
+    std::vector<Lit> phase_lits;
+    if (warm_start != NULL && warm_start != Py_None) {
+        if (!parse_phases(self, warm_start, phase_lits)) {
+            return NULL;
+        }
+    }
+
+    self->cmsat->set_verbosity(verbose);
+    self->cmsat->set_max_time(time_limit);
+    self->cmsat->set_max_confl(confl_limit);
+
+    lbool res;
+    const CallTimer timer(self->cmsat);
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    if (!phase_lits.empty()) {
+        self->cmsat->set_polarities(phase_lits);
+    }
+    res = self->cmsat->solve(&assumption_lits);
+    Py_END_ALLOW_THREADS
+    timer.finish(self, Phase::solve);
+    self->have_model = (res == l_True);
+
+    self->cmsat->set_verbosity(self->verbose);
+    self->cmsat->set_max_time(self->time_limit);
+    self->cmsat->set_max_confl(self->confl_limit);
+
+    return build_solve_result(self, res, model_format);
+}
+
+PyDoc_STRVAR(solve_step_doc,
+"solve_step(conflicts=max_numeric_limits, seconds=max_numeric_limits, assumptions=None, model='tuple')\n\
+Search for at most the given budget, continuing the search the previous\n\
+solve_step() stopped on its budget. Learnt clauses, variable activities,\n\
+phases and the restart and inprocessing schedules all carry over, so a\n\
+search run in steps does about what one solve() would, e.g. to share the\n\
+time of a process fairly between many solvers.\n\
+\n\
+.. example:: \n\
+    >>> while True:\n\
+    ...     sat, solution, progress = s.solve_step(conflicts=10000)\n\
+    ...     if sat is not None:\n\
+    ...         break\n\
+    ...     print(progress['max_trail'], progress['learnt_clauses'])\n\
+\n\
+:param conflicts: (Optional) Conflicts this step may spend.\n\
+:param seconds: (Optional) CPU seconds this step may spend.\n\
+:param assumptions: (Optional) As for solve().\n\
+:param model: (Optional) As for solve().\n\
+:return: A tuple (satisfiable, solution, progress). The first two are as\n\
+    for solve(), satisfiable being None when the budget ran out first.\n\
+    progress is a dict of 'conflicts' and 'seconds' (wall clock) spent in\n\
+    this step, 'max_trail', the most variables assigned at a conflict in\n\
+    it, 'fixed_vars', the variables assigned for good, and\n\
+    'learnt_clauses', the number of learnt clauses kept.\n\
+:rtype: <tuple>"
+);
+
+static PyObject* solve_step(Solver *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"conflicts", "seconds", "assumptions", "model", NULL};
+    long confl_limit = self->confl_limit;
+    double time_limit = self->time_limit;
+    PyObject *assumptions = NULL;
+    const char *model_name = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|ldOz", const_cast<char**>(kwlist),
+        &confl_limit, &time_limit, &assumptions, &model_name))
+    {
+        return NULL;
+    }
+    ModelFormat model_format;
+    if (!parse_model_format(model_name, model_format)) {
+        return NULL;
+    }
+    if (!check_solve_limits(self->verbose, time_limit, confl_limit) || !check_not_busy(self)
+        || !check_single_run(self, 1)) {
+        return NULL;
+    }
+    std::vector<Lit> assumption_lits;
+    if (assumptions != NULL && assumptions != Py_None) {
+        if (!parse_assumption_lits(assumptions, self->cmsat, assumption_lits)) {
+            return NULL;
+        }
+    }
+
+    self->cmsat->set_max_time(time_limit);
+    self->cmsat->set_max_confl(confl_limit);
+    self->cmsat->set_resume_search(true);
+
+    lbool res;
+    uint32_t max_trail;
+    size_t fixed_vars;
+    uint64_t learnt_clauses;
+    const CallTimer timer(self->cmsat);
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    res = self->cmsat->solve(&assumption_lits);
+    max_trail = self->cmsat->get_last_max_trail();
+    fixed_vars = self->cmsat->get_zero_assigned_lits().size();
+    learnt_clauses = self->cmsat->get_num_red_clauses();
+    Py_END_ALLOW_THREADS
+    timer.finish(self, Phase::solve);
+    self->have_model = (res == l_True);
+
+    self->cmsat->set_resume_search(false);
+    self->cmsat->set_max_time(self->time_limit);
+    self->cmsat->set_max_confl(self->confl_limit);
+
+    PyObject *result = build_solve_result(self, res, model_format);
+    if (result == NULL) {
+        return NULL;
+    }
+    PyObject *progress = Py_BuildValue("{s:K,s:d,s:I,s:n,s:K}",
+        "conflicts", (unsigned long long)self->last_stats.conflicts,
+        "seconds", self->last_stats.solve_wall,
+        "max_trail", (unsigned int)max_trail,
+        "fixed_vars", (Py_ssize_t)fixed_vars,
+        "learnt_clauses", (unsigned long long)learnt_clauses);
+    if (progress == NULL) {
+        Py_DECREF(result);
+        return NULL;
+    }
+    PyObject *ret = Py_BuildValue("(OON)", PyTuple_GET_ITEM(result, 0), PyTuple_GET_ITEM(result, 1), progress);
+    Py_DECREF(result);
+    return ret;
+}
+
+/* State of one solve_async() call, shared by the calling thread, its worker
+ * thread and the worker's interrupter thread. Owned by the worker. */
+struct AsyncSolve {
+    std::mutex mu;
+    std::condition_variable cv;
+    bool cancelled = false;
+    bool done = false;
+};
+
+// solve_async() calls whose worker has not finished yet, so that they can
+// be stopped and waited for when the interpreter exits
+static std::mutex async_solves_mu;
+static std::condition_variable async_solves_cv;
+static std::set<AsyncSolve*> async_solves;
+static std::atomic<bool> async_shutting_down{false};
+
+static void cancel_async_solve(AsyncSolve *state)
+{
+    std::lock_guard<std::mutex> lock(state->mu);
+    state->cancelled = true;
+    state->cv.notify_all();
+}
+
+static PyObject* complete_future(PyObject *module, PyObject *args)
+{
+    PyObject *fut;
+    PyObject *value;
+    int is_error;
+    if (!PyArg_ParseTuple(args, "OOp", &fut, &value, &is_error)) {
+        return NULL;
+    }
+
+    PyObject *done = PyObject_CallMethod(fut, "done", NULL);
+    if (done == NULL) {
+        return NULL;
+    }
+    const int already_done = PyObject_IsTrue(done);
+    Py_DECREF(done);
+    if (already_done < 0) {
+        return NULL;
+    }
+    if (already_done) {
+        Py_INCREF(Py_None);
+        return Py_None;
+    }
+
+    return PyObject_CallMethod(fut, is_error ? "set_exception" : "set_result", "(O)", value);
+}
+
+static PyMethodDef complete_future_def = {
+    "_complete_future", (PyCFunction) complete_future, METH_VARARGS, NULL
+};
+
+static PyObject* on_future_done(Solver *self, PyObject *fut)
+{
+    PyObject *cancelled = PyObject_CallMethod(fut, "cancelled", NULL);
+    if (cancelled == NULL) {
+        return NULL;
+    }
+    const int is_cancelled = PyObject_IsTrue(cancelled);
+    Py_DECREF(cancelled);
+    if (is_cancelled < 0) {
+        return NULL;
+    }
+    if (is_cancelled) {
+        if (!acquire_lock(self->lock)) {
+            return NULL;
+        }
+        if (self->busy) {
+            cancel_async_solve(self->async_solve);
+        }
+        release_lock(self->lock);
+    }
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+static PyMethodDef on_future_done_def = {
+    "_on_future_done", (PyCFunction) on_future_done, METH_O, NULL
+};
+
+static PyObject* finish_async_solves(PyObject *module, PyObject *unused)
+{
+    async_shutting_down = true;
+
+    Py_BEGIN_ALLOW_THREADS      /* release GIL, the workers need it to finish */
+    std::unique_lock<std::mutex> lock(async_solves_mu);
+    for (AsyncSolve *state: async_solves) {
+        cancel_async_solve(state);
+    }
+    async_solves_cv.wait(lock, []{ return async_solves.empty(); });
+    Py_END_ALLOW_THREADS
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+static PyMethodDef finish_async_solves_def = {
+    "_finish_async_solves", (PyCFunction) finish_async_solves, METH_NOARGS, NULL
+};
+
+/* Runs on the worker thread of solve_async(), without the GIL. Owns one
+ * reference to self, loop and fut each, and owns state. */
+static void solve_async_worker(
+    Solver *self
+    , AsyncSolve *state
+    , PyObject *loop
+    , PyObject *fut
+    , std::vector<Lit> assumption_lits
+    , const int verbose
+    , const double time_limit
+    , const long confl_limit
+    , const ModelFormat model_format
+) {
+    SATSolver *cmsat = self->cmsat;
+
+    // The engine clears its interrupt flag when solve() starts, so a single
+    // interrupt_asap() racing with that is lost. Once cancelled, keep
+    // interrupting until solve() has returned.
+    std::thread interrupter;
+    try {
+        interrupter = std::thread([cmsat, state]() {
+            std::unique_lock<std::mutex> lock(state->mu);
+            state->cv.wait(lock, [state]{ return state->cancelled || state->done; });
+            while (!state->done) {
+                cmsat->interrupt_asap();
+                state->cv.wait_for(lock, std::chrono::milliseconds(1));
+            }
+        });
+    } catch (const std::system_error&) {
+        // cancellation then only skips solves that have not started yet
+    }
+
+    bool cancelled;
+    {
+        std::lock_guard<std::mutex> lock(state->mu);
+        cancelled = state->cancelled;
+    }
+    lbool res = l_Undef;
+    const CallTimer timer(cmsat);
+    if (!cancelled) {
+        cmsat->set_verbosity(verbose);
+        cmsat->set_max_time(time_limit);
+        cmsat->set_max_confl(confl_limit);
+        res = cmsat->solve(&assumption_lits);
+        cmsat->set_verbosity(self->verbose);
+        cmsat->set_max_time(self->time_limit);
+        cmsat->set_max_confl(self->confl_limit);
+    }
+    {
+        std::lock_guard<std::mutex> lock(state->mu);
+        state->done = true;
+        cancelled = state->cancelled;
+        state->cv.notify_all();
+    }
+    if (interrupter.joinable()) {
+        interrupter.join();
+    }
+
+    PyGILState_STATE gstate = PyGILState_Ensure();
+    acquire_lock(self->lock);
+    self->busy = false;
+    self->async_solve = NULL;
+    self->have_model = (res == l_True);
+    timer.finish(self, Phase::solve);
+    PyObject *value = NULL;
+    if (!cancelled) {
+        value = build_solve_result(self, res, model_format);
+    }
+    release_lock(self->lock);
+
+    // if cancelled, the future is already done and its loop may be gone
+    if (!cancelled) {
+        const int is_error = (value == NULL);
+        if (is_error) {
+            PyObject *type, *traceback;
+            PyErr_Fetch(&type, &value, &traceback);
+            PyErr_NormalizeException(&type, &value, &traceback);
+            Py_XDECREF(type);
+            Py_XDECREF(traceback);
+        }
+
+        PyObject *callback = PyCFunction_New(&complete_future_def, NULL);
+        PyObject *handle = NULL;
+        if (callback != NULL && value != NULL) {
+            handle = PyObject_CallMethod(loop, "call_soon_threadsafe", "OOOi", callback, fut, value, is_error);
+        }
+        if (handle == NULL) {
+            // e.g. the event loop was closed in the meantime: nobody to tell
+            PyErr_WriteUnraisable(fut);
+        }
+        Py_XDECREF(handle);
+        Py_XDECREF(callback);
+        Py_XDECREF(value);
+    }
+    Py_DECREF(fut);
+    Py_DECREF(loop);
+    Py_DECREF(self);
+    PyGILState_Release(gstate);
+
+    {
+        std::lock_guard<std::mutex> lock(async_solves_mu);
+        async_solves.erase(state);
+        async_solves_cv.notify_all();
+    }
+    delete state;
+}
+
+/* Start the worker thread of a solve_async() call. Must be called from a
+ * coroutine running in an event loop; returns the future of that loop. */
+static PyObject* start_solve_async(
+    Solver *self
+    , std::vector<Lit>& assumption_lits
+    , const int verbose
+    , const double time_limit
+    , const long confl_limit
+    , const ModelFormat model_format
+) {
+    if (!check_not_busy(self) || !check_single_run(self, 1)) {
+        return NULL;
+    }
+    if (async_shutting_down) {
+        PyErr_SetString(PyExc_RuntimeError, "cannot start a solve while the interpreter is exiting");
+        return NULL;
+    }
+
+    PyObject *asyncio = PyImport_ImportModule("asyncio");
+    if (asyncio == NULL) {
+        return NULL;
+    }
+    PyObject *loop = PyObject_CallMethod(asyncio, "get_running_loop", NULL);
+    Py_DECREF(asyncio);
+    if (loop == NULL) {
+        return NULL;
+    }
+    PyObject *fut = PyObject_CallMethod(loop, "create_future", NULL);
+    if (fut == NULL) {
+        Py_DECREF(loop);
+        return NULL;
+    }
+    PyObject *on_done = PyCFunction_New(&on_future_done_def, (PyObject *)self);
+    PyObject *ret = on_done ? PyObject_CallMethod(fut, "add_done_callback", "(O)", on_done) : NULL;
+    Py_XDECREF(on_done);
+    if (ret == NULL) {
+        Py_DECREF(fut);
+        Py_DECREF(loop);
+        return NULL;
+    }
+    Py_DECREF(ret);
+
+    AsyncSolve *state = new AsyncSolve;
+    {
+        std::lock_guard<std::mutex> lock(async_solves_mu);
+        async_solves.insert(state);
+    }
+    self->busy = true;
+    self->have_model = false;
+    self->async_solve = state;
+    Py_INCREF(self);
+    Py_INCREF(fut);
+    try {
+        std::thread(solve_async_worker, self, state, loop, fut, std::move(assumption_lits),
+            verbose, time_limit, confl_limit, model_format).detach();
+    } catch (const std::system_error& e) {
+        self->busy = false;
+        self->async_solve = NULL;
+        {
+            std::lock_guard<std::mutex> lock(async_solves_mu);
+            async_solves.erase(state);
+        }
+        delete state;
+        Py_DECREF(self);
+        Py_DECREF(fut);
+        Py_DECREF(fut);
+        Py_DECREF(loop);
+        PyErr_Format(PyExc_RuntimeError, "could not start solver thread: %s", e.what());
+        return NULL;
+    }
+
+    return fut;
+}
+
+/* The coroutine returned by solve_async(). Arguments are checked when it is
+ * created; the solve starts when it is first awaited, and the coroutine then
+ * delegates to the future of start_solve_async(). */
+typedef struct {
+    PyObject_HEAD
+    Solver *solver;
+    std::vector<Lit> *assumption_lits;
+    int verbose;
+    double time_limit;
+    long confl_limit;
+    ModelFormat model_format;
+
+    PyObject *fut;
+    PyObject *fut_iter;
+} SolveAsync;
+
+static PyObject* SolveAsync_send(SolveAsync *self, PyObject *value)
+{
+    if (self->fut_iter == NULL) {
+        if (self->solver == NULL) {
+            PyErr_SetString(PyExc_RuntimeError, "cannot reuse already awaited coroutine");
+            return NULL;
+        }
+        if (value != Py_None) {
+            PyErr_SetString(PyExc_TypeError, "can't send non-None value to a just-started coroutine");
+            return NULL;
+        }
+
+        Solver *solver = self->solver;
+        self->solver = NULL;
+        if (lock_object(solver)) {
+            self->fut = start_solve_async(solver, *self->assumption_lits,
+                self->verbose, self->time_limit, self->confl_limit, self->model_format);
+            release_lock(solver->lock);
+        }
+        Py_DECREF(solver);
+        if (self->fut == NULL) {
+            return NULL;
+        }
+        self->fut_iter = PyObject_CallMethod(self->fut, "__await__", NULL);
+        if (self->fut_iter == NULL) {
+            return NULL;
+        }
+    }
+
+    return PyObject_CallMethod(self->fut_iter, "send", "(O)", value);
+}
+
+static PyObject* SolveAsync_iternext(SolveAsync *self)
+{
+    return SolveAsync_send(self, Py_None);
+}
+
+static PyObject* SolveAsync_throw(SolveAsync *self, PyObject *args)
+{
+    if (self->fut_iter != NULL) {
+        PyObject *meth = PyObject_GetAttrString(self->fut_iter, "throw");
+        if (meth == NULL) {
+            return NULL;
+        }
+        PyObject *ret = PyObject_Call(meth, args, NULL);
+        Py_DECREF(meth);
+        return ret;
+    }
+
+    // never started: raise the exception here, the solve will never run
+    PyObject *type;
+    PyObject *value = NULL;
+    PyObject *traceback = NULL;
+    if (!PyArg_ParseTuple(args, "O|OO", &type, &value, &traceback)) {
+        return NULL;
+    }
+    Py_CLEAR(self->solver);
+    if (PyExceptionInstance_Check(type)) {
+        PyErr_SetObject((PyObject *)Py_TYPE(type), type);
+    } else {
+        PyErr_SetObject(type, value ? value : Py_None);
+    }
+    return NULL;
+}
+
+static PyObject* SolveAsync_close(SolveAsync *self)
+{
+    Py_CLEAR(self->solver);
+    if (self->fut != NULL) {
+        // interrupts the worker, if still running
+        PyObject *ret = PyObject_CallMethod(self->fut, "cancel", NULL);
+        if (ret == NULL) {
+            return NULL;
+        }
+        Py_DECREF(ret);
+    }
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+static PyObject* SolveAsync_await(SolveAsync *self)
+{
+    Py_INCREF(self);
+    return (PyObject *)self;
+}
+
+static void SolveAsync_dealloc(SolveAsync *self)
+{
+    Py_XDECREF(self->solver);
+    Py_XDECREF(self->fut_iter);
+    Py_XDECREF(self->fut);
+    delete self->assumption_lits;
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyMethodDef SolveAsync_methods[] = {
+    {"send", (PyCFunction) SolveAsync_send, METH_O, NULL},
+    {"throw", (PyCFunction) SolveAsync_throw, METH_VARARGS, NULL},
+    {"close", (PyCFunction) SolveAsync_close, METH_NOARGS, NULL},
+    {NULL,        NULL}  /* sentinel - marks the end of this structure */
+};
+
+static PyAsyncMethods SolveAsync_as_async = {
+    (unaryfunc)SolveAsync_await, /* am_await */
+    0,                          /* am_aiter */
+    0,                          /* am_anext */
+};
+
+static PyTypeObject pycryptosat_SolveAsyncType = {
+    PyVarObject_HEAD_INIT(NULL, 0) /*ob_size*/
+    "pycryptosat._SolveAsync",  /*tp_name*/
+    sizeof(SolveAsync),         /*tp_basicsize*/
+    0,                          /*tp_itemsize*/
+    (destructor)SolveAsync_dealloc, /*tp_dealloc*/
+    0,                          /*tp_print*/
+    0,                          /*tp_getattr*/
+    0,                          /*tp_setattr*/
+    &SolveAsync_as_async,       /*tp_as_async*/
+    0,                          /*tp_repr*/
+    0,                          /*tp_as_number*/
+    0,                          /*tp_as_sequence*/
+    0,                          /*tp_as_mapping*/
+    0,                          /*tp_hash */
+    0,                          /*tp_call*/
+    0,                          /*tp_str*/
+    0,                          /*tp_getattro*/
+    0,                          /*tp_setattro*/
+    0,                          /*tp_as_buffer*/
+    Py_TPFLAGS_DEFAULT,         /*tp_flags*/
+    0,                          /* tp_doc */
+    0,                          /* tp_traverse */
+    0,                          /* tp_clear */
+    0,                          /* tp_richcompare */
+    0,                          /* tp_weaklistoffset */
+    PyObject_SelfIter,          /* tp_iter */
+    (iternextfunc)SolveAsync_iternext, /* tp_iternext */
+    SolveAsync_methods,         /* tp_methods */
+};
+
+PyDoc_STRVAR(solve_async_doc,
+"solve_async(assumptions=None, verbose=None, time_limit=None, confl_limit=None, model='tuple')\n\
+Return a coroutine that solves on a dedicated worker thread, so that the\n\
+asyncio event loop keeps running meanwhile.\n\
+\n\
+The arguments are checked immediately, the solve starts when the coroutine\n\
+is first awaited. The parameters and the result are the same as those of\n\
+solve(). Cancelling the awaiting task (e.g. through a timeout of\n\
+asyncio.wait_for) interrupts the solver as soon as possible, so no CPU\n\
+keeps being used for an abandoned query.\n\
+\n\
+.. example:: \n\
+    >>> sat, solution = await s.solve_async([1, -2])\n\
+\n\
+Only one solve may run on a given Solver at a time: other calls on the\n\
+Solver, except interrupt(), raise RuntimeError until the worker is done.\n\
+Solves still running when the interpreter exits are interrupted and\n\
+waited for.\n\
+\n\
+:return: Coroutine resolving to the (sat, solution) tuple of solve()\n\
+:rtype: <coroutine>"
+);
+
+static PyObject* solve_async(Solver *self, PyObject *args, PyObject *kwds)
+{
+    PyObject* assumptions = NULL;
+    int verbose = self->verbose;
+    double time_limit = self->time_limit;
+    long confl_limit = self->confl_limit;
+    const char* model_name = NULL;
+
+    static char const* kwlist[] = {"assumptions", "verbose", "time_limit", "confl_limit", "model", NULL};
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|Oidlz", const_cast<char**>(kwlist), &assumptions, &verbose, &time_limit, &confl_limit, &model_name)) {
+        return NULL;
+    }
+    if (!check_solve_limits(verbose, time_limit, confl_limit)) {
+        return NULL;
+    }
+    ModelFormat model_format;
+    if (!parse_model_format(model_name, model_format) || !check_not_busy(self)) {
+        return NULL;
+    }
+
+    std::vector<Lit> assumption_lits;
+    if (assumptions) {
+        if (!parse_assumption_lits(assumptions, self->cmsat, assumption_lits)) {
+            return NULL;
+        }
+    }
+
+    SolveAsync *coro = PyObject_New(SolveAsync, &pycryptosat_SolveAsyncType);
+    if (coro == NULL) {
+        return NULL;
+    }
+    Py_INCREF(self);
+    coro->solver = self;
+    coro->assumption_lits = new std::vector<Lit>(std::move(assumption_lits));
+    coro->verbose = verbose;
+    coro->time_limit = time_limit;
+    coro->confl_limit = confl_limit;
+    coro->model_format = model_format;
+    coro->fut = NULL;
+    coro->fut_iter = NULL;
+
+    return (PyObject *)coro;
+}
+
+PyDoc_STRVAR(interrupt_doc,
+"interrupt()\n\
+Ask a running solve to stop as soon as possible. May be called from any\n\
+thread; the interrupted solve returns (None, None).\n\
+\n\
+:return: None\n\
+:rtype: <None>"
+);
+
+static PyObject* interrupt(Solver *self)
+{
+    self->cmsat->interrupt_asap();
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+/* Validate every cube against the current number of variables, then solve
+ * them one by one. Same contract as _add_clauses_from_array(). */
+template <typename T, typename O>
+static bool _solve_batch(
+    SATSolver *cmsat
+    , const T *literals
+    , const size_t num_lits
+    , const O *offsets
+    , const size_t num_offsets
+    , const std::vector<uint32_t>& project
+    , int8_t *status
+    , int8_t *models
+    , const bool want_conflicts
+    , std::vector<int32_t>& confl_lits
+    , std::vector<int64_t>& confl_offs
+    , std::string& err
+) {
+    if (!check_csr_offsets(offsets, num_offsets, num_lits, err)) {
+        return false;
+    }
+    const long long nvars = cmsat->nVars();
+    for (size_t k = 0; k < num_lits; k++) {
+        const long long val = literals[k];
+        if (val == 0) {
+            err = "non-zero integer expected";
+            return false;
+        }
+        if (!lit_in_range(val)) {
+            err = lit_range_error(val);
+            return false;
+        }
+        if (std::llabs(val) > nvars) {
+            err = "Variable " + std::to_string(std::llabs(val)) + " not used in clauses";
+            return false;
+        }
+    }
+
+    if (want_conflicts) {
+        confl_offs.push_back(0);
+    }
+    std::vector<Lit> cube;
+    for (size_t i = 0; i + 1 < num_offsets; i++) {
+        cube.clear();
+        for (size_t k = offsets[i]; k < (size_t)offsets[i + 1]; k++) {
+            cube.push_back(lit_from_int(literals[k]));
+        }
+
+        const lbool res = cmsat->solve(&cube);
+        status[i] = lbool_to_int8(res);
+        if (res == l_True && !project.empty()) {
+            const std::vector<lbool>& model = cmsat->get_model();
+            int8_t *row = models + i * project.size();
+            for (size_t j = 0; j < project.size(); j++) {
+                row[j] = lbool_to_int8(model[project[j]]);
+            }
+        }
+        if (want_conflicts) {
+            if (res == l_False) {
+                for (const Lit l: cmsat->get_conflict()) {
+                    confl_lits.push_back(lit_to_int(l));
+                }
+            }
+            confl_offs.push_back(confl_lits.size());
+        }
+    }
+    return true;
+}
+
+/* 1-based variables of `vars` as 0-based indices, checked against nVars() */
+template <typename T>
+static bool read_vars(
+    SATSolver *cmsat
+    , const T *vars
+    , const size_t num
+    , std::vector<uint32_t>& out
+    , std::string& err
+) {
+    const long long nvars = cmsat->nVars();
+    out.reserve(num);
+    for (size_t j = 0; j < num; j++) {
+        const long long var = vars[j];
+        if (var <= 0 || var > nvars) {
+            err = "variable " + std::to_string(var) + " must be between 1 and nb_vars()";
+            return false;
+        }
+        out.push_back(var - 1);
+    }
+    return true;
+}
+
+PyDoc_STRVAR(solve_batch_doc,
+"solve_batch(assumptions, offsets, project=None, conflicts=False, verbose=None, time_limit=None, confl_limit=None)\n\
+Solve the system once per assumption cube, back-to-back and with the GIL\n\
+released for the whole batch.\n\
+\n\
+:param assumptions: Buffer of int32/int64 literals of all cubes, without\n\
+    terminators (see add_clauses() for accepted buffers).\n\
+:param offsets: Buffer of number of cubes+1 integers; cube i is\n\
+    assumptions[offsets[i]:offsets[i+1]].\n\
+:param project: (Optional) Buffer of variables whose values should be\n\
+    returned for every satisfiable cube.\n\
+:param conflicts: (Optional) Whether to return get_conflict() of every\n\
+    unsatisfiable cube.\n\
+:param verbose: (Optional) Verbosity for this batch.\n\
+:param time_limit: (Optional) Timeout for each solve of this batch.\n\
+:param confl_limit: (Optional) Conflict limit for each solve of this batch.\n\
+:return: A tuple (status, models, conflicts).\n\
+    status is a memoryview of format 'b' with one item per cube:\n\
+    1 satisfiable, -1 unsatisfiable, 0 unknown (limit reached).\n\
+    models is None if project was not given, otherwise a 'b' memoryview\n\
+    of cubes*len(project) items, row i holding the values of the project\n\
+    variables in cube i's model (1 True, -1 False, 0 unknown or not SAT).\n\
+    conflicts is None if not requested, otherwise a CSR pair\n\
+    (memoryviews of format 'i' literals and 'q' offsets), empty for cubes\n\
+    that are not unsatisfiable.\n\
+:rtype: <tuple>"
+);
+
+static PyObject* solve_batch(Solver *self, PyObject *args, PyObject *kwds)
+{
+    PyObject *assumptions;
+    PyObject *offsets;
+    PyObject *project = NULL;
+    int want_conflicts = 0;
+    int verbose = self->verbose;
+    double time_limit = self->time_limit;
+    long confl_limit = self->confl_limit;
+
+    static char const* kwlist[] = {"assumptions", "offsets", "project", "conflicts", "verbose", "time_limit", "confl_limit", NULL};
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO|Opidl", const_cast<char**>(kwlist),
+        &assumptions, &offsets, &project, &want_conflicts, &verbose, &time_limit, &confl_limit)) {
+        return NULL;
+    }
+    if (!check_solve_limits(verbose, time_limit, confl_limit) || !check_not_busy(self)) {
+        return NULL;
+    }
+
+    Py_buffer lits_view;
+    Py_buffer offs_view;
+    Py_buffer proj_view;
+    const bool has_project = (project != NULL && project != Py_None);
+    if (!get_int_buffer(assumptions, &lits_view, "assumption array")) {
+        return NULL;
+    }
+    if (!get_int_buffer(offsets, &offs_view, "offset array")) {
+        PyBuffer_Release(&lits_view);
+        return NULL;
+    }
+    if (has_project && !get_int_buffer(project, &proj_view, "project array")) {
+        PyBuffer_Release(&offs_view);
+        PyBuffer_Release(&lits_view);
+        return NULL;
+    }
+
+    const size_t num_lits = num_items(&lits_view);
+    const size_t num_cubes = num_items(&offs_view) > 0 ? num_items(&offs_view) - 1 : 0;
+    const size_t num_proj = has_project ? num_items(&proj_view) : 0;
+    if (!check_single_run(self, num_cubes)) {
+        if (has_project) {
+            PyBuffer_Release(&proj_view);
+        }
+        PyBuffer_Release(&offs_view);
+        PyBuffer_Release(&lits_view);
+        return NULL;
+    }
+
+    int8_t *status_data = NULL;
+    int8_t *models_data = NULL;
+    PyObject *status = new_array("b", 1, num_cubes, (void**)&status_data);
+    PyObject *models = NULL;
+    if (status != NULL && has_project) {
+        models = new_array("b", 1, num_cubes * num_proj, (void**)&models_data);
+        if (models != NULL) {
+            memset(models_data, 0, num_cubes * num_proj);
+        }
+    }
+    if (status == NULL || (has_project && models == NULL)) {
+        Py_XDECREF(status);
+        if (has_project) {
+            PyBuffer_Release(&proj_view);
+        }
+        PyBuffer_Release(&offs_view);
+        PyBuffer_Release(&lits_view);
+        return NULL;
+    }
+
+    std::vector<uint32_t> proj_vars;
+    std::vector<int32_t> confl_lits;
+    std::vector<int64_t> confl_offs;
+    std::string err;
+    bool ok = true;
+    SATSolver *cmsat = self->cmsat;
+    const size_t num_offsets = num_items(&offs_view);
+    const CallTimer timer(cmsat);
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    if (has_project) {
+        ok = with_int_data(&proj_view, [&](auto vars) {
+            return read_vars(cmsat, vars, num_proj, proj_vars, err);
+        });
+    }
+    if (ok) {
+        cmsat->set_verbosity(verbose);
+        cmsat->set_max_time(time_limit);
+        cmsat->set_max_confl(confl_limit);
+        ok = with_int_data(&lits_view, [&](auto lits) {
+            return with_int_data(&offs_view, [&](auto offs) {
+                return _solve_batch(cmsat, lits, num_lits, offs, num_offsets, proj_vars,
+                    status_data, models_data, want_conflicts, confl_lits, confl_offs, err);
+            });
+        });
+        cmsat->set_verbosity(self->verbose);
+        cmsat->set_max_time(self->time_limit);
+        cmsat->set_max_confl(self->confl_limit);
+    }
+    Py_END_ALLOW_THREADS
+    timer.finish(self, Phase::solve);
+    if (ok && num_cubes > 0) {
+        self->have_model = (status_data[num_cubes-1] == 1);
+    }
+    if (has_project) {
+        PyBuffer_Release(&proj_view);
+    }
+    PyBuffer_Release(&offs_view);
+    PyBuffer_Release(&lits_view);
+
+    if (!ok) {
+        Py_DECREF(status);
+        Py_XDECREF(models);
+        PyErr_SetString(PyExc_ValueError, err.c_str());
+        return NULL;
+    }
+
+    PyObject *conflicts = NULL;
+    if (want_conflicts) {
+        PyObject *cl = array_from("i", confl_lits.data(), confl_lits.size());
+        PyObject *co = cl ? array_from("q", confl_offs.data(), confl_offs.size()) : NULL;
+        if (co == NULL) {
+            Py_XDECREF(cl);
+            Py_DECREF(status);
+            Py_XDECREF(models);
+            return NULL;
+        }
+        conflicts = Py_BuildValue("(NN)", cl, co);
+    } else {
+        Py_INCREF(Py_None);
+        conflicts = Py_None;
+    }
+    if (models == NULL) {
+        Py_INCREF(Py_None);
+        models = Py_None;
+    }
+
+    return Py_BuildValue("(NNN)", status, models, conflicts);
+}
+
+/* Iterator returned by iter_models() */
+typedef struct {
+    PyObject_HEAD
+    Solver *solver;
+    unsigned long long generation;
+    std::vector<uint32_t> *projection; // empty: all variables
+    std::vector<Lit> *assumption_lits;
+    unsigned long long remaining;
+    size_t batch;
+
+    unsigned long long count;
+    char complete;
+    char done;
+} ModelIterator;
+
+/* Find up to `batch` models, banning each one with a clause over the
+ * projection. Returns the number of models found, 0 once exhausted. */
+static size_t next_models(ModelIterator *it, std::vector<int8_t>& rows, size_t& width)
+{
+    SATSolver *cmsat = it->solver->cmsat;
+    std::vector<uint32_t>& proj = *it->projection;
+    const bool projected = !proj.empty();
+    if (projected) {
+        cmsat->set_sampling_vars(&proj);
+    }
+
+    std::vector<Lit> ban;
+    size_t found = 0;
+    width = projected ? proj.size() : cmsat->nVars();
+    while (found < it->batch && it->remaining > 0) {
+        const lbool res = cmsat->solve(it->assumption_lits, projected);
+        if (res != l_True) {
+            it->done = true;
+            it->complete = (res == l_False);
+            break;
+        }
+
+        const std::vector<lbool>& model = cmsat->get_model();
+        ban.clear();
+        for (size_t j = 0; j < width; j++) {
+            const uint32_t var = projected ? proj[j] : j;
+            rows.push_back(lbool_to_int8(model[var]));
+            if (model[var] != l_Undef) {
+                ban.push_back(Lit(var, model[var] == l_True));
+            }
+        }
+        found++;
+        it->remaining--;
+        if (!cmsat->add_clause(ban) || ban.empty()) {
+            // no other model can exist
+            it->done = true;
+            it->complete = true;
+            break;
+        }
+    }
+    if (it->remaining == 0) {
+        it->done = true;
+    }
+
+    if (projected) {
+        cmsat->set_sampling_vars(NULL);
+    }
+    return found;
+}
+
+static PyObject* ModelIterator_next_locked(ModelIterator *self)
+{
+    if (self->done) {
+        return NULL;
+    }
+    if (!check_not_busy(self->solver)) {
+        return NULL;
+    }
+    if (self->generation != self->solver->generation) {
+        PyErr_SetString(PyExc_RuntimeError, "the solver was reset since iter_models() was called");
+        return NULL;
+    }
+
+    std::vector<int8_t> rows;
+    size_t width;
+    size_t found;
+    const CallTimer timer(self->solver->cmsat);
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    found = next_models(self, rows, width);
+    Py_END_ALLOW_THREADS
+    timer.finish(self->solver, Phase::solve);
+    self->solver->have_model = false;
+    self->count += found;
+    if (found == 0) {
+        return NULL;
+    }
+
+    PyObject *flat = array_from("b", rows.data(), rows.size());
+    if (flat == NULL || width == 0) {
+        return flat;
+    }
+    PyObject *shaped = PyObject_CallMethod(flat, "cast", "s(nn)", "b", (Py_ssize_t)found, (Py_ssize_t)width);
+    Py_DECREF(flat);
+    return shaped;
+}
+
+static PyObject* ModelIterator_next(ModelIterator *self)
+{
+    if (!lock_object(self->solver)) {
+        return NULL;
+    }
+    PyObject *ret = ModelIterator_next_locked(self);
+    release_lock(self->solver->lock);
+    return ret;
+}
+
+static void ModelIterator_dealloc(ModelIterator *self)
+{
+    Py_XDECREF(self->solver);
+    delete self->projection;
+    delete self->assumption_lits;
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyMemberDef ModelIterator_members[] = {
+    {const_cast<char*>("count"), T_ULONGLONG, offsetof(ModelIterator, count), READONLY,
+        const_cast<char*>("Number of models returned so far")},
+    {const_cast<char*>("complete"), T_BOOL, offsetof(ModelIterator, complete), READONLY,
+        const_cast<char*>("True once all models have been enumerated")},
+    {NULL, 0, 0, 0, NULL}  /* sentinel */
+};
+
+static PyTypeObject pycryptosat_ModelIteratorType = {
+    PyVarObject_HEAD_INIT(NULL, 0) /*ob_size*/
+    "pycryptosat._ModelIterator", /*tp_name*/
+    sizeof(ModelIterator),      /*tp_basicsize*/
+    0,                          /*tp_itemsize*/
+    (destructor)ModelIterator_dealloc, /*tp_dealloc*/
+    0,                          /*tp_print*/
+    0,                          /*tp_getattr*/
+    0,                          /*tp_setattr*/
+    0,                          /*tp_as_async*/
+    0,                          /*tp_repr*/
+    0,                          /*tp_as_number*/
+    0,                          /*tp_as_sequence*/
+    0,                          /*tp_as_mapping*/
+    0,                          /*tp_hash */
+    0,                          /*tp_call*/
+    0,                          /*tp_str*/
+    0,                          /*tp_getattro*/
+    0,                          /*tp_setattro*/
+    0,                          /*tp_as_buffer*/
+    Py_TPFLAGS_DEFAULT,         /*tp_flags*/
+    0,                          /* tp_doc */
+    0,                          /* tp_traverse */
+    0,                          /* tp_clear */
+    0,                          /* tp_richcompare */
+    0,                          /* tp_weaklistoffset */
+    PyObject_SelfIter,          /* tp_iter */
+    (iternextfunc)ModelIterator_next, /* tp_iternext */
+    0,                          /* tp_methods */
+    ModelIterator_members,      /* tp_members */
+};
+
+PyDoc_STRVAR(iter_models_doc,
+"iter_models(projection=None, limit=None, batch=1, assumptions=None)\n\
+Enumerate models, in batches.\n\
+\n\
+After every model, a clause banning its values on the projection variables\n\
+is added to the solver, so each model is returned once per distinct\n\
+assignment of the projection. Like the --maxsol option of the\n\
+cryptominisat5 binary, these clauses stay in the solver afterwards.\n\
+\n\
+.. example:: \n\
+    >>> for models in s.iter_models(projection=[1, 2], batch=64):\n\
+    ...     for row in models.tolist():\n\
+    ...         print(row)  # e.g. [1, -1]: var 1 True, var 2 False\n\
+\n\
+:param projection: (Optional) Variables to enumerate; the solver is told\n\
+    to only guarantee values for these. Default: all variables.\n\
+:type projection: <list> or <buffer>\n\
+:param limit: (Optional) Maximum number of models. Default: no limit.\n\
+:type limit: <int>\n\
+:param batch: (Optional) Models per returned batch, found with the GIL\n\
+    released.\n\
+:type batch: <int>\n\
+:param assumptions: (Optional) Assumptions for every solve, see solve().\n\
+:type assumptions: <list>\n\
+:return: An iterator of memoryviews of format 'b' and shape\n\
+    (models, len(projection)), item [i][j] being 1 if the j-th projection\n\
+    variable is True in the i-th model, -1 if False, 0 if unknown. Its\n\
+    `count` attribute holds the number of models returned so far, and\n\
+    `complete` becomes True once no more models exist (as opposed to\n\
+    stopping because of the limit, or the time or conflict limit).\n\
+:rtype: <iterator>"
+);
+
+static PyObject* iter_models(Solver *self, PyObject *args, PyObject *kwds)
+{
+    PyObject *projection = NULL;
+    PyObject *assumptions = NULL;
+    PyObject *py_limit = NULL;
+    Py_ssize_t batch = 1;
+
+    static char const* kwlist[] = {"projection", "limit", "batch", "assumptions", NULL};
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|OOnO", const_cast<char**>(kwlist),
+        &projection, &py_limit, &batch, &assumptions)) {
+        return NULL;
+    }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+    if (self->single_run) {
+        PyErr_SetString(PyExc_RuntimeError, "single_run solvers can only solve or simplify once");
+        return NULL;
+    }
+    if (batch <= 0) {
+        PyErr_SetString(PyExc_ValueError, "batch must be at least 1");
+        return NULL;
+    }
+    unsigned long long limit = std::numeric_limits<unsigned long long>::max();
+    if (py_limit != NULL && py_limit != Py_None) {
+        limit = PyLong_AsUnsignedLongLong(py_limit);
+        if (PyErr_Occurred()) {
+            return NULL;
+        }
+    }
+
+    std::vector<uint32_t> proj;
+    if (projection != NULL && projection != Py_None) {
+        std::vector<Lit> lits;
+        if (!parse_assumption_lits(projection, self->cmsat, lits)) {
+            return NULL;
+        }
+        for (const Lit l: lits) {
+            if (l.sign()) {
+                PyErr_SetString(PyExc_ValueError, "projection must contain only positive variables");
+                return NULL;
+            }
+            proj.push_back(l.var());
+        }
+        if (proj.empty()) {
+            PyErr_SetString(PyExc_ValueError, "projection must not be empty");
+            return NULL;
+        }
+    }
+    std::vector<Lit> assumption_lits;
+    if (assumptions != NULL && assumptions != Py_None) {
+        if (!parse_assumption_lits(assumptions, self->cmsat, assumption_lits)) {
+            return NULL;
+        }
+    }
+
+    ModelIterator *it = PyObject_New(ModelIterator, &pycryptosat_ModelIteratorType);
+    if (it == NULL) {
+        return NULL;
+    }
+    Py_INCREF(self);
+    it->solver = self;
+    it->generation = self->generation;
+    it->projection = new std::vector<uint32_t>(std::move(proj));
+    it->assumption_lits = new std::vector<Lit>(std::move(assumption_lits));
+    it->remaining = limit;
+    it->batch = batch;
+    it->count = 0;
+    it->complete = false;
+    it->done = (limit == 0);
+
+    return (PyObject *)it;
+}
+
+PyDoc_STRVAR(is_satisfiable_doc,
+"is_satisfiable()\n\
+Return satisfiability of the system.\n\
+\n\
+:return: True or False\n\
+:rtype: <boolean>"
+);
+
+static PyObject* is_satisfiable(Solver *self)
+{
+    if (!check_not_busy(self) || !check_single_run(self, 1)) {
+        return NULL;
+    }
+
+    lbool res;
+    const CallTimer timer(self->cmsat);
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    res = self->cmsat->solve();
+    Py_END_ALLOW_THREADS
+    timer.finish(self, Phase::solve);
+    self->have_model = (res == l_True);
+
+    if (res == l_True) {
+        Py_INCREF(Py_True);
+        return Py_True;
+    } else if (res == l_False) {
+        Py_INCREF(Py_False);
+        return Py_False;
+    } else if (res == l_Undef) {
+        return Py_None;
+    } else {
+        // res can only be l_False, l_True, l_Undef
+        assert((res == l_False) || (res == l_True) || (res == l_Undef));
+        return NULL;
+    }
+}
+
+PyDoc_STRVAR(simplify_doc,
+"simplify(assumptions=None, strategy=None)\n\
+Run the inprocessing steps (variable elimination, equivalent literal\n\
+replacement, distillation, XOR recovery, ...) without searching for a\n\
+solution. The GIL is released.\n\
+\n\
+:param assumptions: (Optional) Literals whose variables must not be\n\
+    eliminated, e.g. the variables whose values are needed from a model of\n\
+    the formula exported by export_irred_clauses(). They are not assumed\n\
+    to hold.\n\
+:param strategy: (Optional) Comma separated schedule of simplification\n\
+    steps, e.g. 'occ-bve,scc-vrepl,distill-cls'. Default: the solver's\n\
+    inprocessing schedule.\n\
+:return: False if the formula was found unsatisfiable, None otherwise.\n\
+:rtype: <boolean> or None"
+);
+
+/* Simplification steps understood by the engine, which exits the process
+ * on anything else */
+static const char *const strategy_tokens[] = {
+    "scc-vrepl", "must-scc-vrepl", "eqlit-find", "sparsify", "full-probe",
+    "card-find", "sub-impl", "sls", "lucky", "intree-probe",
+    "sub-str-cls-with-bin", "sub-cls-with-bin", "distill-bins",
+    "distill-litrem", "distill-cls", "distill-cls-onlyrem", "must-distill-cls",
+    "must-distill-cls-onlyrem", "clean-cls", "str-impl", "cl-consolidate",
+    "louvain-comms", "renumber", "must-renumber", "breakid", "bosphorus",
+    "occ-backw-sub-str", "occ-backw-sub", "occ-del-blocked",
+    "occ-rem-unconn-assumps", "occ-ternary-res", "occ-xor", "occ-lit-rem",
+    "occ-clean-implicit", "occ-bve", "occ-rem-with-orgates",
+    "occ-cl-rem-with-orgates", "occ-bva", "occ-resolv-subs",
+};
+
+static int check_strategy(const std::string& strategy)
+{
+    std::istringstream ss(strategy);
+    std::string token;
+    while (std::getline(ss, token, ',')) {
+        const size_t start = token.find_first_not_of(" \t");
+        const size_t end = token.find_last_not_of(" \t");
+        token = (start == std::string::npos) ? "" : token.substr(start, end - start + 1);
+        std::transform(token.begin(), token.end(), token.begin(), ::tolower);
+
+        bool known = token.empty();
+        for (const char *name: strategy_tokens) {
+            known = known || token == name;
+        }
+        if (!known) {
+            PyErr_Format(PyExc_ValueError, "unknown simplification step '%s'", token.c_str());
+            return 0;
+        }
+    }
+    return 1;
+}
+
+static PyObject* simplify(Solver *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"assumptions", "strategy", NULL};
+    PyObject *assumptions = NULL;
+    const char *strategy_name = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|Oz", const_cast<char**>(kwlist), &assumptions, &strategy_name)) {
+        return NULL;
+    }
+    if (!check_not_busy(self) || !check_single_run(self, 1)) {
+        return NULL;
+    }
+
+    std::vector<Lit> assumption_lits;
+    if (assumptions != NULL && assumptions != Py_None) {
+        if (!parse_assumption_lits(assumptions, self->cmsat, assumption_lits)) {
+            return NULL;
+        }
+    }
+    const std::string strategy = strategy_name ? strategy_name : "";
+    if (!check_strategy(strategy)) {
+        return NULL;
+    }
+    self->have_model = false;
+
+    lbool res;
+    const CallTimer timer(self->cmsat);
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    res = self->cmsat->simplify(&assumption_lits, strategy_name ? &strategy : NULL);
+    Py_END_ALLOW_THREADS
+    timer.finish(self, Phase::simplify);
+
+    if (res == l_False) {
+        Py_RETURN_FALSE;
+    }
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(stats_doc,
+"stats(last=True)\n\
+Return performance counters and timings.\n\
+\n\
+:param last: Statistics of the last call of solve(), simplify(),\n\
+    is_satisfiable(), solve_async(), solve_batch() or one step of\n\
+    iter_models(), or else\n\
+    the totals since the solver was created.\n\
+:return: A dict with the 'conflicts', 'propagations', 'decisions' and\n\
+    'restarts' counters of all threads, the wall clock and process CPU\n\
+    seconds spent solving ('solve_seconds', 'solve_cpu_seconds') and\n\
+    simplifying ('simplify_seconds', 'simplify_cpu_seconds'), the seconds\n\
+    spent building the returned model ('model_seconds'), the bytes of\n\
+    proof produced before compression ('proof_bytes', with last=True\n\
+    those since the previous call) and the seconds solving waited for the\n\
+    proof writer ('proof_stall_seconds'), and the peak resident memory of\n\
+    the process in bytes ('peak_memory', None where unknown).\n\
+:rtype: <dict>"
+);
+
+static PyObject* peak_memory()
+{
+    #ifndef _WIN32
+    struct rusage ru;
+    if (getrusage(RUSAGE_SELF, &ru) == 0) {
+        #ifdef __APPLE__
+        return PyLong_FromLongLong(ru.ru_maxrss);
+        #else
+        return PyLong_FromLongLong((long long)ru.ru_maxrss * 1024);
+        #endif
+    }
+    #endif
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+static PyObject* stats(Solver *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"last", NULL};
+    int last = 1;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|p", const_cast<char**>(kwlist), &last)) {
+        return NULL;
+    }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+
+    CallStats st;
+    if (last) {
+        st = self->last_stats;
+    } else {
+        st = self->sum_stats;
+        st.conflicts = self->cmsat->get_sum_conflicts();
+        st.propagations = self->cmsat->get_sum_propagations();
+        st.decisions = self->cmsat->get_sum_decisions();
+        st.restarts = self->cmsat->get_sum_restarts();
+        if (self->proof != NULL) {
+            st.proof_bytes = self->proof->bytes;
+            st.proof_stall = self->proof->stall;
+        }
+    }
+
+    return Py_BuildValue("{s:K,s:K,s:K,s:K,s:d,s:d,s:d,s:d,s:d,s:K,s:d,s:N}",
+        "conflicts", (unsigned long long)st.conflicts,
+        "propagations", (unsigned long long)st.propagations,
+        "decisions", (unsigned long long)st.decisions,
+        "restarts", (unsigned long long)st.restarts,
+        "solve_seconds", st.solve_wall,
+        "solve_cpu_seconds", st.solve_cpu,
+        "simplify_seconds", st.simplify_wall,
+        "simplify_cpu_seconds", st.simplify_cpu,
+        "model_seconds", st.model_wall,
+        "proof_bytes", (unsigned long long)st.proof_bytes,
+        "proof_stall_seconds", st.proof_stall,
+        "peak_memory", peak_memory());
+}
+
+PyDoc_STRVAR(memory_usage_doc,
+"memory_usage()\n\
+Return the memory held by the solver, summed over its threads.\n\
+\n\
+:return: A dict of bytes per subsystem: 'clauses' (long clauses),\n\
+    'watches', 'vardata', 'search', 'renumber', 'occsimplifier', 'xor',\n\
+    'bva', 'varreplacer', 'gauss' (Gauss-Jordan matrices), 'distill' and\n\
+    'pending' (clauses not yet passed to the threads), and their 'total',\n\
+    which the max_mem setting limits. Allocator overhead and the Python\n\
+    objects are not accounted; see stats() for the process peak.\n\
+:rtype: <dict>"
+);
+
+static PyObject* memory_usage(Solver *self)
+{
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+
+    std::vector<std::pair<std::string, uint64_t> > mem;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    mem = self->cmsat->get_mem_used();
+    Py_END_ALLOW_THREADS
+
+    PyObject *result = PyDict_New();
+    if (result == NULL) {
+        return NULL;
+    }
+    uint64_t total = 0;
+    for (const auto& m: mem) {
+        total += m.second;
+    }
+    mem.push_back(std::make_pair("total", total));
+    for (const auto& m: mem) {
+        PyObject *value = PyLong_FromUnsignedLongLong(m.second);
+        if (value == NULL || PyDict_SetItemString(result, m.first.c_str(), value) != 0) {
+            Py_XDECREF(value);
+            Py_DECREF(result);
+            return NULL;
+        }
+        Py_DECREF(value);
+    }
+    return result;
+}
+
+static Callbacks* get_callbacks(Solver *self)
+{
+    if (self->callbacks == NULL) {
+        self->callbacks = new Callbacks;
+        self->callbacks->cmsat = self->cmsat;
+    }
+    return self->callbacks;
+}
+
+/* With the GIL held. A raising callback is reported like an exception in a
+ * destructor, and stops the solve. */
+static void call_learn(Callbacks *cb, const std::vector<int32_t>& lits)
+{
+    if (cb->learn == NULL || lits.empty()) {
+        return;
+    }
+    PyObject *learn = cb->learn;
+    Py_INCREF(learn);
+    PyObject *res = NULL;
+    int32_t *data;
+    PyObject *arr = new_array("i", sizeof(int32_t), lits.size(), (void**)&data);
+    if (arr != NULL) {
+        memcpy(data, lits.data(), lits.size() * sizeof(int32_t));
+        cb->running++;
+        res = PyObject_CallFunctionObjArgs(learn, arr, NULL);
+        cb->running--;
+        Py_DECREF(arr);
+    }
+    if (res == NULL) {
+        PyErr_WriteUnraisable(learn);
+        cb->cmsat->interrupt_asap();
+    }
+    Py_XDECREF(res);
+    Py_DECREF(learn);
+}
+
+static void learn_hook(void *state, const std::vector<Lit>& clause)
+{
+    Callbacks *cb = (Callbacks *)state;
+    std::vector<int32_t> batch;
+    {
+        std::lock_guard<std::mutex> lock(cb->mu);
+        for (const Lit lit: clause) {
+            cb->lits.push_back(lit_to_int(lit));
+        }
+        cb->lits.push_back(0);
+        if (++cb->num_cls < cb->batch_size) {
+            return;
+        }
+        batch.swap(cb->lits);
+        cb->num_cls = 0;
+    }
+
+    PyGILState_STATE gstate = PyGILState_Ensure();
+    call_learn(cb, batch);
+    PyGILState_Release(gstate);
+}
+
+/* Deliver the last, partial batch once a call is over. With the GIL held. */
+static void flush_learnt(Solver *self)
+{
+    Callbacks *cb = self->callbacks;
+    if (cb == NULL) {
+        return;
+    }
+    std::vector<int32_t> batch;
+    {
+        std::lock_guard<std::mutex> lock(cb->mu);
+        batch.swap(cb->lits);
+        cb->num_cls = 0;
+    }
+    call_learn(cb, batch);
+}
+
+static bool terminate_hook(void *state)
+{
+    Callbacks *cb = (Callbacks *)state;
+    PyGILState_STATE gstate = PyGILState_Ensure();
+    bool stop = false;
+    if (cb->terminate != NULL) {
+        PyObject *terminate = cb->terminate;
+        Py_INCREF(terminate);
+        cb->running++;
+        PyObject *res = PyObject_CallObject(terminate, NULL);
+        cb->running--;
+        int truth = (res == NULL) ? -1 : PyObject_IsTrue(res);
+        Py_XDECREF(res);
+        if (truth < 0) {
+            PyErr_WriteUnraisable(terminate);
+        }
+        stop = (truth != 0);
+        Py_DECREF(terminate);
+    }
+    PyGILState_Release(gstate);
+    return stop;
+}
+
+PyDoc_STRVAR(set_terminate_doc,
+"set_terminate(callback, every_n_conflicts=100)\n\
+Poll callback() while solving, e.g. to stop at an external deadline. The\n\
+solve stops, returning None, once it returns true. It is called from the\n\
+solving threads, every every_n_conflicts conflicts of each thread, and\n\
+must not call methods of this solver. A callback that raises also stops\n\
+the solve; the exception is reported through sys.unraisablehook.\n\
+\n\
+:param callback: A callable taking no argument, or None to remove it.\n\
+:param every_n_conflicts: How often to call it.\n\
+:return: None\n\
+:rtype: <None>"
+);
+
+static PyObject* set_terminate(Solver *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"callback", "every_n_conflicts", NULL};
+    PyObject *callback;
+    unsigned long long every = 100;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|K", const_cast<char**>(kwlist), &callback, &every)) {
+        return NULL;
+    }
+    if (callback != Py_None && !PyCallable_Check(callback)) {
+        PyErr_SetString(PyExc_TypeError, "callback must be callable or None");
+        return NULL;
+    }
+    if (every == 0) {
+        PyErr_SetString(PyExc_ValueError, "every_n_conflicts must be at least 1");
+        return NULL;
+    }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+
+    Callbacks *cb = get_callbacks(self);
+    Py_CLEAR(cb->terminate);
+    if (callback == Py_None) {
+        self->cmsat->set_terminate_callback(NULL, NULL);
+    } else {
+        Py_INCREF(callback);
+        cb->terminate = callback;
+        self->cmsat->set_terminate_callback(terminate_hook, cb, every);
+    }
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(set_learn_doc,
+"set_learn(callback, max_len=8, batch_size=1000)\n\
+Stream the short clauses learnt while solving, e.g. to share them with\n\
+other solvers. They are passed in batches, each call getting an int32\n\
+memoryview of zero terminated clauses that add_clauses() accepts. The\n\
+last batch of a call is passed when the call returns. The callback is\n\
+called from the solving threads and must not call methods of this\n\
+solver. A callback that raises stops the solve; the exception is reported\n\
+through sys.unraisablehook.\n\
+\n\
+:param callback: A callable taking the batch, or None to remove it.\n\
+:param max_len: Longest clause to pass.\n\
+:param batch_size: Number of clauses per call.\n\
+:return: None\n\
+:rtype: <None>"
+);
+
+static PyObject* set_learn(Solver *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"callback", "max_len", "batch_size", NULL};
+    PyObject *callback;
+    unsigned max_len = 8;
+    Py_ssize_t batch_size = 1000;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|In", const_cast<char**>(kwlist), &callback, &max_len, &batch_size)) {
+        return NULL;
+    }
+    if (callback != Py_None && !PyCallable_Check(callback)) {
+        PyErr_SetString(PyExc_TypeError, "callback must be callable or None");
+        return NULL;
+    }
+    if (max_len == 0 || batch_size <= 0) {
+        PyErr_SetString(PyExc_ValueError, "max_len and batch_size must be at least 1");
+        return NULL;
+    }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+
+    Callbacks *cb = get_callbacks(self);
+    flush_learnt(self);
+    Py_CLEAR(cb->learn);
+    if (callback == Py_None) {
+        self->cmsat->set_learn_callback(NULL, NULL, 0);
+    } else {
+        Py_INCREF(callback);
+        cb->learn = callback;
+        cb->batch_size = batch_size;
+        self->cmsat->set_learn_callback(learn_hook, cb, max_len);
+    }
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(get_conflict_doc,
+"get_conflict()\n\
+Returns the conflicts in the assumptions when the last call to solve(...)\n\
+was unsatisfiable.\n\
+\n\
+:return: Which assumptions (as passed to solve(...)) are incorrect\n\
+:rtype: <list <int>>"
+);
+
+static PyObject* get_conflict(Solver *self)
+{
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+
+    const std::vector<Lit> conflicts = self->cmsat->get_conflict();
+    PyObject *result = PyList_New(0);
+
+    for (unsigned long i = 0; i < conflicts.size(); i++) {
+        Lit lit = conflicts[i];
+        long value = lit.var() + 1;
+
+        if (lit.sign()) {
+            value *= -1;
+        }
+
+        PyObject *item = PyLong_FromLong(value);
+        PyList_Append(result, item);
+    }
+
+    return result;
+}
+
+static int reinit_solver(Solver *self, PyObject *args, PyObject *kwds);
+
+PyDoc_STRVAR(reset_doc,
+"reset(keep_config=True)\n\
+Drop all variables, clauses, callbacks and statistics, to reuse the solver\n\
+for an unrelated formula instead of making a new one.\n\
+\n\
+:param keep_config: (Optional) Set the solver up again with the arguments\n\
+    it was made with, or with the defaults of Solver() if False.\n\
+:return: None\n\
+:rtype: <None>"
+);
+
+static PyObject* reset(Solver *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"keep_config", NULL};
+    int keep_config = 1;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|p", const_cast<char**>(kwlist), &keep_config)) {
+        return NULL;
+    }
+    if (!check_not_busy(self)) {
+        return NULL;
+    }
+    // setting it up again would overwrite the proof
+    if (self->proof != NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "a solver writing a proof cannot be reset");
+        return NULL;
+    }
+
+    PyObject *init_args = keep_config ? self->init_args : NULL;
+    PyObject *init_kwds = keep_config ? self->init_kwds : NULL;
+    PyObject *no_args = init_args == NULL ? PyTuple_New(0) : NULL;
+    if (init_args == NULL && no_args == NULL) {
+        return NULL;
+    }
+    // kept alive by our references while reinit_solver() swaps them
+    Py_XINCREF(init_args);
+    Py_XINCREF(init_kwds);
+    const int ok = reinit_solver(self, init_args != NULL ? init_args : no_args, init_kwds);
+    Py_XDECREF(init_args);
+    Py_XDECREF(init_kwds);
+    Py_XDECREF(no_args);
+    if (!ok) {
+        return NULL;
+    }
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+/*************************** Method definitions *************************/
+
+static PyMethodDef Solver_methods[] = {
+    {"solve",     (PyCFunction) locked<Solver, solve>,       METH_VARARGS | METH_KEYWORDS, solve_doc},
+    {"solve_step", (PyCFunction) locked<Solver, solve_step>, METH_VARARGS | METH_KEYWORDS, solve_step_doc},
+    {"solve_async", (PyCFunction) locked<Solver, solve_async>, METH_VARARGS | METH_KEYWORDS, solve_async_doc},
+    {"interrupt", (PyCFunction) interrupt, METH_NOARGS, interrupt_doc},
+    {"iter_models", (PyCFunction) locked<Solver, iter_models>, METH_VARARGS | METH_KEYWORDS, iter_models_doc},
+    {"solve_batch", (PyCFunction) locked<Solver, solve_batch>, METH_VARARGS | METH_KEYWORDS, solve_batch_doc},
+    {"add_clause",(PyCFunction) locked<Solver, add_clause>,  METH_VARARGS | METH_KEYWORDS, add_clause_doc},
+    {"add_clauses", (PyCFunction) locked<Solver, add_clauses>,  METH_VARARGS | METH_KEYWORDS, add_clauses_doc},
+    {"read_dimacs", (PyCFunction) locked<Solver, read_dimacs>, METH_VARARGS | METH_KEYWORDS, read_dimacs_doc},
+    {"add_xor_clause",(PyCFunction) locked<Solver, add_xor_clause>,  METH_VARARGS | METH_KEYWORDS, "adds an XOR clause to the system"},
+    {"add_xor_clauses", (PyCFunction) locked<Solver, add_xor_clauses>, METH_VARARGS | METH_KEYWORDS, add_xor_clauses_doc},
+    {"nb_vars", (PyCFunction) locked_noargs<Solver, nb_vars>, METH_VARARGS | METH_KEYWORDS, nb_vars_doc},
+    //{"nb_clauses", (PyCFunction) nb_clauses, METH_VARARGS | METH_KEYWORDS, "returns number of clauses"},
+    {"is_satisfiable", (PyCFunction) locked_noargs<Solver, is_satisfiable>, METH_VARARGS | METH_KEYWORDS, is_satisfiable_doc},
+    {"get_conflict", (PyCFunction) locked_noargs<Solver, get_conflict>, METH_VARARGS | METH_KEYWORDS, get_conflict_doc},
+    {"get_model_buffer", (PyCFunction) locked<Solver, get_model_buffer>, METH_VARARGS | METH_KEYWORDS, get_model_buffer_doc},
+    {"stats", (PyCFunction) locked<Solver, stats>, METH_VARARGS | METH_KEYWORDS, stats_doc},
+    {"memory_usage", (PyCFunction) locked_noargs<Solver, memory_usage>, METH_NOARGS, memory_usage_doc},
+    {"reset", (PyCFunction) locked<Solver, reset>, METH_VARARGS | METH_KEYWORDS, reset_doc},
+    {"set_terminate", (PyCFunction) locked<Solver, set_terminate>, METH_VARARGS | METH_KEYWORDS, set_terminate_doc},
+    {"set_learn", (PyCFunction) locked<Solver, set_learn>, METH_VARARGS | METH_KEYWORDS, set_learn_doc},
+
+    {"start_getting_small_clauses", (PyCFunction) locked<Solver, start_getting_small_clauses>, METH_VARARGS | METH_KEYWORDS, start_getting_small_clauses_doc},
+    {"get_next_small_clause", (PyCFunction) locked<Solver, get_next_small_clause>, METH_VARARGS | METH_KEYWORDS, get_next_small_clause_doc},
+    {"end_getting_small_clauses", (PyCFunction) locked<Solver, end_getting_small_clauses>, METH_VARARGS | METH_KEYWORDS, end_getting_small_clauses_doc},
+    {"get_small_clauses", (PyCFunction) locked<Solver, get_small_clauses>, METH_VARARGS | METH_KEYWORDS, get_small_clauses_doc},
+    {"simplify", (PyCFunction) locked<Solver, simplify>, METH_VARARGS | METH_KEYWORDS, simplify_doc},
+    {"export_irred_clauses", (PyCFunction) locked_noargs<Solver, export_irred_clauses>, METH_NOARGS, export_irred_clauses_doc},
+    {"get_vsids_scores", (PyCFunction) locked_noargs<Solver, get_vsids_scores>, METH_NOARGS, get_vsids_scores_doc},
+    {"get_var_incidence", (PyCFunction) locked<Solver, get_var_incidence>, METH_VARARGS | METH_KEYWORDS, get_var_incidence_doc},
+    {"get_lit_incidence", (PyCFunction) locked_noargs<Solver, get_lit_incidence>, METH_NOARGS, get_lit_incidence_doc},
+    {"get_zero_assigned_lits", (PyCFunction) locked_noargs<Solver, get_zero_assigned_lits>, METH_NOARGS, get_zero_assigned_lits_doc},
+    {"get_all_binary_xors", (PyCFunction) locked_noargs<Solver, get_all_binary_xors>, METH_NOARGS, get_all_binary_xors_doc},
+    {"add_atmost", (PyCFunction) locked<Solver, add_atmost>, METH_VARARGS | METH_KEYWORDS, add_atmost_doc},
+    {"add_atleast", (PyCFunction) locked<Solver, add_atleast>, METH_VARARGS | METH_KEYWORDS, add_atleast_doc},
+    {"add_exactly", (PyCFunction) locked<Solver, add_exactly>, METH_VARARGS | METH_KEYWORDS, add_exactly_doc},
+    {"add_pb", (PyCFunction) locked<Solver, add_pb>, METH_VARARGS | METH_KEYWORDS, add_pb_doc},
+    {"set_phases", (PyCFunction) locked<Solver, set_phases>, METH_VARARGS | METH_KEYWORDS, set_phases_doc},
+    {"set_var_weights", (PyCFunction) locked<Solver, set_var_weights>, METH_VARARGS | METH_KEYWORDS, set_var_weights_doc},
+    {NULL,        NULL}  /* sentinel - marks the end of this structure */
+};
+
+static int
+Solver_traverse(Solver *self, visitproc visit, void *arg)
+{
+    if (self->callbacks != NULL) {
+        Py_VISIT(self->callbacks->terminate);
+        Py_VISIT(self->callbacks->learn);
+    }
+    return 0;
+}
+
+static int
+Solver_clear(Solver *self)
+{
+    if (self->callbacks != NULL) {
+        Py_CLEAR(self->callbacks->terminate);
+        Py_CLEAR(self->callbacks->learn);
+    }
+    return 0;
+}
+
+static void
+Solver_dealloc(Solver* self)
+{
+    PyObject_GC_UnTrack(self);
+    Solver_clear(self);
+    delete self->cmsat;
+    delete self->callbacks;
+    // the engine wrote the end of the proof when deleted
+    if (self->proof != NULL) {
+        proof_close(self->proof);
+    }
+    Py_XDECREF(self->init_args);
+    Py_XDECREF(self->init_kwds);
+    Py_TYPE(self)->tp_free ((PyObject*) self);
+}
+
+/* Replace the engine, if any, by a new one set up from args and kwds,
+ * dropping everything added to or registered with the old one. */
+static int reinit_solver(Solver *self, PyObject *args, PyObject *kwds)
+{
+    PyObject *kwds_copy = NULL;
+    if (kwds != NULL && (kwds_copy = PyDict_Copy(kwds)) == NULL) {
+        return 0;
+    }
+    Py_INCREF(args);
+
+    delete self->cmsat;
+    self->cmsat = NULL;
+    // the callbacks were registered with the old engine
+    Solver_clear(self);
+    delete self->callbacks;
+    self->callbacks = NULL;
+    if (self->proof != NULL) {
+        proof_close(self->proof);
+        self->proof = NULL;
+    }
+    self->weights_given.clear();
+    self->have_model = false;
+    self->generation++;
+
+    setup_solver(self, args, kwds_copy);
+    Py_XSETREF(self->init_args, args);
+    Py_XSETREF(self->init_kwds, kwds_copy);
+    return self->cmsat != NULL;
+}
+
+static int
+Solver_init(Solver *self, PyObject *args, PyObject *kwds)
+{
+    if (!check_not_busy(self)) {
+        return -1;
+    }
+    if (!reinit_solver(self, args, kwds)) {
+        return -1;
+    }
+    return 0;
+}
+
+static PyTypeObject pycryptosat_SolverType = {
+    PyVarObject_HEAD_INIT(NULL, 0) /*ob_size*/
+    "pycryptosat.Solver",       /*tp_name*/
+    sizeof(Solver),             /*tp_basicsize*/
+    0,                          /*tp_itemsize*/
+    (destructor)Solver_dealloc, /*tp_dealloc*/
+    0,                          /*tp_print*/
+    0,                          /*tp_getattr*/
+    0,                          /*tp_setattr*/
+    0,                          /*tp_compare*/
+    0,                          /*tp_repr*/
+    0,                          /*tp_as_number*/
+    0,                          /*tp_as_sequence*/
+    0,                          /*tp_as_mapping*/
+    0,                          /*tp_hash */
+    0,                          /*tp_call*/
+    0,                          /*tp_str*/
+    0,                          /*tp_getattro*/
+    0,                          /*tp_setattro*/
+    0,                          /*tp_as_buffer*/
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE | Py_TPFLAGS_HAVE_GC, /*tp_flags*/
+    solver_create_docstring,    /* tp_doc */
+    (traverseproc)Solver_traverse, /* tp_traverse */
+    (inquiry)Solver_clear,      /* tp_clear */
+    0,                          /* tp_richcompare */
+    0,                          /* tp_weaklistoffset */
+    0,                          /* tp_iter */
+    0,                          /* tp_iternext */
+    Solver_methods,             /* tp_methods */
+    0,                          /* tp_members */
+    0,                          /* tp_getset */
+    0,                          /* tp_base */
+    0,                          /* tp_dict */
+    0,                          /* tp_descr_get */
+    0,                          /* tp_descr_set */
+    0,                          /* tp_dictoffset */
+    (initproc)Solver_init,      /* tp_init */
+};
+
+/* Clauses of a Portfolio, kept once for all its members, each terminated by
+ * lit_Undef. Offers the part of the SATSolver interface the clause adders use. */
+struct ClauseStore {
+    std::vector<Lit> lits;
+    uint32_t num_vars = 0;
+
+    uint32_t nVars() const { return num_vars; }
+    void new_vars(const size_t n) { num_vars += n; }
+    bool add_clause(const std::vector<Lit>& clause) {
+        lits.insert(lits.end(), clause.begin(), clause.end());
+        lits.push_back(lit_Undef);
+        return true;
+    }
+};
+
+struct PortfolioState {
+    ClauseStore store;
+    std::vector<SATSolver*> members;
+    std::vector<size_t> synced;     // how much of the store each member has
+    std::vector<Lit> tmp_cl_lits;
+
+    ~PortfolioState() {
+        for (SATSolver *member: members) {
+            delete member;
+        }
+    }
+};
+
+/* One Portfolio.solve() call, shared by its worker threads */
+struct PortfolioRun {
+    std::mutex mu;
+    std::condition_variable cv;
+    std::atomic<size_t> next{0};
+    size_t running = 0;
+    int winner = -1;
+    lbool result = l_Undef;
+};
+
+typedef struct {
+    PyObject_HEAD
+    PortfolioState *state;
+    PyObject *configs;
+    unsigned num_threads;
+    int winner;
+    ObjectLock lock;
+
+    // set while solve() runs, protected by lock
+    bool busy;
+} Portfolio;
+
+static int lock_object(Portfolio *self)
+{
+    return acquire_lock(self->lock);
+}
+
+/* Add the clauses of the store that the member has not seen yet */
+static void sync_member(SATSolver *cmsat, const ClauseStore& store, size_t& at, std::vector<Lit>& lits)
+{
+    grow_vars(cmsat, (long long)store.num_vars - 1);
+    lits.clear();
+    for (; at < store.lits.size(); at++) {
+        const Lit lit = store.lits[at];
+        if (lit != lit_Undef) {
+            lits.push_back(lit);
+            continue;
+        }
+        cmsat->add_clause(lits);
+        lits.clear();
+    }
+}
+
+/* Take configs in order and solve with them until one has an answer */
+static void portfolio_worker(
+    PortfolioState *state
+    , PortfolioRun *run
+    , const std::vector<Lit> *assumptions
+    , const double time_limit
+    , const long confl_limit
+) {
+    std::vector<Lit> lits;
+    for (;;) {
+        const size_t i = run->next++;
+        if (i >= state->members.size()) {
+            break;
+        }
+        {
+            std::lock_guard<std::mutex> lock(run->mu);
+            if (run->winner >= 0) {
+                break;
+            }
+        }
+
+        SATSolver *cmsat = state->members[i];
+        sync_member(cmsat, state->store, state->synced[i], lits);
+        cmsat->set_max_time(time_limit);
+        cmsat->set_max_confl(confl_limit);
+        const lbool res = cmsat->solve(assumptions);
+        if (res != l_Undef) {
+            std::lock_guard<std::mutex> lock(run->mu);
+            if (run->winner < 0) {
+                run->winner = (int)i;
+                run->result = res;
+            }
+            run->cv.notify_all();
+        }
+    }
+
+    std::lock_guard<std::mutex> lock(run->mu);
+    run->running--;
+    run->cv.notify_all();
+}
+
+static int check_portfolio_not_busy(Portfolio *self)
+{
+    if (self->busy) {
+        PyErr_SetString(PyExc_RuntimeError, "portfolio is busy solving");
+        return 0;
+    }
+    return 1;
+}
+
+static const char portfolio_create_docstring[] = \
+"Portfolio(configs, threads=0)\n\
+Race differently configured solvers on the same clauses; the first\n\
+definitive answer wins and interrupts the others.\n\
+\n\
+Clauses are validated and stored once. Each member solver loads the ones\n\
+it has not seen yet, in its own thread, when solve() is called.\n\
+\n\
+.. example:: \n\
+    >>> p = Portfolio([{'seed': 1}, {'seed': 2, 'polarity_mode': 'rnd'},\n\
+    ...                {'no_simplify': True}, {'sls': 0}])\n\
+    >>> p.add_clauses(clauses)\n\
+    >>> sat, solution = p.solve()\n\
+    >>> p.winner  # index of the config that answered\n\
+\n\
+:param configs: Sequence of dicts of solver settings, named after the\n\
+    SATSolver setters without their set_ prefix: 'seed', 'polarity_mode'\n\
+    ('pos', 'neg', 'rnd', 'auto', 'stable', 'best', 'best_inv', 'saved'\n\
+    or 'weighted'), 'preset' and the other settings of Solver(), except\n\
+    'single_run'.\n\
+:param threads: Number of configs run at once. Further configs start when\n\
+    one gives up on its time or conflict limit. Default: all of them.\n\
+:type configs: <list>\n\
+:type threads: <int>";
+
+static int Portfolio_init(Portfolio *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"configs", "threads", NULL};
+    PyObject *configs;
+    int num_threads = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|i", const_cast<char**>(kwlist), &configs, &num_threads)) {
+        return -1;
+    }
+    if (!check_portfolio_not_busy(self)) {
+        return -1;
+    }
+    if (num_threads < 0) {
+        PyErr_SetString(PyExc_ValueError, "number of threads must be at least 0");
+        return -1;
+    }
+    PyObject *config_tuple = PySequence_Tuple(configs);
+    if (config_tuple == NULL) {
+        return -1;
+    }
+    if (PyTuple_GET_SIZE(config_tuple) == 0) {
+        PyErr_SetString(PyExc_ValueError, "at least one config expected");
+        Py_DECREF(config_tuple);
+        return -1;
+    }
+
+    PortfolioState *state = new PortfolioState;
+    for (Py_ssize_t i = 0; i < PyTuple_GET_SIZE(config_tuple); i++) {
+        SATSolver *cmsat = new SATSolver;
+        state->members.push_back(cmsat);
+        state->synced.push_back(0);
+        bool single_run = false;
+        if (!apply_config(cmsat, PyTuple_GET_ITEM(config_tuple, i), &single_run) || single_run) {
+            if (single_run) {
+                PyErr_SetString(PyExc_ValueError, "portfolio members are solved repeatedly, single_run is not supported");
+            }
+            delete state;
+            Py_DECREF(config_tuple);
+            return -1;
+        }
+    }
+
+    delete self->state;
+    self->state = state;
+    Py_XSETREF(self->configs, config_tuple);
+    self->num_threads = num_threads == 0 ? state->members.size() : num_threads;
+    self->num_threads = std::min<size_t>(self->num_threads, state->members.size());
+    self->winner = -1;
+    return 0;
+}
+
+static void Portfolio_dealloc(Portfolio *self)
+{
+    delete self->state;
+    Py_XDECREF(self->configs);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static int check_portfolio_ready(Portfolio *self)
+{
+    if (self->state == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "Portfolio.__init__() was not called");
+        return 0;
+    }
+    return check_portfolio_not_busy(self);
+}
+
+PyDoc_STRVAR(portfolio_add_clauses_doc,
+"add_clauses(clauses, offsets=None)\n\
+Add clauses for all configs, in any form Solver.add_clauses() accepts.\n\
+\n\
+:return: None\n\
+:rtype: <None>"
+);
+
+static PyObject* Portfolio_add_clauses(Portfolio *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"clauses", "offsets", NULL};
+    PyObject *clauses;
+    PyObject *offsets = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|O", const_cast<char**>(kwlist), &clauses, &offsets)) {
+        return NULL;
+    }
+    if (!check_portfolio_ready(self)) {
+        return NULL;
+    }
+    ClauseStore *store = &self->state->store;
+    std::vector<Lit>& lits = self->state->tmp_cl_lits;
+
+    if (offsets != NULL && offsets != Py_None) {
+        if (!add_clauses_csr(store, lits, clauses, offsets, false)) {
+            return NULL;
+        }
+        Py_INCREF(Py_None);
+        return Py_None;
+    }
+
+    if (PyObject_CheckBuffer(clauses)) {
+        if (!add_clauses_buffer(store, lits, clauses, false)) {
+            return NULL;
+        }
+        Py_INCREF(Py_None);
+        return Py_None;
+    }
+
+    PyObject *iterator = PyObject_GetIter(clauses);
+    if (iterator == NULL) {
+        PyErr_SetString(PyExc_TypeError, "iterable object expected");
+        return NULL;
+    }
+
+    PyObject *clause;
+    while ((clause = PyIter_Next(iterator)) != NULL) {
+        lits.clear();
+        const int ok = parse_clause(store, clause, lits);
+        Py_DECREF(clause);
+        if (!ok) {
+            break;
+        }
+        store->add_clause(lits);
+    }
+
+    Py_DECREF(iterator);
+    if (PyErr_Occurred()) {
+        return NULL;
+    }
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+PyDoc_STRVAR(portfolio_solve_doc,
+"solve(assumptions=None, time_limit=max_numeric_limits, confl_limit=max_numeric_limits)\n\
+Solve with all configs, return the first definitive answer.\n\
+\n\
+:param assumptions: (Optional) Allows the user to set values to specific\n\
+    variables in the solver in a temporary fashion.\n\
+:param time_limit: (Optional) Seconds each config may spend.\n\
+:param confl_limit: (Optional) Conflicts each config may spend.\n\
+:return: A tuple (satisfiable, solution) like Solver.solve(). The winning\n\
+    config is then in the 'winner' attribute, None if no config answered.\n\
+:rtype: <tuple>"
+);
+
+static PyObject* Portfolio_solve(Portfolio *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"assumptions", "time_limit", "confl_limit", NULL};
+    PyObject *assumptions = NULL;
+    double time_limit = std::numeric_limits<double>::max();
+    long confl_limit = std::numeric_limits<long>::max();
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|Odl", const_cast<char**>(kwlist),
+        &assumptions, &time_limit, &confl_limit))
+    {
+        return NULL;
+    }
+    if (!check_solve_limits(0, time_limit, confl_limit) || !check_portfolio_ready(self)) {
+        return NULL;
+    }
+
+    PortfolioState *state = self->state;
+    std::vector<Lit> assumption_lits;
+    if (assumptions && !parse_assumption_lits(assumptions, &state->store, assumption_lits)) {
+        return NULL;
+    }
+
+    self->busy = true;
+    PortfolioRun run;
+    size_t started = 0;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    std::vector<std::thread> threads;
+    run.running = self->num_threads;
+    for (unsigned i = 0; i < self->num_threads; i++) {
+        try {
+            threads.emplace_back(portfolio_worker, state, &run, &assumption_lits, time_limit, confl_limit);
+        } catch (const std::system_error&) {
+            std::lock_guard<std::mutex> lock(run.mu);
+            run.running--;
+        }
+    }
+    started = threads.size();
+    {
+        // the first answer interrupts the others. Keep interrupting until
+        // they are all back: a solve() starting now clears the flag first.
+        std::unique_lock<std::mutex> lock(run.mu);
+        run.cv.wait(lock, [&run]{ return run.winner >= 0 || run.running == 0; });
+        while (run.running > 0) {
+            for (SATSolver *member: state->members) {
+                member->interrupt_asap();
+            }
+            run.cv.wait_for(lock, std::chrono::milliseconds(1));
+        }
+    }
+    for (std::thread& t: threads) {
+        t.join();
+    }
+    Py_END_ALLOW_THREADS
+    self->busy = false;
+
+    if (started == 0) {
+        PyErr_SetString(PyExc_RuntimeError, "could not start any solver thread");
+        return NULL;
+    }
+
+    self->winner = run.winner;
+    if (run.result == l_True) {
+        PyObject *solution = get_solution(state->members[run.winner]);
+        if (solution == NULL) {
+            return NULL;
+        }
+        return Py_BuildValue("(ON)", Py_True, solution);
+    }
+    return Py_BuildValue("(OO)", run.result == l_False ? Py_False : Py_None, Py_None);
+}
+
+static PyObject* Portfolio_nb_vars(Portfolio *self)
+{
+    if (!check_portfolio_ready(self)) {
+        return NULL;
+    }
+    return PyLong_FromUnsignedLong(self->state->store.nVars());
+}
+
+static PyObject* Portfolio_get_winner(Portfolio *self, void *closure)
+{
+    if (self->winner < 0) {
+        Py_INCREF(Py_None);
+        return Py_None;
+    }
+    return PyLong_FromLong(self->winner);
+}
+
+static PyMethodDef Portfolio_methods[] = {
+    {"solve", (PyCFunction) locked<Portfolio, Portfolio_solve>, METH_VARARGS | METH_KEYWORDS, portfolio_solve_doc},
+    {"add_clauses", (PyCFunction) locked<Portfolio, Portfolio_add_clauses>, METH_VARARGS | METH_KEYWORDS, portfolio_add_clauses_doc},
+    {"nb_vars", (PyCFunction) locked_noargs<Portfolio, Portfolio_nb_vars>, METH_NOARGS, nb_vars_doc},
+    {NULL, NULL}  /* sentinel */
+};
+
+static PyMemberDef Portfolio_members[] = {
+    {const_cast<char*>("configs"), T_OBJECT, offsetof(Portfolio, configs), READONLY,
+        const_cast<char*>("The configs, as a tuple")},
+    {const_cast<char*>("threads"), T_UINT, offsetof(Portfolio, num_threads), READONLY,
+        const_cast<char*>("Number of configs run at once")},
+    {NULL, 0, 0, 0, NULL}  /* sentinel */
+};
+
+static PyGetSetDef Portfolio_getset[] = {
+    {const_cast<char*>("winner"), (getter)Portfolio_get_winner, NULL,
+        const_cast<char*>("Index of the config that answered the last solve(), or None"), NULL},
+    {NULL, NULL, NULL, NULL, NULL}  /* sentinel */
+};
+
+static PyTypeObject pycryptosat_PortfolioType = {
+    PyVarObject_HEAD_INIT(NULL, 0) /*ob_size*/
+    "pycryptosat.Portfolio",    /*tp_name*/
+    sizeof(Portfolio),          /*tp_basicsize*/
+    0,                          /*tp_itemsize*/
+    (destructor)Portfolio_dealloc, /*tp_dealloc*/
+    0,                          /*tp_print*/
+    0,                          /*tp_getattr*/
+    0,                          /*tp_setattr*/
+    0,                          /*tp_compare*/
+    0,                          /*tp_repr*/
+    0,                          /*tp_as_number*/
+    0,                          /*tp_as_sequence*/
+    0,                          /*tp_as_mapping*/
+    0,                          /*tp_hash */
+    0,                          /*tp_call*/
+    0,                          /*tp_str*/
+    0,                          /*tp_getattro*/
+    0,                          /*tp_setattro*/
+    0,                          /*tp_as_buffer*/
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE, /*tp_flags*/
+    portfolio_create_docstring, /* tp_doc */
+    0,                          /* tp_traverse */
+    0,                          /* tp_clear */
+    0,                          /* tp_richcompare */
+    0,                          /* tp_weaklistoffset */
+    0,                          /* tp_iter */
+    0,                          /* tp_iternext */
+    Portfolio_methods,          /* tp_methods */
+    Portfolio_members,          /* tp_members */
+    Portfolio_getset,           /* tp_getset */
+    0,                          /* tp_base */
+    0,                          /* tp_dict */
+    0,                          /* tp_descr_get */
+    0,                          /* tp_descr_set */
+    0,                          /* tp_dictoffset */
+    (initproc)Portfolio_init,   /* tp_init */
+};
+
+/*************************** Solver pool *************************/
+
+typedef struct {
+    PyObject_HEAD
+    PyObject *config;   // Solver() keyword arguments
+    PyObject *free;     // list of reset solvers
+    Py_ssize_t size;
+    ObjectLock lock;
+} SolverPool;
+
+static int lock_object(SolverPool *self)
+{
+    return acquire_lock(self->lock);
+}
+
+static PyObject* new_pool_solver(SolverPool *self)
+{
+    PyObject *no_args = PyTuple_New(0);
+    if (no_args == NULL) {
+        return NULL;
+    }
+    PyObject *solver = PyObject_Call((PyObject *)&pycryptosat_SolverType, no_args, self->config);
+    Py_DECREF(no_args);
+    return solver;
+}
+
+static int check_pool_ready(SolverPool *self)
+{
+    if (self->free == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "SolverPool.__init__() was not called");
+        return 0;
+    }
+    return 1;
+}
+
+static const char pool_create_docstring[] = \
+"SolverPool(size, config=None)\n\
+Keep up to size solvers set up alike, to hand out instead of making and\n\
+destroying one per query.\n\
+\n\
+.. example:: \n\
+    >>> pool = SolverPool(4, {'time_limit': 0.1})\n\
+    >>> s = pool.acquire()\n\
+    >>> s.add_clauses(clauses)\n\
+    >>> sat, solution = s.solve()\n\
+    >>> pool.release(s)  # reset, ready for the next acquire()\n\
 \n\
-:param assumptions: (Optional) Allows the user to set values to specific\n\
-    ariables in the solver in a temporary fashion. This means that in case\n\
-    the problem is satisfiable but e.g it's unsatisfiable if variable 2 is\n\
-    FALSE, then solve([-2]) will return UNSAT. However, a subsequent call to\n\
-    solve() will still return a solution.\n\
-:type assumptions: <list>\n\
-:param verbose: (Optional) Allows the user to set a verbosity for just this\n\
-    solve.\n\
-:type verbose: <int>\n\
-:param time_limit: (Optional) Allows the user to set a timeout for just this\n\
-    solve.\n\
-:type time_limit: <double>\n\
-:param confl_limit: (Optional) Allows the user to set a conflict limit for just\n\
-    this solve.\n\
-:type confl_limit: <long>\n\
-:return: A tuple. First part of the tuple indicates whether the problem\n\
-    is satisfiable. The second part is a tuple contains the solution,\n\
-    preceded by None, so you can index into it with the variable number.\n\
-    E.g. solution[1] returns the value for variable 1.\n\
-:rtype: <tuple <tuple>>"
+:param size: Number of solvers made up front and kept when released.\n\
+:param config: (Optional) Dict of keyword arguments of Solver(), except\n\
+    'proof'.\n\
+:type size: <int>\n\
+:type config: <dict>";
+
+static int SolverPool_init(SolverPool *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"size", "config", NULL};
+    Py_ssize_t size;
+    PyObject *config = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "n|O", const_cast<char**>(kwlist), &size, &config)) {
+        return -1;
+    }
+    if (size < 0) {
+        PyErr_SetString(PyExc_ValueError, "size must be at least 0");
+        return -1;
+    }
+    if (config == Py_None) {
+        config = NULL;
+    }
+    if (config != NULL && !PyDict_Check(config)) {
+        PyErr_SetString(PyExc_TypeError, "config must be a dict");
+        return -1;
+    }
+    // reset() refuses solvers writing a proof
+    PyObject *proof = config != NULL ? PyDict_GetItemString(config, "proof") : NULL;
+    if (proof != NULL && proof != Py_None) {
+        PyErr_SetString(PyExc_ValueError, "pooled solvers cannot write a proof");
+        return -1;
+    }
+
+    PyObject *config_copy = config != NULL ? PyDict_Copy(config) : NULL;
+    PyObject *free = PyList_New(0);
+    if ((config != NULL && config_copy == NULL) || free == NULL) {
+        Py_XDECREF(config_copy);
+        Py_XDECREF(free);
+        return -1;
+    }
+    Py_XSETREF(self->config, config_copy);
+    Py_XSETREF(self->free, free);
+    self->size = size;
+    for (Py_ssize_t i = 0; i < size; i++) {
+        PyObject *solver = new_pool_solver(self);
+        if (solver == NULL || PyList_Append(self->free, solver) != 0) {
+            Py_XDECREF(solver);
+            Py_CLEAR(self->free);
+            return -1;
+        }
+        Py_DECREF(solver);
+    }
+    return 0;
+}
+
+static void SolverPool_dealloc(SolverPool *self)
+{
+    Py_XDECREF(self->config);
+    Py_XDECREF(self->free);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+PyDoc_STRVAR(pool_acquire_doc,
+"acquire()\n\
+Hand out a solver without clauses, a new one if none is left.\n\
+\n\
+:return: A Solver, to give back with release() when done.\n\
+:rtype: <Solver>"
 );
 
-static PyObject* solve(Solver *self, PyObject *args, PyObject *kwds)
+static PyObject* SolverPool_acquire(SolverPool *self)
 {
-    PyObject* assumptions = NULL;
+    if (!check_pool_ready(self)) {
+        return NULL;
+    }
+    const Py_ssize_t num_free = PyList_GET_SIZE(self->free);
+    PyObject *solver;
+    if (num_free > 0) {
+        solver = PyList_GET_ITEM(self->free, num_free - 1);
+        Py_INCREF(solver);
+        if (PyList_SetSlice(self->free, num_free - 1, num_free, NULL) != 0) {
+            Py_DECREF(solver);
+            return NULL;
+        }
+    } else if ((solver = new_pool_solver(self)) == NULL) {
+        return NULL;
+    }
+    ((Solver *)solver)->pool = self;
+    return solver;
+}
 
-    int verbose = self->verbose;
-    double time_limit = self->time_limit;
-    long confl_limit = self->confl_limit;
+PyDoc_STRVAR(pool_release_doc,
+"release(solver)\n\
+Reset a solver handed out by acquire() and keep it for the next one, unless\n\
+size solvers are kept already. The solver must not be used afterwards.\n\
+\n\
+:param solver: The Solver.\n\
+:return: None\n\
+:rtype: <None>"
+);
+
+static PyObject* SolverPool_release(SolverPool *self, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"solver", NULL};
+    PyObject *solver;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O!", const_cast<char**>(kwlist),
+        &pycryptosat_SolverType, &solver))
+    {
+        return NULL;
+    }
+    if (!check_pool_ready(self)) {
+        return NULL;
+    }
+    if (((Solver *)solver)->pool != self) {
+        PyErr_SetString(PyExc_ValueError, "solver is not handed out by this pool");
+        return NULL;
+    }
+
+    PyObject *res = PyObject_CallMethod(solver, "reset", NULL);
+    if (res == NULL) {
+        return NULL;
+    }
+    Py_DECREF(res);
+    ((Solver *)solver)->pool = NULL;
+    if (PyList_GET_SIZE(self->free) < self->size && PyList_Append(self->free, solver) != 0) {
+        return NULL;
+    }
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+static PyObject* SolverPool_get_available(SolverPool *self, void *closure)
+{
+    return PyLong_FromSsize_t(self->free != NULL ? PyList_GET_SIZE(self->free) : 0);
+}
+
+static PyMethodDef SolverPool_methods[] = {
+    {"acquire", (PyCFunction) locked_noargs<SolverPool, SolverPool_acquire>, METH_NOARGS, pool_acquire_doc},
+    {"release", (PyCFunction) locked<SolverPool, SolverPool_release>, METH_VARARGS | METH_KEYWORDS, pool_release_doc},
+    {NULL, NULL}  /* sentinel */
+};
+
+static PyMemberDef SolverPool_members[] = {
+    {const_cast<char*>("size"), T_PYSSIZET, offsetof(SolverPool, size), READONLY,
+        const_cast<char*>("Number of solvers kept")},
+    {NULL, 0, 0, 0, NULL}  /* sentinel */
+};
+
+static PyGetSetDef SolverPool_getset[] = {
+    {const_cast<char*>("available"), (getter)SolverPool_get_available, NULL,
+        const_cast<char*>("Number of solvers ready to be handed out"), NULL},
+    {NULL, NULL, NULL, NULL, NULL}  /* sentinel */
+};
+
+static PyTypeObject pycryptosat_SolverPoolType = {
+    PyVarObject_HEAD_INIT(NULL, 0) /*ob_size*/
+    "pycryptosat.SolverPool",   /*tp_name*/
+    sizeof(SolverPool),         /*tp_basicsize*/
+    0,                          /*tp_itemsize*/
+    (destructor)SolverPool_dealloc, /*tp_dealloc*/
+    0,                          /*tp_print*/
+    0,                          /*tp_getattr*/
+    0,                          /*tp_setattr*/
+    0,                          /*tp_compare*/
+    0,                          /*tp_repr*/
+    0,                          /*tp_as_number*/
+    0,                          /*tp_as_sequence*/
+    0,                          /*tp_as_mapping*/
+    0,                          /*tp_hash */
+    0,                          /*tp_call*/
+    0,                          /*tp_str*/
+    0,                          /*tp_getattro*/
+    0,                          /*tp_setattro*/
+    0,                          /*tp_as_buffer*/
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE, /*tp_flags*/
+    pool_create_docstring,      /* tp_doc */
+    0,                          /* tp_traverse */
+    0,                          /* tp_clear */
+    0,                          /* tp_richcompare */
+    0,                          /* tp_weaklistoffset */
+    0,                          /* tp_iter */
+    0,                          /* tp_iternext */
+    SolverPool_methods,         /* tp_methods */
+    SolverPool_members,         /* tp_members */
+    SolverPool_getset,          /* tp_getset */
+    0,                          /* tp_base */
+    0,                          /* tp_dict */
+    0,                          /* tp_descr_get */
+    0,                          /* tp_descr_set */
+    0,                          /* tp_dictoffset */
+    (initproc)SolverPool_init,  /* tp_init */
+};
+
+/*************************** Cube and conquer *************************/
+
+#ifndef _WIN32
+/* Shared with the worker processes of cube_and_conquer(), in an anonymous
+ * shared mapping followed by the per cube status (int8), the per literal
+ * "in the core" flags (uint8) and the winner's model (int8, nVars()+1). */
+struct CubeShared {
+    std::atomic<uint64_t> next;     // next cube to take
+    std::atomic<int64_t> winner;    // first satisfiable cube, or -1
+    std::atomic<bool> stop;
+};
+static_assert(std::atomic<uint64_t>::is_always_lock_free, "atomics must work across processes");
+
+struct CubeJob {
+    CubeShared *shared;
+    int8_t *status;
+    uint8_t *in_core;
+    int8_t *model;
+    const std::vector<Lit> *lits;
+    const std::vector<size_t> *offsets;
+};
+
+static bool cube_terminate(void *state)
+{
+    return ((CubeShared *)state)->stop.load(std::memory_order_relaxed);
+}
+
+/* Body of a forked worker: no Python from here on, the process _exit()s */
+static void cube_worker(SATSolver *cmsat, const CubeJob& job)
+{
+    // the parent's callbacks would call into Python
+    cmsat->set_learn_callback(NULL, NULL, 0);
+    cmsat->set_terminate_callback(cube_terminate, job.shared, 16);
+
+    const size_t num_cubes = job.offsets->size() - 1;
+    std::vector<uint8_t> in_conflict(2*(size_t)cmsat->nVars(), 0);
+    std::vector<Lit> cube;
+    for (;;) {
+        const uint64_t i = job.shared->next.fetch_add(1);
+        if (i >= num_cubes || job.shared->stop.load()) {
+            break;
+        }
+        const size_t begin = (*job.offsets)[i];
+        const size_t end = (*job.offsets)[i+1];
+        cube.assign(job.lits->begin() + begin, job.lits->begin() + end);
+
+        const lbool res = cmsat->solve(&cube);
+        if (res == l_False) {
+            const std::vector<Lit>& conflict = cmsat->get_conflict();
+            for (const Lit l: conflict) {
+                in_conflict[l.toInt()] = 1;
+            }
+            for (size_t k = begin; k < end; k++) {
+                job.in_core[k] = in_conflict[(~(*job.lits)[k]).toInt()];
+            }
+            for (const Lit l: conflict) {
+                in_conflict[l.toInt()] = 0;
+            }
+        } else if (res == l_True) {
+            int64_t none = -1;
+            if (job.shared->winner.compare_exchange_strong(none, (int64_t)i)) {
+                const std::vector<lbool>& model = cmsat->get_model();
+                for (size_t v = 0; v < cmsat->nVars(); v++) {
+                    job.model[v+1] = lbool_to_int8(model[v]);
+                }
+            }
+            job.shared->stop.store(true);
+        }
+        job.status[i] = lbool_to_int8(res);
+    }
+    fflush(NULL);
+    std::cout.flush();
+}
+
+/* Cubes given as an iterable of iterables, or as a CSR pair of buffers like
+ * solve_batch() takes, checked against the variables of the solver */
+template <typename T, typename O>
+static bool read_cubes_csr(
+    const T *literals
+    , const size_t num_lits
+    , const O *offsets
+    , const size_t num_offsets
+    , const long long nvars
+    , std::vector<Lit>& lits
+    , std::vector<size_t>& offs
+    , std::string& err
+) {
+    if (!check_csr_offsets(offsets, num_offsets, num_lits, err)) {
+        return false;
+    }
+    for (size_t k = 0; k < num_lits; k++) {
+        const long long val = literals[k];
+        if (val == 0) {
+            err = "non-zero integer expected";
+            return false;
+        }
+        if (!lit_in_range(val)) {
+            err = lit_range_error(val);
+            return false;
+        }
+        if (std::llabs(val) > nvars) {
+            err = "Variable " + std::to_string(std::llabs(val)) + " not used in clauses";
+            return false;
+        }
+        lits.push_back(lit_from_int(val));
+    }
+    offs.assign(offsets, offsets + num_offsets);
+    return true;
+}
+
+static int read_cubes(Solver *solver, PyObject *cubes, PyObject *offsets, std::vector<Lit>& lits, std::vector<size_t>& offs)
+{
+    if (offsets != NULL && offsets != Py_None) {
+        Py_buffer lits_view;
+        Py_buffer offs_view;
+        if (!get_int_buffer(cubes, &lits_view, "cube array")) {
+            return 0;
+        }
+        if (!get_int_buffer(offsets, &offs_view, "offset array")) {
+            PyBuffer_Release(&lits_view);
+            return 0;
+        }
+        std::string err;
+        const bool ok = with_int_data(&lits_view, [&](auto literals) {
+            return with_int_data(&offs_view, [&](auto offs_data) {
+                return read_cubes_csr(literals, num_items(&lits_view), offs_data, num_items(&offs_view),
+                    solver->cmsat->nVars(), lits, offs, err);
+            });
+        });
+        PyBuffer_Release(&offs_view);
+        PyBuffer_Release(&lits_view);
+        if (!ok) {
+            PyErr_SetString(PyExc_ValueError, err.c_str());
+            return 0;
+        }
+        return 1;
+    }
+
+    PyObject *iterator = PyObject_GetIter(cubes);
+    if (iterator == NULL) {
+        PyErr_SetString(PyExc_TypeError, "iterable object expected");
+        return 0;
+    }
+    offs.push_back(0);
+    PyObject *cube;
+    while ((cube = PyIter_Next(iterator)) != NULL) {
+        const int ok = parse_assumption_lits(cube, solver->cmsat, lits);
+        Py_DECREF(cube);
+        if (!ok) {
+            Py_DECREF(iterator);
+            return 0;
+        }
+        offs.push_back(lits.size());
+    }
+    Py_DECREF(iterator);
+    return !PyErr_Occurred();
+}
+
+/* Fork up to num_procs workers, wait for all of them. Returns false with an
+ * exception set if none could be started, a worker died or a signal handler
+ * raised, the workers then being killed. */
+static bool run_cube_workers(SATSolver *cmsat, const CubeJob& job, const size_t num_procs)
+{
+    std::vector<pid_t> pids;
+    fflush(NULL);
+    std::cout.flush();
+    for (size_t i = 0; i < num_procs; i++) {
+        const pid_t pid = fork();
+        if (pid == 0) {
+            signal(SIGINT, SIG_DFL);
+            cube_worker(cmsat, job);
+            _exit(0);
+        }
+        if (pid < 0) {
+            break;
+        }
+        pids.push_back(pid);
+    }
+    if (pids.empty()) {
+        PyErr_SetFromErrno(PyExc_OSError);
+        return false;
+    }
+
+    bool ok = true;
+    int died = 0;
+    for (const pid_t pid: pids) {
+        int wstatus;
+        pid_t ret;
+        for (;;) {
+            Py_BEGIN_ALLOW_THREADS      /* release GIL */
+            ret = waitpid(pid, &wstatus, 0);
+            Py_END_ALLOW_THREADS
+            if (ret >= 0 || errno != EINTR) {
+                break;
+            }
+            if (ok && PyErr_CheckSignals() < 0) {
+                ok = false;
+                job.shared->stop.store(true);
+                for (const pid_t p: pids) {
+                    kill(p, SIGKILL);
+                }
+            }
+        }
+        if (ret == pid && !(WIFEXITED(wstatus) && WEXITSTATUS(wstatus) == 0) && died == 0) {
+            died = WIFSIGNALED(wstatus) ? -WTERMSIG(wstatus) : WEXITSTATUS(wstatus);
+        }
+    }
+    if (ok && died != 0) {
+        if (died < 0) {
+            PyErr_Format(PyExc_RuntimeError, "cube_and_conquer() worker killed by signal %d", -died);
+        } else {
+            PyErr_Format(PyExc_RuntimeError, "cube_and_conquer() worker exited with status %d", died);
+        }
+        ok = false;
+    }
+    return ok;
+}
+#endif
 
-    static char const* kwlist[] = {"assumptions", "verbose", "time_limit", "confl_limit", NULL};
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|Oidl", const_cast<char**>(kwlist), &assumptions, &verbose, &time_limit, &confl_limit)) {
+PyDoc_STRVAR(cube_and_conquer_doc,
+"cube_and_conquer(solver, cubes, offsets=None, processes=0, simplify=True, time_limit=None, confl_limit=None)\n\
+Solve the solver's formula under each cube in parallel worker processes,\n\
+until one cube is satisfiable or all have been tried. The solver is\n\
+simplified once, then forked: the workers share its clauses copy-on-write\n\
+and take cubes from a common queue, so nothing is ingested again. The\n\
+first satisfiable cube stops all workers. The solver itself is only\n\
+changed by the simplification. POSIX only; the solver must have been\n\
+created with threads=1.\n\
+\n\
+:param solver: The Solver holding the formula.\n\
+:param cubes: Iterable of cubes, each an iterable of literals (ints), or,\n\
+    with offsets, a buffer of the literals of all cubes (see solve_batch()).\n\
+:param offsets: (Optional) Buffer of number of cubes+1 integers; cube i is\n\
+    cubes[offsets[i]:offsets[i+1]].\n\
+:param processes: Number of worker processes, 0 for one per CPU.\n\
+:param simplify: Whether to simplify the solver before forking.\n\
+:param time_limit: (Optional) Timeout for each cube.\n\
+:param confl_limit: (Optional) Conflict limit for each cube.\n\
+:return: A tuple (status, winner, model, conflicts).\n\
+    status is a memoryview of format 'b' with one item per cube:\n\
+    1 satisfiable, -1 unsatisfiable, 0 unknown (limit reached, or not\n\
+    tried once a model was found). winner is the index of the cube model\n\
+    belongs to, or None. model is a memoryview of format 'b' as returned\n\
+    by get_model_buffer(), or None. conflicts is a CSR pair (memoryviews\n\
+    of format 'i' literals and 'q' offsets) holding get_conflict() of every\n\
+    unsatisfiable cube, empty for the others.\n\
+:rtype: <tuple>"
+);
+
+static PyObject* cube_and_conquer_locked(
+    Solver *solver
+    , PyObject *cubes
+    , PyObject *offsets
+    , const int num_procs
+    , const bool simplify
+    , const double time_limit
+    , const long confl_limit
+) {
+    #ifdef _WIN32
+    PyErr_SetString(PyExc_NotImplementedError, "cube_and_conquer() needs fork()");
+    return NULL;
+    #else
+    if (!check_not_busy(solver)) {
         return NULL;
     }
-    if (verbose < 0) {
-        PyErr_SetString(PyExc_ValueError, "verbosity must be at least 0");
+    if (solver->single_run) {
+        PyErr_SetString(PyExc_RuntimeError, "cube_and_conquer() cannot use single_run solvers");
         return NULL;
     }
-    if (time_limit < 0) {
-        PyErr_SetString(PyExc_ValueError, "time_limit must be at least 0");
+    if (solver->num_threads > 1) {
+        PyErr_SetString(PyExc_ValueError, "cube_and_conquer() needs a solver with threads=1");
         return NULL;
     }
-    if (confl_limit < 0) {
-        PyErr_SetString(PyExc_ValueError, "conflict limit must be at least 0");
+
+    std::vector<Lit> lits;
+    std::vector<size_t> offs;
+    if (!read_cubes(solver, cubes, offsets, lits, offs)) {
         return NULL;
     }
+    const size_t num_cubes = offs.size() - 1;
+    const size_t num_vars = solver->cmsat->nVars();
 
-    std::vector<Lit> assumption_lits;
-    if (assumptions) {
-        if (!parse_assumption_lits(assumptions, self->cmsat, assumption_lits)) {
-            return 0;
+    lbool simplified = l_Undef;
+    if (simplify) {
+        solver->have_model = false;
+        const CallTimer timer(solver->cmsat);
+        Py_BEGIN_ALLOW_THREADS      /* release GIL */
+        // keep the cube variables, or every worker would have to undo
+        // their elimination again for each cube
+        std::vector<uint8_t> in_cube(num_vars, 0);
+        std::vector<Lit> cube_vars;
+        for (const Lit lit: lits) {
+            if (!in_cube[lit.var()]) {
+                in_cube[lit.var()] = 1;
+                cube_vars.push_back(Lit(lit.var(), false));
+            }
         }
+        simplified = solver->cmsat->simplify(&cube_vars);
+        Py_END_ALLOW_THREADS
+        timer.finish(solver, Phase::simplify);
     }
 
-    self->cmsat->set_verbosity(verbose);
-    self->cmsat->set_max_time(time_limit);
-    self->cmsat->set_max_confl(confl_limit);
-
-    PyObject *result = PyTuple_New((Py_ssize_t) 2);
-    if (result == NULL) {
-        PyErr_SetString(PyExc_SystemError, "failed to create a tuple");
+    const size_t status_at = sizeof(CubeShared);
+    const size_t in_core_at = status_at + num_cubes;
+    const size_t model_at = in_core_at + lits.size();
+    const size_t size = model_at + num_vars + 1;
+    void *mem = mmap(NULL, size, PROT_READ | PROT_WRITE, MAP_SHARED | MAP_ANONYMOUS, -1, 0);
+    if (mem == MAP_FAILED) {
+        PyErr_SetFromErrno(PyExc_OSError);
         return NULL;
     }
+    CubeJob job;
+    job.shared = new (mem) CubeShared();
+    job.shared->next.store(0);
+    job.shared->winner.store(-1);
+    job.shared->stop.store(false);
+    job.status = (int8_t *)mem + status_at;
+    job.in_core = (uint8_t *)mem + in_core_at;
+    job.model = (int8_t *)mem + model_at;
+    job.lits = &lits;
+    job.offsets = &offs;
 
-    lbool res;
-    Py_BEGIN_ALLOW_THREADS      /* release GIL */
-    res = self->cmsat->solve(&assumption_lits);
-    Py_END_ALLOW_THREADS
+    bool ok = true;
+    if (simplified == l_False) {
+        // no cube can be satisfiable, and the conflicts are empty
+        memset(job.status, -1, num_cubes);
+    } else if (num_cubes > 0) {
+        const unsigned num_cpus = std::max(1U, std::thread::hardware_concurrency());
+        const size_t procs = std::min<size_t>(num_procs > 0 ? num_procs : num_cpus, num_cubes);
+        // only the workers' copies see the limits
+        const double old_time_limit = solver->time_limit;
+        const long old_confl_limit = solver->confl_limit;
+        solver->cmsat->set_max_time(time_limit);
+        solver->cmsat->set_max_confl(confl_limit);
+        ok = run_cube_workers(solver->cmsat, job, procs);
+        solver->cmsat->set_max_time(old_time_limit);
+        solver->cmsat->set_max_confl(old_confl_limit);
+    }
 
-    self->cmsat->set_verbosity(self->verbose);
-    self->cmsat->set_max_time(self->time_limit);
-    self->cmsat->set_max_confl(self->confl_limit);
+    PyObject *result = NULL;
+    if (ok) {
+        std::vector<int32_t> confl_lits;
+        std::vector<int64_t> confl_offs(1, 0);
+        for (size_t i = 0; i < num_cubes; i++) {
+            if (job.status[i] == -1) {
+                for (size_t k = offs[i]; k < offs[i+1]; k++) {
+                    if (job.in_core[k]) {
+                        confl_lits.push_back(lit_to_int(~lits[k]));
+                    }
+                }
+            }
+            confl_offs.push_back(confl_lits.size());
+        }
+        const int64_t winner = job.shared->winner.load();
 
-    if (res == l_True) {
-        PyObject* solution = get_solution(self->cmsat);
-        if (!solution) {
-            Py_DECREF(result);
+        PyObject *status = array_from("b", job.status, num_cubes);
+        PyObject *model = NULL;
+        if (winner >= 0) {
+            model = array_from("b", job.model, num_vars + 1);
+        } else {
+            Py_INCREF(Py_None);
+            model = Py_None;
+        }
+        PyObject *cl = array_from("i", confl_lits.data(), confl_lits.size());
+        PyObject *co = array_from("q", confl_offs.data(), confl_offs.size());
+        if (status != NULL && model != NULL && cl != NULL && co != NULL) {
+            if (winner >= 0) {
+                result = Py_BuildValue("(NLN(NN))", status, (long long)winner, model, cl, co);
+            } else {
+                result = Py_BuildValue("(NON(NN))", status, Py_None, model, cl, co);
+            }
+        } else {
+            Py_XDECREF(status);
+            Py_XDECREF(model);
+            Py_XDECREF(cl);
+            Py_XDECREF(co);
+        }
+    }
+    job.shared->~CubeShared();
+    munmap(mem, size);
+    return result;
+    #endif
+}
+
+static PyObject* cube_and_conquer(PyObject *module, PyObject *args, PyObject *kwds)
+{
+    static char const* kwlist[] = {"solver", "cubes", "offsets", "processes", "simplify", "time_limit", "confl_limit", NULL};
+    Solver *solver;
+    PyObject *cubes;
+    PyObject *offsets = NULL;
+    int num_procs = 0;
+    int simplify = 1;
+    PyObject *time_obj = Py_None;
+    PyObject *confl_obj = Py_None;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O!O|OipOO", const_cast<char**>(kwlist),
+        &pycryptosat_SolverType, &solver, &cubes, &offsets, &num_procs, &simplify, &time_obj, &confl_obj)) {
+        return NULL;
+    }
+    if (num_procs < 0) {
+        PyErr_SetString(PyExc_ValueError, "number of processes must be at least 0");
+        return NULL;
+    }
+    double time_limit = solver->time_limit;
+    long confl_limit = solver->confl_limit;
+    if (time_obj != Py_None) {
+        time_limit = PyFloat_AsDouble(time_obj);
+        if (time_limit == -1.0 && PyErr_Occurred()) {
             return NULL;
         }
-        Py_INCREF(Py_True);
+    }
+    if (confl_obj != Py_None) {
+        confl_limit = PyLong_AsLong(confl_obj);
+        if (confl_limit == -1 && PyErr_Occurred()) {
+            return NULL;
+        }
+    }
+    if (!check_solve_limits(0, time_limit, confl_limit) || !lock_object(solver)) {
+        return NULL;
+    }
+    PyObject *ret = cube_and_conquer_locked(solver, cubes, offsets, num_procs, simplify, time_limit, confl_limit);
+    release_lock(solver->lock);
+    return ret;
+}
 
-        PyTuple_SET_ITEM(result, 0, Py_True);
-        PyTuple_SET_ITEM(result, 1, solution);
+/*************************** Model checking *************************/
 
-    } else if (res == l_False) {
-        Py_INCREF(Py_False);
-        Py_INCREF(Py_None);
+/* Violated constraints found by check_model(), clauses first, then XORs */
+struct ModelCheck {
+    size_t index = 0;
+    size_t first = 0;
+    size_t violated = 0;
 
-        PyTuple_SET_ITEM(result, 0, Py_False);
-        PyTuple_SET_ITEM(result, 1, Py_None);
+    void next(const bool satisfied)
+    {
+        if (!satisfied && violated++ == 0) {
+            first = index;
+        }
+        index++;
+    }
+};
 
-    } else if (res == l_Undef) {
-        Py_INCREF(Py_None);
-        Py_INCREF(Py_None);
+/* Value of a literal under a model of items 1, -1 or 0 (unknown) */
+static inline int lit_value(const long long val, const int8_t *model, const size_t model_len)
+{
+    const long long var = std::llabs(val);
+    const int value = (size_t)var < model_len ? model[var] : 0;
+    return val < 0 ? -value : value;
+}
 
-        PyTuple_SET_ITEM(result, 0, Py_None);
-        PyTuple_SET_ITEM(result, 1, Py_None);
-    } else {
-        // res can only be l_False, l_True, l_Undef
-        assert((res == l_False) || (res == l_True) || (res == l_Undef));
-        Py_DECREF(result);
-        return PyErr_NewExceptionWithDoc("pycryptosat.IllegalState", "Error Occurred in CyrptoMiniSat", NULL, NULL);
+/* Zero separated clauses like _add_clauses_from_array(), empty ones skipped.
+ * Does not touch any Python object: may run with the GIL released. */
+template <typename T>
+static bool check_clauses(
+    const T *array
+    , const size_t array_length
+    , const int8_t *model
+    , const size_t model_len
+    , ModelCheck& check
+    , std::string& err
+) {
+    if (array_length > 0 && array[array_length - 1] != 0) {
+        err = "last clause not terminated by zero";
+        return false;
     }
-
-    return result;
+    bool satisfied = false;
+    bool empty = true;
+    for (size_t k = 0; k < array_length; k++) {
+        const long long val = array[k];
+        if (val == 0) {
+            if (!empty) {
+                check.next(satisfied);
+            }
+            satisfied = false;
+            empty = true;
+            continue;
+        }
+        if (!lit_in_range(val)) {
+            err = lit_range_error(val);
+            return false;
+        }
+        satisfied |= lit_value(val, model, model_len) > 0;
+        empty = false;
+    }
+    return true;
 }
 
-PyDoc_STRVAR(is_satisfiable_doc,
-"is_satisfiable()\n\
-Return satisfiability of the system.\n\
-\n\
-:return: True or False\n\
-:rtype: <boolean>"
-);
+/* XORs in the layout of _add_xor_clauses(), unsatisfied if any of their
+ * variables is unknown */
+template <typename T, typename O, typename R>
+static bool check_xors(
+    const T *vars
+    , const size_t num_vars
+    , const O *offsets
+    , const size_t num_offsets
+    , const R *rhs
+    , const size_t num_rhs
+    , const int8_t *model
+    , const size_t model_len
+    , ModelCheck& check
+    , std::string& err
+) {
+    if (!check_csr_offsets(offsets, num_offsets, num_vars, err)) {
+        return false;
+    }
+    if (num_rhs != num_offsets - 1) {
+        err = "rhs must have one item per XOR clause (len(offsets)-1)";
+        return false;
+    }
+    for (size_t i = 0; i < num_rhs; i++) {
+        bool parity = false;
+        bool known = true;
+        for (size_t k = offsets[i]; k < (size_t)offsets[i + 1]; k++) {
+            const long long val = vars[k];
+            if (val <= 0 || !lit_in_range(val)) {
+                err = val <= 0 ? "XOR clause must contain only positive variables (not inverted literals)"
+                    : lit_range_error(val);
+                return false;
+            }
+            const int value = lit_value(val, model, model_len);
+            parity ^= value > 0;
+            known &= value != 0;
+        }
+        check.next(known && parity == (rhs[i] != 0));
+    }
+    return true;
+}
 
-static PyObject* is_satisfiable(Solver *self)
+/* A model as accepted by check_model(), as items 1, -1 or 0 */
+static int parse_model(PyObject *obj, std::vector<int8_t>& model)
 {
-    lbool res;
-    Py_BEGIN_ALLOW_THREADS      /* release GIL */
-    res = self->cmsat->solve();
-    Py_END_ALLOW_THREADS
+    if (PyObject_CheckBuffer(obj)) {
+        Py_buffer view;
+        if (!get_int_buffer(obj, &view, "model", true)) {
+            return 0;
+        }
+        const char fmt = item_format(&view);
+        if (fmt == 'B') {
+            PyBuffer_Release(&view);
+            PyErr_SetString(PyExc_ValueError,
+                "invalid model: packed models are not supported, use get_model_buffer(packed=False)");
+            return 0;
+        }
+        const size_t num = num_items(&view);
+        model.resize(num);
+        if (fmt == '?') {
+            const uint8_t *data = (const uint8_t *)view.buf;
+            for (size_t i = 0; i < num; i++) {
+                model[i] = data[i] ? 1 : -1;
+            }
+        } else if (fmt == 'b') {
+            memcpy(model.data(), view.buf, num);
+        } else {
+            with_int_data(&view, [&](auto data) {
+                for (size_t i = 0; i < num; i++) {
+                    model[i] = (data[i] > 0) - (data[i] < 0);
+                }
+                return true;
+            });
+        }
+        PyBuffer_Release(&view);
+        return 1;
+    }
 
-    if (res == l_True) {
-        Py_INCREF(Py_True);
-        return Py_True;
-    } else if (res == l_False) {
-        Py_INCREF(Py_False);
-        return Py_False;
-    } else if (res == l_Undef) {
-        return Py_None;
-    } else {
-        // res can only be l_False, l_True, l_Undef
-        assert((res == l_False) || (res == l_True) || (res == l_Undef));
-        return NULL;
+    PyObject *seq = PySequence_Fast(obj, "model must be a sequence or a buffer");
+    if (seq == NULL) {
+        return 0;
+    }
+    const Py_ssize_t num = PySequence_Fast_GET_SIZE(seq);
+    PyObject **items = PySequence_Fast_ITEMS(seq);
+    model.resize(num);
+    for (Py_ssize_t i = 0; i < num; i++) {
+        if (items[i] == Py_None) {
+            model[i] = 0;
+        } else if (PyBool_Check(items[i])) {
+            model[i] = items[i] == Py_True ? 1 : -1;
+        } else {
+            PyErr_SetString(PyExc_TypeError, "model items must be True, False or None");
+            Py_DECREF(seq);
+            return 0;
+        }
     }
+    Py_DECREF(seq);
+    return 1;
 }
 
-PyDoc_STRVAR(get_conflict_doc,
-"get_conflict()\n\
-Returns the conflicts in the assumptions when the last call to solve(...)\n\
-was unsatisfiable.\n\
+PyDoc_STRVAR(check_model_doc,
+"check_model(clauses, model, xors=None)\n\
+Check a model against clauses and XOR clauses, e.g. to audit the result of\n\
+a solve. Runs with the GIL released.\n\
 \n\
-:return: Which assumptions (as passed to solve(...)) are incorrect\n\
-:rtype: <list <int>>"
+:param clauses: C-contiguous buffer of signed 32 or 64 bit integers, the\n\
+    clauses back to back, each terminated by a zero, as add_clauses() takes.\n\
+:param model: The model as returned by solve() or get_model_buffer(),\n\
+    indexed by variable with index 0 unused: a sequence of True, False or\n\
+    None, a buffer of bools, or a buffer of 8, 32 or 64 bit integers\n\
+    whose sign gives the value, 0 for unknown. Variables past its end are\n\
+    unknown.\n\
+:param xors: (Optional) Tuple (vars, offsets, rhs) of XOR clauses in the\n\
+    layout add_xor_clauses() takes.\n\
+:return: A tuple (first, count): the index of the first constraint not\n\
+    satisfied, or None, and the number of those. Clauses are numbered from\n\
+    0, ignoring empty ones, then the XOR clauses after them. A literal of\n\
+    an unknown variable does not satisfy a clause, and an XOR clause over\n\
+    one is not satisfied.\n\
+:rtype: <tuple>"
 );
 
-static PyObject* get_conflict(Solver *self)
+static PyObject* check_model(PyObject *module, PyObject *args, PyObject *kwds)
 {
-    const std::vector<Lit> conflicts = self->cmsat->get_conflict();
-    PyObject *result = PyList_New(0);
-
-    for (unsigned long i = 0; i < conflicts.size(); i++) {
-        Lit lit = conflicts[i];
-        long value = lit.var() + 1;
-
-        if (lit.sign()) {
-            value *= -1;
+    static char const* kwlist[] = {"clauses", "model", "xors", NULL};
+    PyObject *clauses;
+    PyObject *model_obj;
+    PyObject *xors = Py_None;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO|O", const_cast<char**>(kwlist), &clauses, &model_obj, &xors)) {
+        return NULL;
+    }
+    PyObject *xor_vars = NULL;
+    PyObject *xor_offsets = NULL;
+    PyObject *xor_rhs = NULL;
+    if (xors != Py_None) {
+        if (!PyTuple_Check(xors) || PyTuple_GET_SIZE(xors) != 3) {
+            PyErr_SetString(PyExc_TypeError, "xors must be a tuple (vars, offsets, rhs)");
+            return NULL;
         }
-
-        PyObject *item = PyLong_FromLong(value);
-        PyList_Append(result, item);
+        xor_vars = PyTuple_GET_ITEM(xors, 0);
+        xor_offsets = PyTuple_GET_ITEM(xors, 1);
+        xor_rhs = PyTuple_GET_ITEM(xors, 2);
     }
 
-    return result;
-}
-
-/*************************** Method definitions *************************/
-
-static PyMethodDef Solver_methods[] = {
-    {"solve",     (PyCFunction) solve,       METH_VARARGS | METH_KEYWORDS, solve_doc},
-    {"add_clause",(PyCFunction) add_clause,  METH_VARARGS | METH_KEYWORDS, add_clause_doc},
-    {"add_clauses", (PyCFunction) add_clauses,  METH_VARARGS | METH_KEYWORDS, add_clauses_doc},
-    {"add_xor_clause",(PyCFunction) add_xor_clause,  METH_VARARGS | METH_KEYWORDS, "adds an XOR clause to the system"},
-    {"nb_vars", (PyCFunction) nb_vars, METH_VARARGS | METH_KEYWORDS, nb_vars_doc},
-    //{"nb_clauses", (PyCFunction) nb_clauses, METH_VARARGS | METH_KEYWORDS, "returns number of clauses"},
-    {"is_satisfiable", (PyCFunction) is_satisfiable, METH_VARARGS | METH_KEYWORDS, is_satisfiable_doc},
-    {"get_conflict", (PyCFunction) get_conflict, METH_VARARGS | METH_KEYWORDS, get_conflict_doc},
-
-    {"start_getting_small_clauses", (PyCFunction) start_getting_small_clauses, METH_VARARGS | METH_KEYWORDS, start_getting_small_clauses_doc},
-    {"get_next_small_clause", (PyCFunction) get_next_small_clause, METH_VARARGS | METH_KEYWORDS, get_next_small_clause_doc},
-    {"end_getting_small_clauses", (PyCFunction) end_getting_small_clauses, METH_VARARGS | METH_KEYWORDS, end_getting_small_clauses_doc},
-    {NULL,        NULL}  /* sentinel - marks the end of this structure */
-};
+    std::vector<int8_t> model;
+    if (!parse_model(model_obj, model)) {
+        return NULL;
+    }
 
-static void
-Solver_dealloc(Solver* self)
-{
-    delete self->cmsat;
-    Py_TYPE(self)->tp_free ((PyObject*) self);
-}
+    Py_buffer cls_view;
+    Py_buffer views[3];
+    int num_views = 0;
+    if (get_int_buffer(clauses, &cls_view, "clause array") == 0) {
+        return NULL;
+    }
+    if (xor_vars != NULL) {
+        const char *what[] = {"variable array", "offset array", "rhs array"};
+        PyObject *objs[] = {xor_vars, xor_offsets, xor_rhs};
+        for (; num_views < 3; num_views++) {
+            if (get_int_buffer(objs[num_views], &views[num_views], what[num_views], num_views == 2) == 0) {
+                break;
+            }
+        }
+        if (num_views < 3) {
+            while (num_views > 0) {
+                PyBuffer_Release(&views[--num_views]);
+            }
+            PyBuffer_Release(&cls_view);
+            return NULL;
+        }
+    }
 
-static int
-Solver_init(Solver *self, PyObject *args, PyObject *kwds)
-{
-    if (self->cmsat != NULL) {
-        delete self->cmsat;
+    ModelCheck check;
+    std::string err;
+    bool ok;
+    Py_BEGIN_ALLOW_THREADS      /* release GIL */
+    ok = with_int_data(&cls_view, [&](auto array) {
+        return check_clauses(array, num_items(&cls_view), model.data(), model.size(), check, err);
+    });
+    if (ok && num_views == 3) {
+        ok = with_int_data(&views[0], [&](auto vs) {
+            return with_int_data(&views[1], [&](auto offs) {
+                return with_flag_data(&views[2], [&](auto rs) {
+                    return check_xors(vs, num_items(&views[0]), offs, num_items(&views[1]),
+                        rs, num_items(&views[2]), model.data(), model.size(), check, err);
+                });
+            });
+        });
+    }
+    Py_END_ALLOW_THREADS
+    while (num_views > 0) {
+        PyBuffer_Release(&views[--num_views]);
     }
+    PyBuffer_Release(&cls_view);
 
-    setup_solver(self, args, kwds);
-    if (!self->cmsat) {
-        return -1;
+    if (!ok) {
+        PyErr_SetString(PyExc_ValueError, err.c_str());
+        return NULL;
     }
-    return 0;
+    if (check.violated == 0) {
+        return Py_BuildValue("(On)", Py_None, (Py_ssize_t)0);
+    }
+    return Py_BuildValue("(nn)", (Py_ssize_t)check.first, (Py_ssize_t)check.violated);
 }
 
-static PyTypeObject pycryptosat_SolverType = {
-    PyVarObject_HEAD_INIT(NULL, 0) /*ob_size*/
-    "pycryptosat.Solver",       /*tp_name*/
-    sizeof(Solver),             /*tp_basicsize*/
-    0,                          /*tp_itemsize*/
-    (destructor)Solver_dealloc, /*tp_dealloc*/
-    0,                          /*tp_print*/
-    0,                          /*tp_getattr*/
-    0,                          /*tp_setattr*/
-    0,                          /*tp_compare*/
-    0,                          /*tp_repr*/
-    0,                          /*tp_as_number*/
-    0,                          /*tp_as_sequence*/
-    0,                          /*tp_as_mapping*/
-    0,                          /*tp_hash */
-    0,                          /*tp_call*/
-    0,                          /*tp_str*/
-    0,                          /*tp_getattro*/
-    0,                          /*tp_setattro*/
-    0,                          /*tp_as_buffer*/
-    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE, /*tp_flags*/
-    solver_create_docstring,    /* tp_doc */
-    0,                          /* tp_traverse */
-    0,                          /* tp_clear */
-    0,                          /* tp_richcompare */
-    0,                          /* tp_weaklistoffset */
-    0,                          /* tp_iter */
-    0,                          /* tp_iternext */
-    Solver_methods,             /* tp_methods */
-    0,                          /* tp_members */
-    0,                          /* tp_getset */
-    0,                          /* tp_base */
-    0,                          /* tp_dict */
-    0,                          /* tp_descr_get */
-    0,                          /* tp_descr_set */
-    0,                          /* tp_dictoffset */
-    (initproc)Solver_init,      /* tp_init */
+static PyMethodDef module_methods[] = {
+    {"cube_and_conquer", (PyCFunction) cube_and_conquer, METH_VARARGS | METH_KEYWORDS, cube_and_conquer_doc},
+    {"check_model", (PyCFunction) check_model, METH_VARARGS | METH_KEYWORDS, check_model_doc},
+    {NULL, NULL}  /* sentinel */
 };
 
 MODULE_INIT_FUNC(pycryptosat)
@@ -929,7 +6929,15 @@ MODULE_INIT_FUNC(pycryptosat)
     PyObject* m;
 
     pycryptosat_SolverType.tp_new = PyType_GenericNew;
-    if (PyType_Ready(&pycryptosat_SolverType) < 0) {
+    pycryptosat_PortfolioType.tp_new = PyType_GenericNew;
+    pycryptosat_SolverPoolType.tp_new = PyType_GenericNew;
+    if (PyType_Ready(&pycryptosat_SolverType) < 0
+        || PyType_Ready(&pycryptosat_PortfolioType) < 0
+        || PyType_Ready(&pycryptosat_SolverPoolType) < 0
+        || PyType_Ready(&pycryptosat_SolveAsyncType) < 0
+        || PyType_Ready(&pycryptosat_ModelIteratorType) < 0
+        || PyType_Ready(&pycryptosat_ModelType) < 0
+    ) {
         // Return NULL on Python3 and on Python2 with MODULE_INIT_FUNC macro
         // In pure Python2: return nothing.
         return NULL;
@@ -940,7 +6948,7 @@ MODULE_INIT_FUNC(pycryptosat)
         MODULE_NAME,            /* m_name */
         MODULE_DOC,             /* m_doc */
         -1,                     /* m_size */
-        NULL,                   /* m_methods */
+        module_methods,         /* m_methods */
         NULL,                   /* m_reload */
         NULL,                   /* m_traverse */
         NULL,                   /* m_clear */
@@ -955,6 +6963,11 @@ MODULE_INIT_FUNC(pycryptosat)
         return NULL;
     }
 
+    #ifdef Py_GIL_DISABLED
+    // objects serialize their own methods, see ObjectLock
+    PyUnstable_Module_SetGIL(m, Py_MOD_GIL_NOT_USED);
+    #endif
+
     // Add the version string so users know what version of CryptoMiniSat
     // they're using.
     if (PyModule_AddStringConstant(m, "__version__", CMS_FULL_VERSION) == -1) {
@@ -966,6 +6979,19 @@ MODULE_INIT_FUNC(pycryptosat)
         return NULL;
     }
 
+    // Interrupt and wait for solve_async() workers before the interpreter
+    // is torn down under them.
+    PyObject *atexit = PyImport_ImportModule("atexit");
+    PyObject *finish = PyCFunction_New(&finish_async_solves_def, NULL);
+    PyObject *registered = (atexit && finish) ? PyObject_CallMethod(atexit, "register", "(O)", finish) : NULL;
+    Py_XDECREF(registered);
+    Py_XDECREF(finish);
+    Py_XDECREF(atexit);
+    if (registered == NULL) {
+        Py_DECREF(m);
+        return NULL;
+    }
+
     // Add the Solver type.
     Py_INCREF(&pycryptosat_SolverType);
     if (PyModule_AddObject(m, "Solver", (PyObject *)&pycryptosat_SolverType)) {
@@ -973,5 +6999,33 @@ MODULE_INIT_FUNC(pycryptosat)
         return NULL;
     }
 
+    PyObject *presets = presets_dict();
+    if (presets == NULL || PyModule_AddObject(m, "presets", presets)) {
+        Py_XDECREF(presets);
+        Py_DECREF(m);
+        return NULL;
+    }
+
+    // Add the Portfolio type.
+    Py_INCREF(&pycryptosat_PortfolioType);
+    if (PyModule_AddObject(m, "Portfolio", (PyObject *)&pycryptosat_PortfolioType)) {
+        Py_DECREF(m);
+        return NULL;
+    }
+
+    // Add the SolverPool type.
+    Py_INCREF(&pycryptosat_SolverPoolType);
+    if (PyModule_AddObject(m, "SolverPool", (PyObject *)&pycryptosat_SolverPoolType)) {
+        Py_DECREF(m);
+        return NULL;
+    }
+
+    // Add the Model type.
+    Py_INCREF(&pycryptosat_ModelType);
+    if (PyModule_AddObject(m, "Model", (PyObject *)&pycryptosat_ModelType)) {
+        Py_DECREF(m);
+        return NULL;
+    }
+
     return m;
 }
@@ -27,6 +27,14 @@ import os
 import sys
 import unittest
 import time
+import asyncio
+import gzip
+import io
+import itertools
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 
 import pycryptosat
@@ -48,7 +56,7 @@ def check_clause(clause, solution):
 
         if solution[var] != inverted:
             return True
-
+    return False
 
 def check_solution(clauses, solution):
     for clause in clauses:
@@ -57,6 +65,35 @@ def check_solution(clauses, solution):
 
     return True
 
+def read_cnf(fname):
+    cls = []
+    with open(_MODULE_DIR+fname, "r") as f:
+        for line in f:
+            line = line.strip()
+            if len(line) == 0:
+                continue
+            if line[0] == "p":
+                continue
+            if line[0] == "c":
+                continue
+            line = line.split()
+            line = [int(l.strip()) for l in line]
+            assert line[-1] == 0
+            cls.append(line[:-1])
+
+    return cls
+
+def read_flat(flat):
+    cls = []
+    cl = []
+    for lit in flat:
+        if lit == 0:
+            cls.append(cl)
+            cl = []
+        else:
+            cl.append(lit)
+    return cls
+
 # -------------------------- test clauses --------------------------------
 
 # p cnf 5 3
@@ -137,6 +174,28 @@ class TestXor(unittest.TestCase):
             self.assertEqual(res, True)
             self.assertEqual(solution, tuple(solution_expected))
 
+    def test_bulk(self):
+        self.solver.add_xor_clauses(array('i', [1, 2, 2, 3, 4]),
+                                    array('q', [0, 2, 4, 5]),
+                                    memoryview(bytes([1, 0, 1])).cast('?'))
+        self.assertEqual(self.solver.nb_vars(), 4)
+        res, solution = self.solver.solve([1])
+        self.assertEqual(res, True)
+        self.assertEqual(solution, (None, True, False, False, True))
+
+        self.solver.add_xor_clauses(array('l', [1, 3]), array('i', [0, 2]), array('i', [0]))
+        self.assertEqual(self.solver.solve([1])[0], False)
+
+    def test_bulk_wrong_args(self):
+        vars, offsets, rhs = array('i', [1, 2]), array('i', [0, 2]), array('b', [1])
+        self.assertRaises(ValueError, self.solver.add_xor_clauses, array('i', [1, -2]), offsets, rhs)
+        self.assertRaises(ValueError, self.solver.add_xor_clauses, array('i', [1, 0]), offsets, rhs)
+        self.assertRaises(ValueError, self.solver.add_xor_clauses, vars, array('i', [0, 1]), rhs)
+        self.assertRaises(ValueError, self.solver.add_xor_clauses, vars, offsets, array('b', [1, 0]))
+        self.assertRaises(ValueError, self.solver.add_xor_clauses, vars, offsets, array('d', [1]))
+        self.assertRaises(TypeError, self.solver.add_xor_clauses, [1, 2], offsets, rhs)
+        self.assertEqual(self.solver.nb_vars(), 0)
+
 
 class InitTester(unittest.TestCase):
 
@@ -150,7 +209,38 @@ class InitTester(unittest.TestCase):
         self.assertRaises(TypeError, Solver, verbose="fail")
         self.assertRaises(TypeError, Solver, time_limit="fail")
         self.assertRaises(TypeError, Solver, confl_limit="fail")
-
+        self.assertRaises(ValueError, Solver, no_such_option=1)
+        self.assertRaises(ValueError, Solver, preset="no-such-preset")
+        self.assertRaises(ValueError, Solver, bva=-1)
+        self.assertRaises(TypeError, Solver, renumber="fail")
+
+    def test_config(self):
+        clauses = read_cnf("test.cnf")
+        for config in [{"no_bva": True, "find_xors": False, "seed": 3},
+                       {"preset": "low-latency-incremental", "renumber": True},
+                       {"polarity_mode": "neg", "no_simplify_at_startup": 1}]:
+            solver = Solver(verbose=0, **config)
+            solver.add_clauses(clauses)
+            sat, solution = solver.solve()
+            self.assertTrue(sat)
+            self.assertTrue(check_solution(clauses, solution))
+
+    def test_presets(self):
+        self.assertIn("low-latency-incremental", pycryptosat.presets)
+        self.assertEqual(pycryptosat.presets["one-shot-throughput"], {"single_run": 1})
+        for name, options in pycryptosat.presets.items():
+            Solver(preset=name)
+            Solver(**options)
+
+    def test_single_run(self):
+        solver = Solver(preset="one-shot-throughput")
+        solver.add_clauses(read_cnf("test.cnf"))
+        self.assertRaises(RuntimeError, solver.solve_batch, array('i', [1, 2]), array('q', [0, 1, 2]))
+        self.assertRaises(RuntimeError, solver.iter_models)
+        sat, _ = solver.solve()
+        self.assertTrue(sat)
+        self.assertRaises(RuntimeError, solver.solve)
+        self.assertRaises(RuntimeError, solver.is_satisfiable)
 
 class TestDump(unittest.TestCase):
 
@@ -179,6 +269,112 @@ class TestDump(unittest.TestCase):
         self.assertNotEquals(x, None)
         self.solver.end_getting_small_clauses()
 
+    def test_bulk_dump(self):
+        self.solver = Solver(confl_limit=2000)
+        self.solver.read_dimacs(_MODULE_DIR+"f400-r425-x000.cnf")
+        self.solver.solve()
+
+        expected = []
+        self.solver.start_getting_small_clauses(5, max_glue=6)
+        while True:
+            cl = self.solver.get_next_small_clause()
+            if cl is None:
+                break
+            expected.append(cl)
+        self.solver.end_getting_small_clauses()
+
+        flat = self.solver.get_small_clauses(5, 6)
+        self.assertEqual(flat.format, "i")
+        self.assertEqual(list(flat), [lit for cl in expected for lit in cl + [0]])
+
+        for red in (True, False):
+            flat = self.solver.get_small_clauses(5, 6, red=red)
+            lits, offsets = self.solver.get_small_clauses(5, 6, red=red, csr=True)
+            self.assertEqual(offsets.format, "q")
+            self.assertEqual(len(offsets), list(flat).count(0) + 1)
+            self.assertEqual(list(lits), [lit for lit in flat if lit != 0])
+
+        other = Solver()
+        other.add_clauses(self.solver.get_small_clauses(5, 6), trusted=True)
+        other.add_clauses(*self.solver.get_small_clauses(5, 6, red=False, csr=True), trusted=True)
+        self.assertEqual(other.nb_vars(), 400)
+
+    def test_bulk_dump_wrong_args(self):
+        self.assertRaises(ValueError, self.solver.get_small_clauses, 1, 10)
+        self.assertRaises(ValueError, self.solver.get_small_clauses, 4, 10, simplified=True)
+        self.assertEqual(len(self.solver.get_small_clauses(4, 10, red=False, simplified=True)), 0)
+
+    def test_bulk_dump_unsat(self):
+        self.solver.add_clauses(clauses2)
+        self.assertEqual(self.solver.solve()[0], False)
+        lits, offsets = self.solver.get_small_clauses(4, 10, csr=True)
+        self.assertEqual((list(lits), list(offsets)), ([], [0, 0]))
+
+    def test_export_irred_unsat(self):
+        self.solver.add_clauses(clauses2)
+        self.assertEqual(self.solver.solve()[0], False)
+        flat, nvars, var_map = self.solver.export_irred_clauses()
+        self.assertEqual((list(flat), nvars), ([1, 0, -1, 0], 1))
+        self.assertEqual(list(var_map), [0] * (self.solver.nb_vars() + 1))
+        worker = Solver()
+        worker.add_clauses(flat, trusted=True)
+        self.assertEqual(worker.solve()[0], False)
+
+    def test_simplify_export(self):
+        clauses = read_cnf("test.cnf")
+        solver = Solver(no_bva=True)
+        solver.add_clauses(clauses)
+        solver.add_clauses([[-5], [7, -8], [-7, 8]])
+        keep = list(range(1, 40))
+        self.assertEqual(solver.simplify(keep), None)
+        self.assertGreater(solver.stats()["simplify_seconds"], 0)
+
+        flat, nvars, var_map = solver.export_irred_clauses()
+        self.assertEqual(len(var_map), solver.nb_vars() + 1)
+        self.assertLess(nvars, solver.nb_vars())
+        self.assertEqual(var_map[7], var_map[8])
+        self.assertTrue(all(var_map[v] != 0 for v in keep))
+
+        worker = Solver()
+        worker.add_clauses(flat, trusted=True)
+        self.assertEqual(worker.nb_vars(), nvars)
+        sat, model = worker.solve()
+        self.assertTrue(sat)
+        cube = [v if model[abs(var_map[v])] == (var_map[v] > 0) else -v for v in keep]
+        self.assertIn(-5, cube)
+        self.assertTrue(solver.solve(cube)[0])
+
+    def test_simplify_wrong_args(self):
+        self.solver.add_clauses(clauses1)
+        self.assertRaises(ValueError, self.solver.simplify, strategy="occ-bve,no-such-step")
+        self.assertEqual(self.solver.simplify(strategy=" occ-bve , scc-vrepl,"), None)
+        single = Solver(single_run=True)
+        single.simplify()
+        self.assertRaises(RuntimeError, single.solve)
+        self.solver.add_clauses(clauses2)
+        self.assertEqual(self.solver.simplify(), False)
+
+    def test_views(self):
+        solver = Solver(no_bva=True)
+        solver.add_clauses([[1, 2], [-1, -2], [1, -2, 3], [4], [2, 3, 5]])
+        self.assertEqual(list(solver.get_var_incidence()), [0, 3, 4, 2, 0, 1])
+        inc = solver.get_lit_incidence()
+        self.assertEqual(inc.format, "I")
+        self.assertEqual(list(inc[2:6]), [2, 1, 2, 2])
+        self.assertEqual(list(solver.get_zero_assigned_lits()), [4])
+
+        self.assertEqual(solver.simplify(), None)
+        self.assertEqual(list(solver.get_all_binary_xors()), [1, -2])
+        solver.add_clause([6, -1])
+        scores = solver.get_vsids_scores()
+        self.assertEqual((scores.format, len(scores)), ("d", 7))
+        self.assertEqual(len(solver.get_var_incidence(red=True)), 7)
+        self.assertEqual(len(solver.get_lit_incidence()), 14)
+        self.assertEqual(len(self.solver.get_vsids_scores()), 1)
+
+        solver.add_clause([-4])
+        self.assertEqual(list(solver.get_var_incidence()), [0] * 7)
+
 
 class TestSolve(unittest.TestCase):
 
@@ -230,6 +426,238 @@ class TestSolve(unittest.TestCase):
         cls = array('i', [1, 2, 0, 1, 2])
         self.assertRaises(ValueError, self.solver.add_clause, cls)
 
+    def test_add_clauses_array_int64(self):
+        cls = array('q', [-1, 0, 1, 2, 0, -2, 3, 0])
+        self.solver.add_clauses(cls)
+        res, solution = self.solver.solve()
+        self.assertEqual(res, True)
+        self.assertEqual(solution, (None, False, True, True))
+
+    def test_add_clauses_memoryview(self):
+        raw = array('i', [1, 0, -1, 2, 0]).tobytes()
+        self.solver.add_clauses(memoryview(raw).cast('i'))
+        res, solution = self.solver.solve()
+        self.assertEqual(res, True)
+        self.assertEqual(solution, (None, True, True))
+
+    def test_add_clauses_buffer_wrong_format(self):
+        self.assertRaises(ValueError, self.solver.add_clauses, array('d', [1, 0]))
+        self.assertRaises(ValueError, self.solver.add_clauses, array('h', [1, 0]))
+        self.assertRaises(ValueError, self.solver.add_clauses, bytes(8))
+        strided = memoryview(array('i', [1, 0, 2, 0]))[::2]
+        self.assertRaises(BufferError, self.solver.add_clauses, strided)
+
+    def test_add_clauses_array_nothing_added_on_error(self):
+        cls = array('i', [1, 0, 2, 1 << 30, 0])
+        self.assertRaises(ValueError, self.solver.add_clauses, cls)
+        self.assertEqual(self.solver.nb_vars(), 0)
+
+    def test_add_clauses_csr(self):
+        lits = array('i', [1, -5, 4, -1, 5, 3, 4, -3, -4])
+        offsets = array('q', [0, 3, 7, 9])
+        self.solver.add_clauses(lits, offsets)
+        res, solution = self.solver.solve()
+        self.assertEqual(res, True)
+        self.assertTrue(check_solution(clauses1, solution))
+
+    def test_add_clauses_csr_UNSAT(self):
+        self.solver.add_clauses(array('i', [-1, 1]), offsets=array('i', [0, 1, 2]))
+        res, solution = self.solver.solve()
+        self.assertEqual(res, False)
+
+    def test_add_clauses_csr_wrong_offsets(self):
+        lits = array('i', [1, 2, 3])
+        self.assertRaises(ValueError, self.solver.add_clauses, lits, array('i', [1, 3]))
+        self.assertRaises(ValueError, self.solver.add_clauses, lits, array('i', [0, 2]))
+        self.assertRaises(ValueError, self.solver.add_clauses, lits, array('i', [0, 2, 1, 3]))
+        self.assertRaises(ValueError, self.solver.add_clauses,
+                          array('i', [1, 0, 3]), array('i', [0, 3]))
+
+    def test_model_array(self):
+        self.solver.add_clauses([[1], [-2], [3, 4], [-3]])
+        res, solution = self.solver.solve(model="array")
+        self.assertEqual(res, True)
+        self.assertEqual(solution.format, 'b')
+        self.assertEqual(list(solution), [0, 1, -1, -1, 1])
+        self.assertEqual(self.solver.get_model_buffer(), solution)
+
+    def test_model_bits(self):
+        self.solver.add_clauses([[v if v % 3 else -v] for v in range(1, 20)])
+        res, solution = self.solver.solve(model="bits")
+        self.assertEqual(res, True)
+        self.assertEqual(len(solution), 3)
+        for v in range(1, 20):
+            self.assertEqual(bool(solution[v // 8] >> (v % 8) & 1), v % 3 != 0)
+        self.assertEqual(self.solver.get_model_buffer(packed=True), solution)
+
+    def test_model_lazy(self):
+        self.solver.add_clauses([[1], [-2], [3, 4], [-3]])
+        self.solver.add_clause([6])
+        res, solution = self.solver.solve(model="lazy")
+        self.assertEqual(res, True)
+        self.assertIsInstance(solution, pycryptosat.Model)
+        self.assertEqual(len(solution), 7)
+        self.assertEqual((solution[0], solution[1], solution[2], solution[-1]), (None, True, False, True))
+        self.assertEqual(solution[1:5], (True, False, False, True))
+        self.assertEqual(tuple(solution), self.solver.solve()[1])
+        self.assertEqual(memoryview(solution).format, 'b')
+        self.assertEqual(memoryview(solution), self.solver.get_model_buffer())
+        self.assertEqual(list(solution.lits([4, 1, 2])), [4, 1, -2])
+        self.assertEqual(list(solution.lits(array('q', [3]))), [-3])
+
+        # a model stays valid across later solves
+        self.solver.add_clause([-6])
+        self.assertEqual(self.solver.solve()[0], False)
+        self.assertEqual(solution[6], True)
+
+    def test_model_lazy_errors(self):
+        self.solver.add_clause([1])
+        res, solution = self.solver.solve(model="lazy")
+        self.assertRaises(IndexError, solution.__getitem__, 2)
+        self.assertRaises(TypeError, solution.__getitem__, "1")
+        self.assertRaises(ValueError, solution.lits, [0])
+        self.assertRaises(ValueError, solution.lits, [2])
+        self.assertRaises(TypeError, solution.lits, [1.0])
+        self.assertRaises(TypeError, pycryptosat.Model)
+
+    def test_warm_start(self):
+        clauses = read_cnf("test.cnf")
+        self.solver.add_clauses(clauses)
+        sat, solution = self.solver.solve()
+        self.assertTrue(sat)
+
+        phases = [solution, self.solver.get_model_buffer(),
+                  memoryview(bytes(solution[1:10])).cast("?"), array('q', [0, -1, 1, 0])]
+        for warm_start in phases:
+            solver = Solver()
+            solver.add_clauses(clauses)
+            solver.set_phases(warm_start)
+            sat, _ = solver.solve(warm_start=solution)
+            self.assertTrue(sat)
+        self.assertEqual(solver.stats()["conflicts"], 0)
+
+        self.assertRaises(ValueError, Solver().set_phases, solution)
+        self.assertRaises(TypeError, self.solver.set_phases, [None, "yes"])
+        self.assertRaises(ValueError, self.solver.set_phases, array('d', [0.0, 1.0]))
+
+    def test_memory_usage(self):
+        self.solver.add_clauses(read_cnf("f400-r425-x000.cnf"))
+        mem = self.solver.memory_usage()
+        self.assertEqual(mem["total"], sum(v for k, v in mem.items() if k != "total"))
+        self.assertGreater(mem["pending"] + mem["clauses"], 0)
+
+        capped = Solver(max_mem=1, threads=2)
+        capped.add_clauses(read_cnf("f400-r425-x000.cnf"))
+        self.assertEqual(capped.solve(), (None, None))
+        self.assertEqual(capped.solve(), (None, None))
+
+        # a cap above 2 GiB is not limited to the int range of other options
+        roomy = Solver(max_mem=3 << 30)
+        roomy.add_clauses(read_cnf("test.cnf"))
+        self.assertEqual(roomy.solve()[0], True)
+        self.assertRaises(ValueError, Solver, max_mem=-1)
+        self.assertRaises(TypeError, Solver, max_mem=1.5)
+
+    def test_terminate(self):
+        self.solver.add_clauses(read_cnf("f400-r425-x000.cnf"))
+        calls = []
+        self.solver.set_terminate(lambda: calls.append(1) or len(calls) >= 5, every_n_conflicts=50)
+        self.assertEqual(self.solver.solve(), (None, None))
+        self.assertGreaterEqual(len(calls), 5)
+        self.assertLess(self.solver.stats()["conflicts"], 1000)
+
+        # calling back into the solver raises, which stops the solve
+        reported = []
+        hook, sys.unraisablehook = sys.unraisablehook, reported.append
+        try:
+            self.solver.set_terminate(self.solver.nb_vars, every_n_conflicts=1)
+            self.assertEqual(self.solver.solve(), (None, None))
+        finally:
+            sys.unraisablehook = hook
+        self.assertIsInstance(reported[0].exc_value, RuntimeError)
+        self.solver.set_terminate(None)
+        self.assertEqual(self.solver.solve(confl_limit=10), (None, None))
+        self.assertGreaterEqual(self.solver.stats()["conflicts"], 10)
+        self.assertRaises(TypeError, self.solver.set_terminate, 1)
+        self.assertRaises(ValueError, self.solver.set_terminate, bool, every_n_conflicts=0)
+
+    def test_learn(self):
+        clauses = read_cnf("f400-r425-x000.cnf")
+        self.solver.add_clauses(clauses)
+        batches = []
+        self.solver.set_learn(lambda batch: batches.append(list(batch)), max_len=3, batch_size=10)
+        self.solver.solve(confl_limit=2000)
+        learnt = [cl for batch in batches for cl in read_flat(batch)]
+        self.assertTrue(all(batch.count(0) <= 10 for batch in batches))
+        self.assertTrue(all(1 <= len(cl) <= 3 for cl in learnt))
+        self.assertGreater(len(learnt), 0)
+        for cl in learnt[:10]:
+            check = Solver()
+            check.add_clauses(clauses)
+            self.assertEqual(check.solve([-lit for lit in cl])[0], False)
+
+        self.solver.set_learn(None)
+        del batches[:]
+        self.solver.solve(confl_limit=100)
+        self.assertEqual(batches, [])
+
+    def test_var_weights(self):
+        self.solver.add_clauses(clauses1)
+        self.solver.set_var_weights([1, -1, 2], array('d', [0.9, 0.1, 0.5]))
+        self.assertRaises(ValueError, self.solver.set_var_weights, [1], [0.5])
+        self.assertRaises(ValueError, self.solver.set_var_weights, [3], [-1.0])
+        self.solver.solve()
+        self.assertRaises(RuntimeError, self.solver.set_var_weights, [3], [0.5])
+
+        # a zero weight on the negative literals makes every decision positive
+        solver = Solver(polarity_mode="weighted")
+        solver.add_clause(list(range(1, 21)))
+        solver.set_var_weights(list(range(1, 21)) + list(range(-1, -21, -1)), [1.0] * 20 + [0.0] * 20)
+        sat, solution = solver.solve()
+        self.assertEqual(solution, (None,) + (True,) * 20)
+
+    def test_stats(self):
+        empty = self.solver.stats()
+        self.assertEqual(empty["conflicts"], 0)
+        self.assertEqual(empty["solve_seconds"], 0)
+
+        self.solver.add_clauses(read_cnf("f400-r425-x000.cnf"))
+        self.solver.solve(confl_limit=300)
+        first = self.solver.stats()
+        self.assertGreater(first["conflicts"], 0)
+        self.assertGreater(first["propagations"], first["decisions"])
+        self.assertGreater(first["solve_seconds"], 0)
+        self.assertEqual(first["simplify_seconds"], 0)
+        self.assertEqual(first["model_seconds"], 0)
+        if first["peak_memory"] is not None:
+            self.assertGreater(first["peak_memory"], 0)
+
+        self.solver.solve(confl_limit=300)
+        second = self.solver.stats()
+        total = self.solver.stats(last=False)
+        for key in ("conflicts", "propagations", "decisions", "restarts"):
+            self.assertEqual(total[key], first[key] + second[key])
+        self.assertAlmostEqual(total["solve_seconds"],
+                               first["solve_seconds"] + second["solve_seconds"])
+
+        solver = Solver()
+        solver.add_clauses(clauses1)
+        solver.solve()
+        self.assertGreater(solver.stats()["model_seconds"], 0)
+
+    def test_model_buffer_no_model(self):
+        self.assertEqual(self.solver.get_model_buffer(), None)
+        self.solver.add_clause([1, 2])
+        self.assertEqual(self.solver.solve(model="array")[0], True)
+        self.assertNotEqual(self.solver.get_model_buffer(), None)
+        self.solver.add_clause([-1])
+        self.assertEqual(self.solver.get_model_buffer(), None)
+        self.solver.solve(assumptions=[-2])
+        self.assertEqual(self.solver.get_model_buffer(packed=True), None)
+
+    def test_model_wrong_format(self):
+        self.assertRaises(ValueError, self.solver.solve, model="list")
+
     def test_bad_iter(self):
         class Liar:
 
@@ -264,6 +692,42 @@ class TestSolve(unittest.TestCase):
         self.assertNotIn(2, confl)
         self.assertIn(-4, confl)
 
+    def test_solve_batch(self):
+        self.solver.add_clauses([[-1], [2], [3], [-4]])
+        cubes = array('i', [2, 3, -2, 4, 1])
+        offsets = array('i', [0, 2, 3, 5, 5])
+        status, models, confl = self.solver.solve_batch(
+            cubes, offsets, project=array('i', [2, 4]), conflicts=True)
+        self.assertEqual(list(status), [1, -1, -1, 1])
+        self.assertEqual(list(models), [1, -1, 0, 0, 0, 0, 1, -1])
+        lits, offs = confl
+        self.assertEqual(len(offs), 5)
+        self.assertEqual(list(lits[offs[1]:offs[2]]), [2])
+        self.assertIn(list(lits[offs[2]:offs[3]]), [[-4], [1], [-4, 1], [1, -4]])
+        self.assertEqual(offs[0], offs[1])
+        self.assertEqual(offs[3], offs[4])
+
+    def test_solve_batch_plain(self):
+        self.solver.add_clauses([[1, 2]])
+        status, models, confl = self.solver.solve_batch(
+            array('i', [-1, -2]), array('i', [0, 1, 2]))
+        self.assertEqual(list(status), [1, 1])
+        self.assertEqual(models, None)
+        self.assertEqual(confl, None)
+
+    def test_solve_batch_wrong_args(self):
+        self.solver.add_clauses([[1, 2]])
+        self.assertRaises(ValueError, self.solver.solve_batch,
+                          array('i', [3]), array('i', [0, 1]))
+        self.assertRaises(ValueError, self.solver.solve_batch,
+                          array('i', [1]), array('i', [0, 2]))
+        self.assertRaises(ValueError, self.solver.solve_batch,
+                          array('i', [1]), array('i', [0, 1]), project=array('i', [0]))
+        for bad in [0, -(1 << 63), 1 << 40]:
+            with self.assertRaises(ValueError) as cm:
+                self.solver.solve_batch(array('q', [bad]), array('i', [0, 1]))
+            self.assertNotIn("Variable", str(cm.exception))
+
     def test_cnf2(self):
         for cl in clauses2:
             self.solver.add_clause(cl)
@@ -297,6 +761,558 @@ class TestSolve(unittest.TestCase):
         self.assertEqual(res, True)
 
 
+class TestIterModels(unittest.TestCase):
+
+    def setUp(self):
+        self.solver = Solver()
+
+    def test_all_models(self):
+        self.solver.add_clauses([[1, 2], [-1, -2, 3]])
+        models = []
+        for batch in self.solver.iter_models(batch=2):
+            self.assertLessEqual(len(batch), 2)
+            models.extend(tuple(row) for row in batch.tolist())
+        self.assertEqual(len(models), 5)
+        self.assertEqual(len(set(models)), 5)
+        for m in models:
+            sol = (None,) + tuple(v == 1 for v in m)
+            self.assertTrue(check_solution([[1, 2], [-1, -2, 3]], sol))
+
+    def test_projection_and_limit(self):
+        self.solver.add_clauses([[1, 2], [-1, -2, 3]])
+        it = self.solver.iter_models(projection=[1, 2], batch=10)
+        models = sorted(tuple(r) for b in it for r in b.tolist())
+        self.assertEqual(models, [(-1, 1), (1, -1), (1, 1)])
+        self.assertTrue(it.complete)
+        self.assertEqual(it.count, 3)
+
+        solver = Solver()
+        solver.add_clauses([[1, 2, 3]])
+        it = solver.iter_models(limit=4, batch=3)
+        self.assertEqual([len(b) for b in it], [3, 1])
+        self.assertFalse(it.complete)
+
+    def test_unsat(self):
+        self.solver.add_clauses(clauses2)
+        it = self.solver.iter_models()
+        self.assertEqual(list(it), [])
+        self.assertTrue(it.complete)
+
+    def test_wrong_args(self):
+        self.solver.add_clause([1, 2])
+        self.assertRaises(ValueError, self.solver.iter_models, projection=[-1])
+        self.assertRaises(ValueError, self.solver.iter_models, projection=[5])
+        self.assertRaises(ValueError, self.solver.iter_models, batch=0)
+
+
+class TestSolveAsync(unittest.TestCase):
+
+    def test_solve_async(self):
+        solver = Solver()
+        solver.add_clauses(clauses1)
+
+        async def run():
+            return await solver.solve_async([1, -5])
+
+        res, solution = asyncio.run(run())
+        self.assertEqual(res, True)
+        self.assertTrue(check_solution(clauses1, solution))
+        self.assertEqual(solution[1], True)
+
+    def test_unsat(self):
+        solver = Solver()
+        solver.add_clauses(clauses2)
+
+        self.assertEqual(asyncio.run(solver.solve_async()), (False, None))
+        self.assertEqual(solver.solve(), (False, None))
+
+    async def wait_until_free(self, solver):
+        # done callbacks, like the one interrupting the solver on
+        # cancellation, only run while the event loop is not blocked
+        while True:
+            try:
+                solver.nb_vars()
+                return
+            except RuntimeError:
+                await asyncio.sleep(0.005)
+
+    def test_cancel_interrupts(self):
+        # the hard instance runs into the time limit unless interrupted
+        SAT_TIME_LIMIT = 1
+        clauses = read_cnf("f400-r425-x000.cnf")
+
+        async def run(cancel_after):
+            solver = Solver()
+            solver.add_clauses(clauses)
+            t0 = time.time()
+            task = asyncio.ensure_future(solver.solve_async(time_limit=SAT_TIME_LIMIT))
+            if cancel_after is None:
+                self.assertEqual(await task, (None, None))
+            else:
+                await asyncio.sleep(cancel_after)
+                self.assertRaises(RuntimeError, solver.solve)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+            await self.wait_until_free(solver)
+            return time.time() - t0
+
+        uncancelled = asyncio.run(run(None))
+        cancelled = asyncio.run(run(0.1))
+        self.assertLess(cancelled, uncancelled / 2)
+
+    def test_cancel_before_start(self):
+        solver = Solver()
+        solver.add_clauses(read_cnf("f400-r425-x000.cnf"))
+
+        async def run():
+            task = asyncio.ensure_future(solver.solve_async(time_limit=10))
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            await self.wait_until_free(solver)
+
+        t0 = time.time()
+        asyncio.run(run())
+        self.assertLess(time.time() - t0, 5)
+
+    def test_busy_guards(self):
+        solver = Solver()
+        solver.add_clauses(read_cnf("f400-r425-x000.cnf"))
+
+        async def run():
+            task = asyncio.ensure_future(solver.solve_async(time_limit=10))
+            await asyncio.sleep(0.05)
+            for call in [solver.nb_vars, solver.get_conflict, solver.get_model_buffer,
+                         solver.__init__, lambda: solver.add_clause([1])]:
+                self.assertRaises(RuntimeError, call)
+            solver.interrupt()
+            self.assertEqual(await task, (None, None))
+            await self.wait_until_free(solver)
+
+        asyncio.run(run())
+
+
+class TestReadDimacs(unittest.TestCase):
+
+    def test_path(self):
+        solver = Solver()
+        stats = solver.read_dimacs(_MODULE_DIR+"test.cnf")
+        self.assertEqual(stats["vars"], 281)
+        self.assertEqual(stats["clauses"], 926)
+        self.assertEqual(stats["xors"], 0)
+        self.assertGreaterEqual(stats["seconds"], 0)
+        sat, solution = solver.solve()
+        self.assertTrue(sat)
+        self.assertTrue(check_solution(read_cnf("test.cnf"), solution))
+
+    def test_gzip(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            fname = os.path.join(tmpdir, "test.cnf.gz")
+            with open(_MODULE_DIR+"test.cnf", "rb") as src:
+                with gzip.open(fname, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+            stats = Solver().read_dimacs(fname)
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertEqual(stats["vars"], 281)
+        self.assertEqual(stats["clauses"], 926)
+
+    def test_fileobj_xor(self):
+        solver = Solver()
+        stats = solver.read_dimacs(io.BytesIO(b"p cnf 3 2\nx1 2 0\n-1 0\nx-2 3 0\n"))
+        self.assertEqual(stats["clauses"], 1)
+        self.assertEqual(stats["xors"], 2)
+        sat, solution = solver.solve()
+        self.assertTrue(sat)
+        self.assertEqual(solution, (None, False, True, True))
+
+    def test_errors(self):
+        solver = Solver()
+        with self.assertRaises(ValueError):
+            solver.read_dimacs(io.BytesIO(b"p cnf 2 1\n1 3 0\n"), strict=True)
+        with self.assertRaises(ValueError):
+            solver.read_dimacs(io.BytesIO(b"1 2 x 0\n"))
+        with self.assertRaises(TypeError):
+            solver.read_dimacs(io.StringIO("1 2 0\n"))
+        with self.assertRaises(OSError):
+            solver.read_dimacs(_MODULE_DIR+"does-not-exist.cnf")
+
+
+class TestPortfolio(unittest.TestCase):
+
+    configs = [{"seed": 1}, {"seed": 2, "polarity_mode": "rnd"},
+               {"no_simplify": True}, {"sls": 0, "verbose": 0}]
+
+    def test_solve(self):
+        portfolio = pycryptosat.Portfolio(self.configs, threads=2)
+        self.assertEqual(portfolio.threads, 2)
+        self.assertEqual(portfolio.configs, tuple(self.configs))
+        self.assertEqual(portfolio.winner, None)
+
+        clauses = read_cnf("test.cnf")
+        portfolio.add_clauses(clauses[:100])
+        portfolio.add_clauses(array('i', [lit for cl in clauses[100:] for lit in cl + [0]]))
+        self.assertEqual(portfolio.nb_vars(), 281)
+        sat, solution = portfolio.solve()
+        self.assertTrue(sat)
+        self.assertTrue(check_solution(clauses, solution))
+        self.assertIn(portfolio.winner, range(len(self.configs)))
+
+        sat, _ = portfolio.solve([1 if solution[1] else -1])
+        self.assertTrue(sat)
+
+        portfolio.add_clauses([[1], [-1]])
+        self.assertEqual(portfolio.solve(), (False, None))
+
+    def test_limits(self):
+        portfolio = pycryptosat.Portfolio([{"seed": i} for i in range(3)])
+        portfolio.add_clauses(read_cnf("f400-r425-x000.cnf"))
+        self.assertEqual(portfolio.solve(confl_limit=100), (None, None))
+        self.assertEqual(portfolio.winner, None)
+
+    def test_wrong_args(self):
+        Portfolio = pycryptosat.Portfolio
+        self.assertRaises(ValueError, Portfolio, [])
+        self.assertRaises(TypeError, Portfolio, [1])
+        self.assertRaises(ValueError, Portfolio, [{"no_such_option": 1}])
+        self.assertRaises(ValueError, Portfolio, [{"seed": -1}])
+        self.assertRaises(TypeError, Portfolio, [{"seed": "1"}])
+        self.assertRaises(ValueError, Portfolio, [{"polarity_mode": "up"}])
+        self.assertRaises(ValueError, Portfolio, [{}], threads=-1)
+        portfolio = Portfolio([{}])
+        self.assertRaises(ValueError, portfolio.solve, [1])
+        self.assertRaises(ValueError, portfolio.add_clauses, [[1, 0]])
+
+
+class TestThreads(unittest.TestCase):
+
+    def test_pool(self):
+        clauses = read_cnf("test.cnf")
+        flat = array('i', [lit for cl in clauses for lit in cl + [0]])
+
+        def work(i):
+            solver = Solver(seed=i)
+            if i % 2:
+                solver.add_clauses(clauses)
+            else:
+                solver.add_clauses(flat)
+            sat, solution = solver.solve(model="array")
+            return sat and check_solution(clauses, solution)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            self.assertEqual(list(pool.map(work, range(16))), [True] * 16)
+
+    def test_shared_solver(self):
+        solver = Solver()
+        barrier = threading.Barrier(4)
+
+        def work(i):
+            barrier.wait()
+            for k in range(200):
+                var = 1 + i * 200 + k
+                solver.add_clauses([[var, var + 1000], [-var]])
+            return solver.solve()[0]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            self.assertEqual(list(pool.map(work, range(4))), [True] * 4)
+        self.assertEqual(solver.nb_vars(), 1800)
+        sat, solution = solver.solve()
+        self.assertTrue(sat)
+        for var in range(1, 801):
+            self.assertEqual((solution[var], solution[var + 1000]), (False, True))
+
+    def test_reentrant_call(self):
+        solver = Solver()
+
+        class Reader(io.BytesIO):
+            def read(self, n=-1):
+                solver.nb_vars()
+                return super().read(n)
+
+        with self.assertRaises(RuntimeError):
+            solver.read_dimacs(Reader(b"1 2 0\n"))
+        solver.add_clause([1])
+        self.assertEqual(solver.solve(), (True, (None, True)))
+
+    def test_bad_clause_in_chunk(self):
+        solver = Solver()
+        with self.assertRaises(TypeError):
+            solver.add_clauses([[1, 2], [-1], [-2, "3"], [3]])
+        self.assertEqual(solver.solve(), (True, (None, False, True)))
+
+
+class TestCubeAndConquer(unittest.TestCase):
+
+    def test_sat(self):
+        clauses = read_cnf("test.cnf")
+        solver = Solver()
+        solver.add_clauses(clauses)
+        cubes = [[a, b, c] for a in (1, -1) for b in (2, -2) for c in (3, -3)]
+        status, winner, model, conflicts = pycryptosat.cube_and_conquer(solver, cubes, processes=3)
+        self.assertEqual(status[winner], 1)
+        self.assertEqual(len(model), solver.nb_vars() + 1)
+        solution = [None] + [value == 1 for value in model[1:]]
+        self.assertTrue(check_solution(clauses, solution))
+        for lit in cubes[winner]:
+            self.assertEqual(solution[abs(lit)], lit > 0)
+        # the parent solver is still usable
+        self.assertTrue(solver.solve()[0])
+
+    def test_keeps_cube_vars(self):
+        solver = Solver(no_bva=True)
+        solver.add_clauses(read_cnf("test.cnf"))
+        cubes = [[v] for v in range(1, 60)]
+        pycryptosat.cube_and_conquer(solver, cubes, processes=1)
+        var_map = solver.export_irred_clauses()[2]
+        self.assertEqual([v for v in range(1, 60) if var_map[v] == 0], [])
+
+    def test_unsat_cores(self):
+        solver = Solver()
+        solver.add_clauses([[1, 2], [-1, 2], [3, 4]])
+        flat = array('i', [-2, 3, -2, -3, 4, 1, -3, -4])
+        offsets = array('q', [0, 2, 5, 8])
+        status, winner, model, (lits, offs) = pycryptosat.cube_and_conquer(
+            solver, flat, offsets=offsets, processes=2, simplify=False)
+        self.assertEqual(list(status), [-1, -1, -1])
+        self.assertEqual((winner, model), (None, None))
+        cores = [list(lits[offs[i]:offs[i+1]]) for i in range(3)]
+        self.assertEqual(cores[0], [2])
+        self.assertEqual(cores[1], [2])
+        self.assertEqual(sorted(cores[2]), [3, 4])
+
+        status, winner, model, _ = pycryptosat.cube_and_conquer(solver, [])
+        self.assertEqual((len(status), winner, model), (0, None, None))
+
+    def test_wrong_args(self):
+        cube_and_conquer = pycryptosat.cube_and_conquer
+        solver = Solver()
+        solver.add_clause([1, 2])
+        self.assertRaises(TypeError, cube_and_conquer, None, [[1]])
+        self.assertRaises(ValueError, cube_and_conquer, solver, [[3]])
+        self.assertRaises(ValueError, cube_and_conquer, solver, [[1]], processes=-1)
+        self.assertRaises(ValueError, cube_and_conquer, Solver(threads=2), [])
+        self.assertRaises(ValueError, cube_and_conquer, solver, array('i', [1]), offsets=array('q', [0, 2]))
+
+
+class TestProof(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.tmpdir, "proof.frat")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def pigeonhole(self, holes):
+        var = lambda p, h: p*holes + h + 1
+        clauses = [[var(p, h) for h in range(holes)] for p in range(holes+1)]
+        for h in range(holes):
+            for p in range(holes+1):
+                for q in range(p+1, holes+1):
+                    clauses.append([-var(p, h), -var(q, h)])
+        return clauses
+
+    def test_unsat(self):
+        # a tiny ring buffer makes the solver wait for the writer thread
+        for buffer in (64, 1 << 20):
+            solver = Solver(proof=self.fname, proof_buffer=buffer)
+            solver.add_clauses(self.pigeonhole(5))
+            self.assertEqual(solver.solve(), (False, None))
+            stats = solver.stats()
+            self.assertGreaterEqual(stats["proof_stall_seconds"], 0)
+            self.assertEqual(stats["proof_bytes"], os.path.getsize(self.fname))
+            with open(self.fname) as f:
+                lines = [line.split() for line in f]
+            kinds = set(line[0] for line in lines)
+            self.assertTrue({"o", "a", "f"} <= kinds)
+            # the empty clause is derived
+            self.assertIn(["a", "0"], [line[:1] + line[2:3] for line in lines])
+            self.assertRaises(RuntimeError, solver.solve)
+            del solver
+
+    def test_gzip(self):
+        fname = self.fname + ".gz"
+        solver = Solver(proof=fname)
+        solver.add_clauses(self.pigeonhole(4))
+        self.assertEqual(solver.solve(), (False, None))
+        # the gzip stream is complete once the solver is deleted
+        del solver
+        with gzip.open(fname, "rt") as f:
+            lines = [line.split() for line in f]
+        self.assertIn(["a", "0"], [line[:1] + line[2:3] for line in lines])
+
+    def test_errors(self):
+        self.assertRaises(ValueError, Solver, proof=self.fname, threads=2)
+        self.assertRaises(ValueError, Solver, proof=self.fname, proof_format="drat")
+        self.assertRaises(ValueError, Solver, proof=self.fname, proof_buffer=0)
+        self.assertRaises(OSError, Solver, proof=os.path.join(self.tmpdir, "no", "proof"))
+
+
+class TestReset(unittest.TestCase):
+
+    def test_reset(self):
+        solver = Solver(confl_limit=1000, seed=3)
+        solver.add_clauses([[1, 2], [-1]])
+        self.assertEqual(solver.solve(), (True, (None, False, True)))
+        models = solver.iter_models()
+        solver.reset()
+        self.assertEqual(solver.nb_vars(), 0)
+        self.assertEqual(solver.stats()["conflicts"], 0)
+        self.assertRaises(RuntimeError, next, models)
+        solver.add_clauses([[1], [-2]])
+        self.assertEqual(solver.solve(), (True, (None, True, False)))
+        solver.reset(keep_config=False)
+        self.assertEqual(solver.solve(), (True, (None,)))
+
+    def test_pool(self):
+        pool = pycryptosat.SolverPool(2, {"time_limit": 10})
+        self.assertEqual((pool.size, pool.available), (2, 2))
+        solvers = [pool.acquire() for _ in range(3)]
+        self.assertEqual(pool.available, 0)
+        solvers[0].add_clauses([[1], [-1]])
+        self.assertEqual(solvers[0].solve(), (False, None))
+        for solver in solvers:
+            pool.release(solver)
+        self.assertEqual(pool.available, 2)
+        solver = pool.acquire()
+        self.assertEqual(solver.nb_vars(), 0)
+        self.assertRaises(ValueError, pool.release, Solver())
+        pool.release(solver)
+        self.assertRaises(ValueError, pool.release, solver)
+        self.assertRaises(ValueError, pycryptosat.SolverPool, 1, {"proof": "proof.frat"})
+
+
+class TestCheckModel(unittest.TestCase):
+
+    def test_clauses(self):
+        clauses = read_cnf("test.cnf")
+        flat = array('i', [lit for clause in clauses for lit in clause + [0]])
+        solver = Solver()
+        solver.add_clauses(flat)
+        sat, solution = solver.solve()
+        self.assertTrue(sat)
+        self.assertEqual(pycryptosat.check_model(flat, solution), (None, 0))
+        self.assertEqual(pycryptosat.check_model(flat, solver.get_model_buffer()), (None, 0))
+
+        # empty clauses are not counted, unknown variables satisfy nothing
+        check_model = pycryptosat.check_model
+        self.assertEqual(check_model(array('i', [1, 2, 0, 0, -1, 0]), [None, True, False]), (1, 1))
+        self.assertEqual(check_model(array('q', [-3, 0, 1, 2, 0]), array('b', [0, -1, 0])), (0, 2))
+        self.assertEqual(check_model(array('i', [2, 0]), array('i', [0, -5, 7])), (None, 0))
+        self.assertEqual(check_model(array('i', []), []), (None, 0))
+
+    def test_xors(self):
+        xors = (array('i', [1, 2, 2, 3]), array('q', [0, 2, 4]), array('b', [1, 0]))
+        check_model = pycryptosat.check_model
+        self.assertEqual(check_model(array('i', [3, 0]), [None, True, False, False], xors), (0, 1))
+        self.assertEqual(check_model(array('i', [1, 0]), [None, True, False, False], xors), (None, 0))
+        self.assertEqual(check_model(array('i', [1, 0]), [None, True, True, True], xors), (1, 1))
+        self.assertEqual(check_model(array('i', []), [None, True], xors), (0, 2))
+
+    def test_errors(self):
+        check_model = pycryptosat.check_model
+        self.assertRaises(ValueError, check_model, array('i', [1, 2]), [None, True])
+        self.assertRaises(ValueError, check_model, array('d', [1, 0]), [None, True])
+        self.assertRaises(ValueError, check_model, array('i', [1, 0]), bytes([2]))
+        self.assertRaises(TypeError, check_model, array('i', [1, 0]), [None, 1])
+        self.assertRaises(TypeError, check_model, array('i', [1, 0]), [None, True], xors=[])
+        xors = (array('i', [-1]), array('q', [0, 1]), array('b', [1]))
+        self.assertRaises(ValueError, check_model, array('i', [1, 0]), [None, True], xors)
+
+
+class TestConstraints(unittest.TestCase):
+
+    def check(self, solver, nvars, expected):
+        """Compare the solver with expected() on every assignment of 1..nvars"""
+        for bits in itertools.product([False, True], repeat=nvars):
+            cube = [v if b else -v for v, b in zip(range(1, nvars+1), bits)]
+            self.assertEqual(solver.solve(cube)[0], expected(bits), cube)
+
+    def test_cardinality(self):
+        lits = [1, -2, 3, 4, -4]
+        value = lambda bits: sum(bits[abs(l)-1] == (l > 0) for l in lits)
+        for encoding in ("totalizer", "seqcounter", "bnn"):
+            for k in range(-1, 7):
+                for name, holds in (("add_atmost", lambda c: c <= k),
+                                    ("add_atleast", lambda c: c >= k),
+                                    ("add_exactly", lambda c: c == k)):
+                    solver = Solver()
+                    getattr(solver, name)(lits, k, encoding=encoding)
+                    self.check(solver, 4, lambda bits: holds(value(bits)))
+
+    def test_pairwise(self):
+        solver = Solver()
+        self.assertEqual(solver.add_atmost([1, 2, 3], 1, encoding="pairwise"),
+                         {"aux_vars": 0, "clauses": 3, "bnns": 0})
+        self.assertEqual(solver.add_atleast([1, 2, 3], 2, encoding="pairwise")["clauses"], 3)
+        self.check(solver, 3, lambda bits: False)
+        self.assertRaises(ValueError, solver.add_atmost, [1, 2, 3], 2, encoding="pairwise")
+
+    def test_sizes(self):
+        lits = list(range(1, 101))
+        solver = Solver()
+        totalizer = solver.add_atmost(lits, 10)
+        seqcounter = solver.add_atmost(lits, 10, encoding="seqcounter")
+        self.assertEqual(seqcounter["aux_vars"], 99 * 10)
+        self.assertLess(totalizer["aux_vars"], seqcounter["aux_vars"])
+        self.assertEqual(solver.nb_vars(), 100 + totalizer["aux_vars"] + seqcounter["aux_vars"])
+        self.assertEqual(solver.add_exactly(lits, 5, encoding="bnn"),
+                         {"aux_vars": 0, "clauses": 0, "bnns": 2})
+        self.assertRaises(ValueError, Solver(threads=2).add_atmost, lits, 10, encoding="bnn")
+        self.assertRaises(ValueError, solver.add_atmost, lits, 10, encoding="sorter")
+
+    def test_pb(self):
+        lits = [1, -2, 3, 4]
+        for weights, bound in (([3, 2, 2, 1], 4), ([3, -2, 5, 0], 2), ([1, 1, 1, 1], -1)):
+            solver = Solver()
+            solver.add_pb(lits, weights, bound)
+            weight = lambda bits: sum(w for l, w in zip(lits, weights) if bits[abs(l)-1] == (l > 0))
+            self.check(solver, 4, lambda bits: weight(bits) <= bound)
+        self.assertRaises(ValueError, Solver().add_pb, [1, 2], [1], 1)
+        self.assertRaises(TypeError, Solver().add_pb, [1, 2], [1, "2"], 1)
+        self.assertRaises(OverflowError, Solver().add_pb, [1, 2], [2**62, 2**62], 1)
+
+        # equivalent sub-constraints share a node, however distinct the weights
+        weights = [(7 ** i) % 1000003 + 1 for i in range(16)]
+        sizes = Solver().add_pb(list(range(1, 17)), weights, sum(weights) // 2)
+        self.assertLess(sizes["aux_vars"], 200)
+
+
+class TestSolveStep(unittest.TestCase):
+
+    def test_steps(self):
+        solver = Solver()
+        solver.add_clauses(read_cnf("f400-r425-x000.cnf"))
+        total = 0
+        for _ in range(3):
+            sat, solution, progress = solver.solve_step(conflicts=300)
+            self.assertEqual((sat, solution), (None, None))
+            self.assertEqual(progress["conflicts"], solver.stats()["conflicts"])
+            self.assertGreater(progress["conflicts"], 0)
+            self.assertLessEqual(progress["conflicts"], 310)
+            self.assertGreater(progress["max_trail"], 0)
+            self.assertGreater(progress["learnt_clauses"], 0)
+            self.assertGreaterEqual(progress["fixed_vars"], 0)
+            self.assertGreaterEqual(progress["seconds"], 0)
+            total += progress["conflicts"]
+        self.assertEqual(solver.stats(last=False)["conflicts"], total)
+
+    def test_solution(self):
+        clauses = read_cnf("test.cnf")
+        solver = Solver()
+        solver.add_clauses(clauses)
+        sat, solution, progress = solver.solve_step(conflicts=10**6, seconds=100)
+        self.assertTrue(sat)
+        self.assertTrue(check_solution(clauses, solution))
+        sat, solution, _ = solver.solve_step(assumptions=[-1 if solution[1] else 1], model="array")
+        self.assertIn(sat, (True, False))
+        self.assertRaises(ValueError, solver.solve_step, conflicts=-1)
+        self.assertRaises(ValueError, solver.solve_step, model="nope")
+
+
 class TestSolveTimeLimit(unittest.TestCase):
 
     def get_clauses(self):
@@ -347,6 +1363,17 @@ def run():
     suite.addTest(unittest.makeSuite(InitTester))
     suite.addTest(unittest.makeSuite(TestSolve))
     suite.addTest(unittest.makeSuite(TestDump))
+    suite.addTest(unittest.makeSuite(TestIterModels))
+    suite.addTest(unittest.makeSuite(TestSolveAsync))
+    suite.addTest(unittest.makeSuite(TestReadDimacs))
+    suite.addTest(unittest.makeSuite(TestPortfolio))
+    suite.addTest(unittest.makeSuite(TestThreads))
+    suite.addTest(unittest.makeSuite(TestCubeAndConquer))
+    suite.addTest(unittest.makeSuite(TestProof))
+    suite.addTest(unittest.makeSuite(TestReset))
+    suite.addTest(unittest.makeSuite(TestCheckModel))
+    suite.addTest(unittest.makeSuite(TestSolveStep))
+    suite.addTest(unittest.makeSuite(TestConstraints))
     suite.addTest(unittest.makeSuite(TestSolveTimeLimit))
 
     runner = unittest.TextTestRunner(verbosity=2)
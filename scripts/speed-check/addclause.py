@@ -21,59 +21,314 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+"""Benchmarks of the pycryptosat binding hot paths.
+
+    ./addclause.py                          # run everything, print a table
+    ./addclause.py --quick --json new.json  # smaller sizes, save results
+    ./addclause.py --baseline old.json      # exit 1 on regressions
+
+All inputs are generated from --seed, so two runs time the same work. Every
+metric is lower-is-better; timings are the best of --repeat runs.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
 from array import array
-from collections import defaultdict
+from collections import OrderedDict
 from itertools import chain
-from time import time
+from time import perf_counter
 import pycryptosat
-import pycosat
 
 
-def cms_setup(clauses, m):
+def best_of(repeat, setup, run):
+    """Best time of `repeat` calls run(setup()), and the last result"""
+    best = float("inf")
+    res = None
+    for _ in range(repeat):
+        arg = setup()
+        t = perf_counter()
+        res = run(arg)
+        best = min(best, perf_counter() - t)
+    return best, res
+
+
+def three_lit_family(n):
+    """The historical addclause family: 2n clauses over 2n variables"""
+    half = n // 2
+    return list(chain.from_iterable(
+        [(-x, x + n, x + half), (-x, x + n, x + half)] for x in range(1, n+1)
+    ))
+
+
+def random_ksat(rng, nvars, nclauses, k=3):
+    return [tuple(v if rng.random() < 0.5 else -v for v in rng.sample(range(1, nvars+1), k))
+            for _ in range(nclauses)]
+
+
+def csr(clauses):
+    lits = array("i", chain.from_iterable(clauses))
+    offsets = array("q", [0])
+    for cl in clauses:
+        offsets.append(offsets[-1] + len(cl))
+    return lits, offsets
+
+
+def bench_ingest(args, rng, out):
+    n = args.scale * 550 * 1000 // 100
+    clauses = three_lit_family(n)
+    lists = [list(cl) for cl in clauses]
+    flat = array("i", chain.from_iterable(cl + (0,) for cl in clauses))
+    view = memoryview(flat)
+    lits, offsets = csr(clauses)
+    m = 2 * n
+
+    cases = [
+        ("list", lambda s: s.add_clauses(lists)),
+        ("tuples", lambda s: s.add_clauses(clauses)),
+        ("array", lambda s: s.add_clauses(flat)),
+        ("buffer", lambda s: s.add_clauses(view)),
+        ("buffer_trusted", lambda s: s.add_clauses(view, trusted=True)),
+        ("csr", lambda s: s.add_clauses(lits, offsets)),
+        ("add_clause", lambda s: [s.add_clause(cl) for cl in lists]),
+    ]
+    for name, add in cases:
+        t, _ = best_of(args.repeat, pycryptosat.Solver, add)
+        out["ingest.%s" % name] = (t, "s")
+
     solver = pycryptosat.Solver()
-    solver.add_clauses(clauses, max_var=m)
-    return solver
+    solver.add_clauses(flat)
+    t, _ = best_of(1, lambda: solver, lambda s: s.solve())
+    out["ingest.solve"] = (t, "s")
 
+    if args.pycosat:
+        import pycosat
+        t, _ = best_of(args.repeat, lambda: None, lambda _: next(pycosat.itersolve(clauses, vars=m)))
+        out["ingest.pycosat_setup_solve"] = (t, "s")
 
-def cms_solve(solver):
-    return solver.solve()
 
+def bench_xor(args, rng, out):
+    nvars = args.scale * 1000
+    xors = [sorted(rng.sample(range(1, nvars+1), 4)) for _ in range(nvars)]
+    rhs = [rng.random() < 0.5 for _ in xors]
+    xvars, offsets = csr(xors)
+    rhs_arr = array("b", rhs)
 
-def ps_setup(clauses, m):
-    return pycosat.itersolve(clauses, vars=m)
+    def one_by_one(s):
+        for x, r in zip(xors, rhs):
+            s.add_xor_clause(x, r)
+    t, _ = best_of(args.repeat, pycryptosat.Solver, one_by_one)
+    out["xor.add_xor_clause"] = (t, "s")
+    out["xor.add_xor_clause_per_clause"] = (t / len(xors) * 1e6, "us")
+    t, _ = best_of(args.repeat, pycryptosat.Solver, lambda s: s.add_xor_clauses(xvars, offsets, rhs_arr))
+    out["xor.add_xor_clauses"] = (t, "s")
 
 
-def ps_solve(iter_sol):
-    return next(iter_sol)
+def bench_model(args, rng, out):
+    # a chain of implications, solved by propagation alone
+    nvars = max(args.scale * 10 * 1000, 10)
+    flat = array("i", chain.from_iterable((-v, v+1, 0) for v in range(1, nvars)))
+    flat.extend([1, 0])
+    solver = pycryptosat.Solver(threads=1)
+    solver.add_clauses(flat, trusted=True)
+    solver.solve(model="array")
+    for fmt in ("tuple", "array", "bits"):
+        t, _ = best_of(args.repeat, lambda: None, lambda _: solver.solve(model=fmt))
+        out["model.solve_%s" % fmt] = (t, "s")
+    t, _ = best_of(args.repeat, lambda: None, lambda _: solver.get_model_buffer())
+    out["model.get_model_buffer"] = (t, "s")
 
 
-if __name__ == "__main__":
-    n = 550*1000
-    clause_list = list(chain.from_iterable(
-        [(-x, x + n, x + int(n/2)), (-x, x + n, x + int(n/2))] for x in range(1, n+1)
-    ))
-    clause_array = array("i", chain.from_iterable(c + (0,) for c in clause_list))
-    m = max(clause_array)
-
-    all_times = defaultdict(list)
-    my_list = ("CMS", cms_setup, cms_solve), ("Pycosat", ps_setup, ps_solve)
-    #my_list = ("CMS", cms_setup, cms_solve), (None, None, None)
-    for solver_type, setup, solve in list(my_list):
-        if solver_type is None:
+def percentile(sorted_times, q):
+    return sorted_times[min(len(sorted_times) - 1, int(q * len(sorted_times)))]
+
+
+def bench_incremental(args, rng, out):
+    nvars = 2000
+    solver = pycryptosat.Solver(threads=1)
+    solver.add_clauses(random_ksat(rng, nvars, int(nvars * 3.5)))
+    solver.solve()
+    cubes = [[v if rng.random() < 0.5 else -v for v in rng.sample(range(1, nvars+1), 3)]
+             for _ in range(args.scale * 5)]
+    times = []
+    for cube in cubes:
+        t = perf_counter()
+        solver.solve(cube, model="bits")
+        times.append(perf_counter() - t)
+    times.sort()
+    for q in (50, 90, 99):
+        out["incremental.p%d" % q] = (percentile(times, q / 100.0) * 1e6, "us")
+
+    lits, offsets = csr(cubes)
+    t, _ = best_of(args.repeat, lambda: None, lambda _: solver.solve_batch(lits, offsets))
+    out["incremental.solve_batch_per_cube"] = (t / len(cubes) * 1e6, "us")
+
+
+def bench_threads(args, rng, out):
+    # a random 3-SAT instance near the threshold, hard enough to be worth
+    # threads but solved within seconds
+    clauses = random_ksat(rng, 300, int(300 * 4.26))
+    for threads in (1, 2, 4):
+        def run(s):
+            s.add_clauses(clauses)
+            return s.solve(model="bits")
+        t, _ = best_of(args.repeat, lambda: pycryptosat.Solver(threads=threads), run)
+        out["threads.%d" % threads] = (t, "s")
+
+
+def reset_peak_rss():
+    """Restart the Linux high-water mark at the current RSS, if allowed"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except (IOError, OSError):
+        return False
+
+
+def proc_status_bytes(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+    raise KeyError(field)
+
+
+def max_rss_bytes():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def memory_child(n):
+    """Run in a fresh interpreter, away from the other benchmarks' garbage"""
+    # ru_maxrss survives fork+exec on Linux, so it may still hold the
+    # parent's peak: use VmHWM restarted from here instead, or the current
+    # RSS (a lower bound of the peak) where the peak cannot be reset
+    if reset_peak_rss():
+        peak = lambda: proc_status_bytes("VmHWM")
+    elif os.path.exists("/proc/self/status"):
+        peak = lambda: proc_status_bytes("VmRSS")
+    else:
+        peak = max_rss_bytes
+
+    # built without an intermediate list, whose peak would hide the solver's
+    half = n // 2
+    flat = array("i")
+    for x in range(1, n+1):
+        flat.extend((-x, x + n, x + half, 0) * 2)
+    reset_peak_rss()
+    before = peak()
+    solver = pycryptosat.Solver(threads=1)
+    solver.add_clauses(flat, trusted=True)
+    loaded = peak()
+    solver.solve(model="bits")
+    solved = peak()
+    print(json.dumps({"clauses": 2 * n, "loaded": loaded - before, "solved": solved - before}))
+
+
+def bench_memory(args, rng, out):
+    n = args.scale * 550 * 1000 // 100
+    res = json.loads(subprocess.check_output(
+        [sys.executable, __file__, "--memory-child", str(n)]).decode())
+    out["memory.add_clauses_per_clause"] = (res["loaded"] / float(res["clauses"]), "B")
+    out["memory.solve_per_clause"] = (res["solved"] / float(res["clauses"]), "B")
+
+
+BENCHMARKS = OrderedDict([
+    ("ingest", bench_ingest),
+    ("xor", bench_xor),
+    ("model", bench_model),
+    ("incremental", bench_incremental),
+    ("threads", bench_threads),
+    ("memory", bench_memory),
+])
+
+
+def compare(results, baseline, tolerance):
+    """Print results next to the baseline and return the regressed names"""
+    regressed = []
+    print("{:<40} {:>14} {:>14} {:>8}".format("benchmark", "baseline", "now", "ratio"))
+    for name, res in results.items():
+        old = baseline.get(name)
+        if old is None or old["unit"] != res["unit"]:
+            print("{:<40} {:>14} {:>12.4g}{:>2} {:>8}".format(name, "-", res["value"], res["unit"], "new"))
             continue
+        ratio = res["value"] / old["value"] if old["value"] > 0 else float("inf")
+        flag = ""
+        # timings less than a millisecond apart are within the noise
+        noise = 1e-3 if res["unit"] == "s" else 0
+        if ratio > 1 + tolerance and res["value"] - old["value"] > noise:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        print("{:<40} {:>12.4g}{:>2} {:>12.4g}{:>2} {:>8.2f}{}".format(
+            name, old["value"], old["unit"], res["value"], res["unit"], ratio, flag))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="run these benchmarks only")
+    parser.add_argument("--quick", action="store_true", help="small sizes, for smoke testing")
+    parser.add_argument("--scale", type=int, default=None,
+                        help="size factor, 100 by default, 10 with --quick (1M+ model variables at 100)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per timing, the best is kept")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the generated inputs")
+    parser.add_argument("--pycosat", action="store_true", help="also time pycosat on the ingest family")
+    parser.add_argument("--json", metavar="FILE", help="save the results to FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="relative slowdown over the baseline reported as a regression (default 0.2)")
+    parser.add_argument("--memory-child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.memory_child is not None:
+        memory_child(args.memory_child)
+        return 0
+    if args.scale is None:
+        args.scale = 10 if args.quick else 100
 
-        my_type_list = ("list", clause_list), ("array", clause_array)
-        #my_type_list = ("list", clause_list), (None, None)
-        for clauses_type, clauses in (my_type_list):
-            if clauses is None:
-                continue
-
-            for _ in range(5):
-                t = time()
-                solver = setup(clauses, m)
-                all_times["setup {:<7} {:<5}".format(solver_type, clauses_type)].append(time() - t)
-                t = time()
-                solve(solver)
-                all_times["solve {:<7} {:<5}".format(solver_type, clauses_type)].append(time() - t)
-    for text, times in sorted(all_times.items()):
-        print(text, *map("{:5.3f}".format, sorted(times)))
+    raw = OrderedDict()
+    for name in args.only or BENCHMARKS:
+        # each benchmark gets its own generator, so --only keeps the inputs
+        BENCHMARKS[name](args, random.Random("%s-%d" % (name, args.seed)), raw)
+    results = OrderedDict((k, {"value": v, "unit": u}) for k, (v, u) in raw.items())
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "meta": {
+                    "pycryptosat": getattr(pycryptosat, "__version__", None),
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "scale": args.scale,
+                    "repeat": args.repeat,
+                    "seed": args.seed,
+                },
+                "results": results,
+            }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"]["scale"] != args.scale:
+            print("warning: baseline was run with --scale %d" % baseline["meta"]["scale"], file=sys.stderr)
+        regressed = compare(results, baseline["results"], args.tolerance)
+        if regressed:
+            print("\n%d regression(s): %s" % (len(regressed), ", ".join(regressed)))
+            return 1
+    else:
+        for name, res in results.items():
+            print("{:<40} {:>12.4g} {}".format(name, res["value"], res["unit"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -97,7 +97,9 @@ def gen_modules(version):
                    "src/oracle/oracle.cpp",
                ],
         extra_compile_args = ['-I../', '-Isrc/', '-std=c++17'],
-        define_macros=[("TRACE", ""), ("CMS_FULL_VERSION", "\""+version+"\"")],
+        define_macros=[("TRACE", ""), ("WEIGHTED_SAMPLING", ""), ("USE_ZLIB", ""),
+                       ("CMS_FULL_VERSION", "\""+version+"\"")],
+        libraries = ["z"],
         language = "c++",
     )
     return modules
@@ -130,6 +130,7 @@ public:
     uint32_t longest_trail_ever_stable = 0;
     uint32_t longest_trail_ever_best = 0;
     uint32_t longest_trail_ever_inv = 0;
+    uint32_t longest_trail_this_solve = 0; //at a conflict, during the last solve() call
     vector<uint32_t> depth; //for ancestors in intree probing
     uint32_t minNumVars = 0;
 
@@ -576,6 +576,39 @@ DLL_PUBLIC void SATSolver::set_max_confl(uint64_t max_confl)
   }
 }
 
+DLL_PUBLIC void SATSolver::set_max_mem(uint64_t max_bytes)
+{
+    for (Solver* s : data->solvers) {
+        s->conf.max_mem_bytes = max_bytes / data->solvers.size();
+    }
+}
+
+DLL_PUBLIC void SATSolver::set_resume_search(bool resume)
+{
+    for (Solver* s : data->solvers) {
+        s->conf.resume_search = resume;
+    }
+}
+
+DLL_PUBLIC void SATSolver::set_terminate_callback(bool (*terminate)(void*), void* state, uint64_t every_n_conflicts)
+{
+    for (Solver* s : data->solvers) {
+        s->terminate_cb = terminate;
+        s->terminate_cb_state = state;
+        s->terminate_cb_every = std::max<uint64_t>(every_n_conflicts, 1);
+        s->next_terminate_cb_confl = 0;
+    }
+}
+
+DLL_PUBLIC void SATSolver::set_learn_callback(void (*learn)(void*, const std::vector<Lit>&), void* state, uint32_t max_len)
+{
+    for (Solver* s : data->solvers) {
+        s->learn_cb = learn;
+        s->learn_cb_state = state;
+        s->learn_cb_max_len = max_len;
+    }
+}
+
 DLL_PUBLIC void SATSolver::set_default_polarity(bool polarity)
 {
     for (size_t i = 0; i < data->solvers.size(); ++i) {
@@ -1300,6 +1333,36 @@ DLL_PUBLIC uint64_t SATSolver::get_sum_decisions() const
     return total_decisions;
 }
 
+DLL_PUBLIC uint64_t SATSolver::get_sum_restarts() const
+{
+    uint64_t total_restarts = 0;
+    for (Solver const* s : data->solvers) {
+        total_restarts += s->sumSearchStats.numRestarts;
+    }
+    return total_restarts;
+}
+
+DLL_PUBLIC uint32_t SATSolver::get_last_max_trail() const
+{
+    uint32_t max_trail = 0;
+    for (Solver const* s : data->solvers) {
+        max_trail = std::max(max_trail, s->longest_trail_this_solve);
+    }
+    return max_trail;
+}
+
+DLL_PUBLIC uint64_t SATSolver::get_num_red_clauses() const
+{
+    uint64_t num = 0;
+    for (Solver const* s : data->solvers) {
+        num += s->binTri.redBins;
+        for (const auto& cls: s->longRedCls) {
+            num += cls.size();
+        }
+    }
+    return num;
+}
+
 DLL_PUBLIC uint64_t SATSolver::get_last_conflicts()
 {
     return get_sum_conflicts() - data->previous_sum_conflicts;
@@ -1488,6 +1551,15 @@ DLL_PUBLIC void SATSolver::set_var_weight(Lit lit, double weight)
     }
 }
 
+DLL_PUBLIC void SATSolver::set_polarities(const std::vector<Lit>& lits)
+{
+    actually_add_clauses_to_threads(data);
+    for (size_t i = 0; i < data->solvers.size(); ++i) {
+        Solver& s = *data->solvers[i];
+        s.set_outside_polarities(lits);
+    }
+}
+
 DLL_PUBLIC std::vector<uint32_t> SATSolver::get_lit_incidence()
 {
     actually_add_clauses_to_threads(data);
@@ -1500,6 +1572,30 @@ DLL_PUBLIC vector<uint32_t> SATSolver::get_var_incidence()
     return data->solvers[data->which_solved]->get_outside_var_incidence();
 }
 
+DLL_PUBLIC vector<std::pair<std::string, uint64_t> > SATSolver::get_mem_used() const
+{
+    vector<std::pair<std::string, uint64_t> > ret;
+    vector<std::pair<std::string, uint64_t> > mem;
+    for (const Solver* s : data->solvers) {
+        s->get_mem_used(mem);
+        if (ret.empty()) {
+            ret = mem;
+            continue;
+        }
+        for (size_t i = 0; i < mem.size(); i++) {
+            ret[i].second += mem[i].second;
+        }
+    }
+    ret.push_back(std::make_pair("pending", data->cls_lits.capacity()*sizeof(Lit)));
+    return ret;
+}
+
+DLL_PUBLIC vector<double> SATSolver::get_vsids_scores()
+{
+    actually_add_clauses_to_threads(data);
+    return data->solvers[data->which_solved]->get_vsids_scores();
+}
+
 DLL_PUBLIC vector<OrGate> SATSolver::get_recovered_or_gates()
 {
     actually_add_clauses_to_threads(data);
@@ -1693,6 +1789,18 @@ DLL_PUBLIC uint32_t SATSolver::simplified_nvars()
     return s.nVars();
 }
 
+DLL_PUBLIC vector<Lit> SATSolver::get_simplified_var_map() const
+{
+    assert(data->solvers.size() >= 1);
+    return data->solvers[0]->get_simplified_var_map();
+}
+
+DLL_PUBLIC uint32_t SATSolver::get_num_bva_vars() const
+{
+    assert(data->solvers.size() >= 1);
+    return data->solvers[0]->get_num_bva_vars();
+}
+
 DLL_PUBLIC void SATSolver::set_varelim_check_resolvent_subs(bool varelim_check_resolvent_subs)
 {
     for (size_t i = 0; i < data->solvers.size(); ++i) {
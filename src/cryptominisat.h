@@ -65,6 +65,7 @@ namespace CMSat {
             Lit out = lit_Undef
         );
         void set_var_weight(Lit lit, double weight);
+        void set_polarities(const std::vector<Lit>& lits); //preferred polarity of each lit's variable becomes the lit's, e.g. to start near a previous model
 
         ////////////////////////////
         // Solving and simplifying
@@ -116,6 +117,30 @@ namespace CMSat {
          * \pre max_confl >= 0
          */
         void set_max_confl(uint64_t max_confl);
+        /**
+         * Soft limit on the memory held by the solver, as accounted by
+         * get_mem_used(). Once exceeded, solve() returns l_Undef. The limit
+         * is split evenly between the threads, so set it after set_num_threads()
+         */
+        void set_max_mem(uint64_t max_bytes);
+        /**
+         * Have a solve() that stops on the limits above leave its search
+         * schedule to the next solve(), which continues it instead of
+         * starting over, e.g. to run a search in time slices
+         */
+        void set_resume_search(bool resume);
+        /**
+         * IPASIR-style callbacks, called from the solving threads, possibly
+         * concurrently. Pass NULL to remove them. Set them after set_num_threads()
+         *
+         * terminate(state) is called every every_n_conflicts conflicts of each
+         * thread. Once it returns true, solve() returns l_Undef.
+         *
+         * learn(state, clause) is called with each learnt clause of at most
+         * max_len literals, in the numbering of add_clause()
+         */
+        void set_terminate_callback(bool (*terminate)(void* state), void* state, uint64_t every_n_conflicts = 1);
+        void set_learn_callback(void (*learn)(void* state, const std::vector<Lit>& clause), void* state, uint32_t max_len);
         void set_verbosity(unsigned verbosity = 0); //default is 0, silent
         void set_verbosity_detach_warning(bool verb); //default is 0, silent
         void set_default_polarity(bool polarity); //default polarity when branching for all vars
@@ -195,6 +220,9 @@ namespace CMSat {
         uint64_t get_sum_propagations() const; //!< Returns sum of all propagations since construction across all the threads
         uint64_t get_sum_decisions(); //get total number of decisions of all time made by all threads
         uint64_t get_sum_decisions() const; //!< Returns sum of all decisions since construction across all the threads
+        uint64_t get_sum_restarts() const; //!< Returns sum of all restarts since construction across all the threads
+        uint32_t get_last_max_trail() const; //!< Returns the longest trail at a conflict in the last solve() call, over all threads
+        uint64_t get_num_red_clauses() const; //!< Returns the number of learnt clauses kept, binary and long, summed over the threads
 
         void print_stats(double wallclock_time_started = 0) const; //print solving stats. Call after solve()/simplify()
         void set_frat(FILE* os); //set frat to ostream, e.g. stdout or a file
@@ -221,6 +249,7 @@ namespace CMSat {
         std::vector<uint32_t> get_lit_incidence();
         std::vector<uint32_t> get_var_incidence_also_red();
         std::vector<double> get_vsids_scores();
+        std::vector<std::pair<std::string, uint64_t> > get_mem_used() const; //bytes held by each subsystem, summed over the threads
 
         lbool find_fast_backw(FastBackwData fast_backw);
         void remove_and_clean_all();
@@ -244,6 +273,10 @@ namespace CMSat {
         bool get_next_small_clause(std::vector<Lit>& ret, bool all_in_one = false); //returns FALSE if no more
         void end_getting_small_clauses();
         uint32_t simplified_nvars();
+        //Literal of every variable in the simplified CNF, lit_Undef if it was eliminated.
+        //Variables set at decision level 0 map to the extra variable simplified_nvars(), which is TRUE
+        std::vector<Lit> get_simplified_var_map() const;
+        uint32_t get_num_bva_vars() const; //simplified CNF can only be obtained without BVA variables
         std::vector<uint32_t> translate_sampl_set(const std::vector<uint32_t>& sampl_set);
         void get_all_irred_clauses(std::vector<Lit>& ret);
         const std::vector<BNN*>& get_bnns() const;
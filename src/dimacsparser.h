@@ -275,8 +275,8 @@ bool DimacsParser<C, S>::parse_header(C& in)
     in.parseString(str);
     if (str == "cnf") {
         if (header_found && strict_header) {
-            std::cerr << "ERROR: CNF header ('p cnf vars cls') found twice in file! Exiting." << endl;
-            exit(-1);
+            std::cerr << "ERROR: CNF header ('p cnf vars cls') found twice in file!" << endl;
+            return false;
         }
         header_found = true;
 
@@ -615,8 +615,8 @@ bool DimacsParser<C, S>::parse_DIMACS_main(C& in)
                 return false;
             }
             #else
-            std::cout << "ERROR: BNN encounered but not enabled in parsing. Exiting." << endl;
-            exit(-1);
+            std::cerr << "ERROR: BNN encounered but not enabled in parsing." << endl;
+            return false;
             #endif
             break;
         case '\n':
@@ -90,6 +90,27 @@ EGaussian::~EGaussian() {
     TBUDDY_DO(ilist_free(ilist_tmp));
 }
 
+size_t EGaussian::mem_used() const
+{
+    size_t mem = mat.mem_used();
+    mem += tofree.size()*sizeof(int64_t)*(num_cols/64+2);
+    for(const auto& x: xorclauses) {
+        mem += sizeof(Xor) + x.vars.capacity()*sizeof(uint32_t);
+    }
+    for(const auto& r: xor_reasons) {
+        mem += sizeof(XorReason) + r.reason.capacity()*sizeof(Lit);
+    }
+    for(const auto& row: bdd_matrix) {
+        mem += row.capacity();
+    }
+    mem += satisfied_xors.capacity();
+    mem += var_has_resp_row.capacity();
+    mem += row_to_var_non_resp.capacity()*sizeof(uint32_t);
+    mem += var_to_col.capacity()*sizeof(uint32_t);
+    mem += col_to_var.capacity()*sizeof(uint32_t);
+    return mem;
+}
+
 struct ColSorter {
     explicit ColSorter(Solver* _solver) :
         solver(_solver)
@@ -98,6 +98,7 @@ class EGaussian {
     void print_matrix_stats(uint32_t verbosity);
     bool must_disable(GaussQData& gqd);
     void check_invariants();
+    size_t mem_used() const;
     void update_matrix_no(uint32_t n);
     void check_watchlist_sanity();
     uint32_t get_matrix_no();
@@ -76,6 +76,11 @@ public:
         numCols = num_cols;
     }
 
+    size_t mem_used() const
+    {
+        return sizeof(int64_t) * numRows*(numCols+1);
+    }
+
     void resizeNumRows(const uint32_t num_rows)
     {
         assert((int)num_rows <= numRows);
@@ -72,13 +72,14 @@ Searcher::Searcher(const SolverConf *_conf, Solver* _solver, std::atomic<bool>*
             , _solver
             , _must_interrupt_inter
         )
+        //seeded here, the default constructor would read /dev/urandom
+        , mtrand(conf.origSeed)
         , solver(_solver)
         , cla_inc(1)
 {
     var_inc_vsids = 1;
 
     more_red_minim_limit_binary_actual = conf.more_red_minim_limit_binary;
-    mtrand.seed(conf.origSeed);
     hist.setSize(conf.shortTermHistorySize, conf.blocking_restart_trail_hist_length);
     cur_max_temp_red_lev2_cls = conf.max_temp_lev2_learnt_clauses;
     polarity_mode = conf.polarity_mode;
@@ -1305,10 +1306,14 @@ lbool Searcher::search()
             hist.trailDepthHist.push(trail.size());
             #endif
             hist.trailDepthHistLonger.push(trail.size());
+            longest_trail_this_solve = std::max<uint32_t>(longest_trail_this_solve, trail.size());
             if (!handle_conflict(confl)) {
                 search_ret = l_False;
                 goto end;
             }
+            if (solver->terminate_cb != NULL && solver->terminate_requested()) {
+                params.needToStopSearch = true;
+            }
             check_need_restart();
             check_need_gauss_jordan_disable();
         } else {
@@ -1838,6 +1843,9 @@ bool Searcher::handle_conflict(PropBy confl)
     #ifdef USE_GPU
     solver->datasync->trySendAssignmentToGpu();
     #endif
+    if (solver->learn_cb != NULL && learnt_clause.size() <= solver->learn_cb_max_len) {
+        solver->signal_learnt_to_cb(learnt_clause);
+    }
 
     uint32_t connects_num_communities = 0;
     #ifdef STATS_NEEDED
@@ -2406,6 +2414,10 @@ bool Searcher::must_abort(const lbool status) {
         return true;
     }
 
+    if (solver->over_mem_limit()) {
+        return true;
+    }
+
     return false;
 }
 
@@ -1591,8 +1591,13 @@ lbool Solver::simplify_problem_outside(const string* strategy)
 
 void Solver::reset_for_solving()
 {
-    longest_trail_ever_best = 0;
-    longest_trail_ever_inv = 0;
+    //Keep the search state of a solve() stopped on its limits to continue it
+    const bool resume = conf.resume_search && resume_iteration_num > 0;
+    if (!resume) {
+        longest_trail_ever_best = 0;
+        longest_trail_ever_inv = 0;
+    }
+    longest_trail_this_solve = 0;
     fresh_solver = false;
     set_assumptions();
     #ifdef SLOW_DEBUG
@@ -1606,10 +1611,13 @@ void Solver::reset_for_solving()
 
     solveStats.num_solve_calls++;
     check_and_upd_config_parameters();
+    next_mem_check_confl = sumConflicts;
 
     //Reset parameters
-    luby_loop_num = 0;
-    conf.global_timeout_multiplier = conf.orig_global_timeout_multiplier;
+    if (!resume) {
+        luby_loop_num = 0;
+        conf.global_timeout_multiplier = conf.orig_global_timeout_multiplier;
+    }
     solveStats.num_simplify_this_solve_call = 0;
     if (conf.verbosity >= 6) {
         cout << "c " << __func__ << " called" << endl;
@@ -1900,7 +1908,7 @@ void Solver::dump_memory_stats_to_sql()
     );
 }
 
-uint64_t Solver::calc_num_confl_to_do_this_iter(const size_t iteration_num) const
+uint64_t Solver::calc_num_confl_of_search_round(const size_t iteration_num) const
 {
     double iter_num = std::min<size_t>(iteration_num, 100ULL);
     double mult = std::pow(conf.num_conflicts_of_search_inc, iter_num);
@@ -1909,6 +1917,12 @@ uint64_t Solver::calc_num_confl_to_do_this_iter(const size_t iteration_num) cons
     if (conf.never_stop_search) {
         num_conflicts_of_search = 600ULL*1000ULL*1000ULL;
     }
+    return num_conflicts_of_search;
+}
+
+uint64_t Solver::calc_num_confl_to_do_this_iter(const uint64_t round_confl_left) const
+{
+    uint64_t num_conflicts_of_search = round_confl_left;
     if (conf.max_confl >= sumConflicts) {
         num_conflicts_of_search = std::min<uint64_t>(
             num_conflicts_of_search
@@ -1926,23 +1940,37 @@ lbool Solver::iterate_until_solved()
 {
     lbool status = l_Undef;
     size_t iteration_num = 0;
+    //Conflicts left of the current search round, 0 to start the next one
+    uint64_t round_confl_left = 0;
+    if (conf.resume_search) {
+        iteration_num = resume_iteration_num;
+        round_confl_left = resume_round_confl_left;
+    }
+    resume_iteration_num = 0;
+    resume_round_confl_left = 0;
 
     while (status == l_Undef
         && !must_interrupt_asap()
         && cpuTime() < conf.maxTime
         && sumConflicts < conf.max_confl
+        && !over_mem_limit()
     ) {
-        iteration_num++;
-        if (conf.verbosity >= 2) print_clause_size_distrib();
-        dump_memory_stats_to_sql();
+        if (round_confl_left == 0) {
+            iteration_num++;
+            if (conf.verbosity >= 2) print_clause_size_distrib();
+            dump_memory_stats_to_sql();
+            round_confl_left = calc_num_confl_of_search_round(iteration_num);
+        }
 
-        const uint64_t num_confl = calc_num_confl_to_do_this_iter(iteration_num);
+        const uint64_t num_confl = calc_num_confl_to_do_this_iter(round_confl_left);
         if (num_confl == 0) break;
         if (!find_and_init_all_matrices()) {
             status = l_False;
             goto end;
         }
+        const uint64_t confl_before = sumConflicts;
         status = Searcher::solve(num_confl);
+        round_confl_left -= std::min(round_confl_left, sumConflicts - confl_before);
 
         //Check for effectiveness
         check_recursive_minimization_effectiveness(status);
@@ -1965,14 +1993,22 @@ lbool Solver::iterate_until_solved()
             || cpuTime() > conf.maxTime
             || must_interrupt_asap()
         ) {
+            //A resumed search finishes the round, then simplifies
+            round_confl_left = std::max<uint64_t>(round_confl_left, 1);
             break;
         }
 
+        round_confl_left = 0;
         if (conf.do_simplify_problem) {
             status = simplify_problem(false, conf.simplify_schedule_nonstartup);
         }
     }
 
+    if (status == l_Undef && conf.resume_search) {
+        resume_iteration_num = iteration_num;
+        resume_round_confl_left = round_confl_left;
+    }
+
     #ifdef STATS_NEEDED
     //To record clauses when we finish up
     if (status != l_Undef) {
@@ -2684,6 +2720,99 @@ void Solver::print_mem_stats() const
     );
 }
 
+void Solver::get_mem_used(vector<std::pair<string, uint64_t> >& mem) const
+{
+    mem.clear();
+    mem.push_back(std::make_pair("clauses", mem_used_longclauses()));
+    mem.push_back(std::make_pair("watches", watches.mem_used_alloc() + watches.mem_used_array()));
+    mem.push_back(std::make_pair("vardata", mem_used_vardata()));
+    mem.push_back(std::make_pair("search", mem_used()));
+    mem.push_back(std::make_pair("renumber", CNF::mem_used_renumberer()));
+    uint64_t occ = 0;
+    uint64_t xor_finder = 0;
+    uint64_t bva = 0;
+    if (occsimplifier) {
+        occ = occsimplifier->mem_used();
+        xor_finder = occsimplifier->mem_used_xor();
+        bva = occsimplifier->mem_used_bva();
+    }
+    mem.push_back(std::make_pair("occsimplifier", occ));
+    mem.push_back(std::make_pair("xor", xor_finder));
+    mem.push_back(std::make_pair("bva", bva));
+    mem.push_back(std::make_pair("varreplacer", varReplacer->mem_used()));
+    uint64_t gauss = 0;
+    for(const EGaussian* g: gmatrices) {
+        gauss += g->mem_used();
+    }
+    mem.push_back(std::make_pair("gauss", gauss));
+    uint64_t distill = distill_long_cls->mem_used();
+    distill += dist_long_with_impl->mem_used();
+    distill += dist_impl_with_impl->mem_used();
+    if (subsumeImplicit) {
+        distill += subsumeImplicit->mem_used();
+    }
+    mem.push_back(std::make_pair("distill", distill));
+}
+
+//Checked every 1000 conflicts, as accounting walks the watchlists
+bool Solver::over_mem_limit()
+{
+    if (conf.max_mem_bytes == numeric_limits<uint64_t>::max()) {
+        return false;
+    }
+    if (sumConflicts < next_mem_check_confl) {
+        return mem_limit_hit;
+    }
+    next_mem_check_confl = sumConflicts + 1000;
+
+    vector<std::pair<string, uint64_t> > mem;
+    get_mem_used(mem);
+    uint64_t total = 0;
+    for(const auto& m: mem) {
+        total += m.second;
+    }
+    mem_limit_hit = total > conf.max_mem_bytes;
+    if (mem_limit_hit && conf.verbosity) {
+        cout << "c memory limit of " << conf.max_mem_bytes/(1024*1024) << " MB reached, "
+        << total/(1024*1024) << " MB in use" << endl;
+    }
+    return mem_limit_hit;
+}
+
+bool Solver::terminate_requested()
+{
+    if (sumConflicts < next_terminate_cb_confl) {
+        return false;
+    }
+    next_terminate_cb_confl = sumConflicts + terminate_cb_every;
+    if (!terminate_cb(terminate_cb_state)) {
+        return false;
+    }
+    set_must_interrupt_asap();
+    return true;
+}
+
+void Solver::signal_learnt_to_cb(const vector<Lit>& cl)
+{
+    //Don't signal clauses with BVA variables
+    learn_cb_tmp.clear();
+    for(const Lit lit: cl) {
+        if (varData[lit.var()].is_bva) {
+            return;
+        }
+        learn_cb_tmp.push_back(map_inter_to_outer(lit));
+    }
+
+    //Update to outer without BVA
+    if (get_num_bva_vars() != 0) {
+        if (learn_cb_bva_map.size() != nVarsOuter()) {
+            learn_cb_bva_map = build_outer_to_without_bva_map();
+        }
+        updateLitsMap(learn_cb_tmp, learn_cb_bva_map);
+    }
+    learn_cb(learn_cb_state, learn_cb_tmp);
+}
+
 void Solver::print_clause_size_distrib()
 {
     size_t size3 = 0;
@@ -3963,6 +4092,27 @@ vector<uint32_t> Solver::translate_sampl_set(const vector<uint32_t>& sampl_set)
     return get_clause_query->translate_sampl_set(sampl_set);
 }
 
+//Literal of every outside variable in the simplified CNF's numbering.
+//Eliminated ones are lit_Undef, assigned ones map to the extra TRUE var nVars()
+vector<Lit> Solver::get_simplified_var_map() const
+{
+    assert(get_num_bva_vars() == 0);
+    vector<Lit> ret;
+    const Lit true_lit = Lit(nVars(), false);
+    for(uint32_t v = 0; v < nVarsOuter(); v++) {
+        Lit lit = varReplacer->get_lit_replaced_with_outer(Lit(v, false));
+        lit = map_outer_to_inter(lit);
+        if (value(lit) != l_Undef) {
+            ret.push_back(true_lit ^ (value(lit) == l_False));
+        } else if (varData[lit.var()].removed != Removed::none) {
+            ret.push_back(lit_Undef);
+        } else {
+            ret.push_back(lit);
+        }
+    }
+    return ret;
+}
+
 void Solver::add_empty_cl_to_frat()
 {
     assert(false);
@@ -4053,6 +4203,20 @@ const Lit, const double
     #endif
 }
 
+//Every polarity mode that keeps per-variable phases starts from these
+void Solver::set_outside_polarities(const vector<Lit>& lits)
+{
+    for(Lit lit: lits) {
+        lit = back_number_from_outside_to_outer(lit);
+        lit = varReplacer->get_lit_replaced_with_outer(lit);
+        lit = map_outer_to_inter(lit);
+        VarData& vd = varData[lit.var()];
+        vd.saved_polarity = !lit.sign();
+        vd.stable_polarity = !lit.sign();
+        vd.best_polarity = !lit.sign();
+    }
+}
+
 vector<double> Solver::get_vsids_scores() const
 {
     auto scores(var_act_vsids);
@@ -95,6 +95,7 @@ class Solver : public Searcher
             const int32_t cutoff,
             Lit out);
         void set_var_weight(Lit lit, double weight);
+        void set_outside_polarities(const vector<Lit>& lits);
 
         lbool solve_with_assumptions(
             const vector<Lit>* _assumptions = NULL,
@@ -129,6 +130,7 @@ class Solver : public Searcher
         void end_getting_small_clauses();
         void get_all_irred_clauses(vector<Lit>& out);
         vector<uint32_t> translate_sampl_set(const vector<uint32_t>& sampl_set);
+        vector<Lit> get_simplified_var_map() const;
 
         //Version
         static const char* get_version_tag();
@@ -155,6 +157,19 @@ class Solver : public Searcher
         size_t get_num_vars_elimed() const;
         uint32_t num_active_vars() const;
         void print_mem_stats() const;
+        void get_mem_used(vector<std::pair<string, uint64_t> >& mem) const;
+        bool over_mem_limit();
+
+        //IPASIR-style callbacks, see SATSolver::set_terminate_callback()
+        bool (*terminate_cb)(void* state) = NULL;
+        void* terminate_cb_state = NULL;
+        uint64_t terminate_cb_every = 1;
+        uint64_t next_terminate_cb_confl = 0;
+        void (*learn_cb)(void* state, const vector<Lit>& clause) = NULL;
+        void* learn_cb_state = NULL;
+        uint32_t learn_cb_max_len = 0;
+        bool terminate_requested();
+        void signal_learnt_to_cb(const vector<Lit>& cl);
         uint64_t print_watch_mem_used(uint64_t totalMem) const;
         const SolveStats& get_solve_stats() const;
         const SearchStats& get_stats() const;
@@ -378,7 +393,17 @@ class Solver : public Searcher
         vector<Lit> add_clause_int_tmp_cl;
         lbool iterate_until_solved();
         uint64_t mem_used_vardata() const;
-        uint64_t calc_num_confl_to_do_this_iter(const size_t iteration_num) const;
+        uint64_t next_mem_check_confl = 0;
+        vector<Lit> learn_cb_tmp;
+        vector<uint32_t> learn_cb_bva_map;
+        bool mem_limit_hit = false;
+        uint64_t calc_num_confl_of_search_round(const size_t iteration_num) const;
+        uint64_t calc_num_confl_to_do_this_iter(const uint64_t round_confl_left) const;
+
+        //Search round iterate_until_solved() was in when it stopped on a
+        //limit, and its conflicts left, for conf.resume_search
+        size_t resume_iteration_num = 0;
+        uint64_t resume_round_confl_left = 0;
 
         bool sort_and_clean_clause(
             vector<Lit>& ps
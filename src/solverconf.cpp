@@ -161,6 +161,8 @@ DLL_PUBLIC SolverConf::SolverConf() :
         //Limits
         , maxTime          (numeric_limits<double>::max())
         , max_confl         (numeric_limits<uint64_t>::max())
+        , max_mem_bytes     (numeric_limits<uint64_t>::max())
+        , resume_search     (false)
 
         //Glues
         , update_glues_on_analyze(true)
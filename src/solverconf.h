@@ -315,6 +315,8 @@ class DLL_PUBLIC SolverConf
         //Limits
         double   maxTime;
         uint64_t max_confl;
+        uint64_t max_mem_bytes; ///Soft limit on the accounted memory, see Solver::get_mem_used()
+        bool resume_search; ///A solve() stopped by the limits above is continued by the next one
 
         //Glues
         int       update_glues_on_analyze;